@@ -206,14 +206,18 @@ class ProtectablesController(wsgi.Controller):
             filters=filters, offset=offset, parameters=parameters)
 
         for instance in instances:
-            protectable_id = instance.get("id")
             instance["type"] = protectable_type
-            if protectable_id is None:
+            if instance.get("id") is None:
                 raise exception.InvalidProtectableInstance()
+
+        if instances:
             dependents = self.protection_api.\
-                list_protectable_dependents(context, protectable_id,
-                                            protectable_type)
-            instance["dependent_resources"] = dependents
+                list_protectable_dependents_bulk(
+                    context, [instance["id"] for instance in instances],
+                    protectable_type)
+            for instance in instances:
+                instance["dependent_resources"] = dependents.get(
+                    instance["id"], [])
 
         retval_instances = self._view_builder.detail_list(req, instances)
 
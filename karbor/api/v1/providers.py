@@ -388,7 +388,16 @@ class ProvidersController(wsgi.Controller):
                 "resources": plan.get("resources"),
             }
         }
-        checkpoint = self.protection_api.protect(context, plan)
+        extra_info = checkpoint.get("extra-info") or {}
+        if extra_info.get("created_by") == constants.OPERATION_ENGINE:
+            priority = constants.PROTECTION_PRIORITY_SCHEDULED
+        else:
+            priority = constants.PROTECTION_PRIORITY_MANUAL
+        try:
+            checkpoint = self.protection_api.protect(context, plan,
+                                                     priority=priority)
+        except exception.ProviderBusy as error:
+            raise exc.HTTPServiceUnavailable(explanation=error.msg)
         if checkpoint is not None:
             checkpoint_properties['id'] = checkpoint.get('checkpoint_id')
         else:
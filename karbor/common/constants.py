@@ -59,6 +59,18 @@ RESOURCE_STATUS_DELETING = 'deleting'
 RESOURCE_STATUS_DELETED = 'deleted'
 RESOURCE_STATUS_UNDEFINED = 'undefined'
 
+# protection priority
+PROTECTION_PRIORITIES = (
+    PROTECTION_PRIORITY_MANUAL,
+    PROTECTION_PRIORITY_SCHEDULED,
+) = (
+    'manual',
+    'scheduled',
+)
+
+# creator of the checkpoints of the scheduled operations
+OPERATION_ENGINE = 'operation-engine'
+
 # scheduled operation state
 OPERATION_STATE_INIT = 'init'
 OPERATION_STATE_REGISTERED = 'registered'
@@ -600,3 +600,48 @@ def checkpoint_record_get_all_by_filters_sort(
     return IMPL.checkpoint_record_get_all_by_filters_sort(
         context, filters, limit=limit, marker=marker,
         sort_keys=sort_keys, sort_dirs=sort_dirs)
+
+
+###################
+
+
+def bank_object_get(key):
+    """Get a bank object or raise if it does not exist."""
+    return IMPL.bank_object_get(key)
+
+
+def bank_objects_put(objects):
+    """Create or update several bank objects in one transaction.
+
+    objects maps every key to the values dictionary of its object.
+
+    """
+    return IMPL.bank_objects_put(objects)
+
+
+def bank_objects_get(keys):
+    """Get the existing bank objects among keys."""
+    return IMPL.bank_objects_get(keys)
+
+
+def bank_object_destroy(key):
+    """Destroy the bank object or raise if it does not exist."""
+    return IMPL.bank_object_destroy(key)
+
+
+def bank_objects_destroy(keys):
+    """Destroy several bank objects in one transaction."""
+    return IMPL.bank_objects_destroy(keys)
+
+
+def bank_object_get_all_keys(prefix=None, limit=None, marker=None,
+                             end_marker=None, sort_dir=None):
+    """Get the sorted keys of the bank objects in a key range.
+
+    The keys start with prefix and are after marker and before end_marker in
+    the direction given by sort_dir.
+
+    """
+    return IMPL.bank_object_get_all_keys(prefix, limit=limit, marker=marker,
+                                         end_marker=end_marker,
+                                         sort_dir=sort_dir)
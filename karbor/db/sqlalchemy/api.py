@@ -1352,6 +1352,92 @@ def checkpoint_record_get_all_by_filters_sort(
 ###############################
 
 
+def bank_object_get(key):
+    session = get_session()
+    result = session.query(models.BankObject).filter_by(key=key).first()
+    if not result:
+        raise exception.BankObjectNotFound(key=key)
+
+    return result
+
+
+def bank_objects_get(keys):
+    session = get_session()
+    return session.query(models.BankObject).filter(
+        models.BankObject.key.in_(list(keys))).all()
+
+
+def _is_duplicate_entry(exc):
+    return isinstance(exc, db_exc.DBDuplicateEntry)
+
+
+# A concurrent put may insert one of the keys between the select and the
+# insert below, the retry then finds the row and updates it
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True,
+                           exception_checker=_is_duplicate_entry)
+def bank_objects_put(objects):
+    session = get_session()
+    with session.begin():
+        existing = {
+            bank_object_ref.key: bank_object_ref
+            for bank_object_ref in session.query(models.BankObject).filter(
+                models.BankObject.key.in_(list(objects)))
+        }
+        for key, values in objects.items():
+            bank_object_ref = existing.get(key)
+            if bank_object_ref is None:
+                bank_object_ref = models.BankObject(key=key)
+                session.add(bank_object_ref)
+            bank_object_ref.update(values)
+
+
+@_retry_on_deadlock
+def bank_object_destroy(key):
+    session = get_session()
+    with session.begin():
+        count = session.query(models.BankObject).filter_by(
+            key=key).delete(synchronize_session=False)
+        if not count:
+            raise exception.BankObjectNotFound(key=key)
+
+
+@_retry_on_deadlock
+def bank_objects_destroy(keys):
+    session = get_session()
+    with session.begin():
+        session.query(models.BankObject).filter(
+            models.BankObject.key.in_(list(keys))).delete(
+                synchronize_session=False)
+
+
+def bank_object_get_all_keys(prefix, limit=None, marker=None,
+                             end_marker=None, sort_dir=None):
+    session = get_session()
+    key_column = models.BankObject.key
+    query = session.query(key_column)
+    if prefix:
+        # A range over the primary key instead of LIKE, which would need
+        # the wildcards in the prefix escaped and might not use the index
+        upper_bound = prefix[:-1] + six.unichr(ord(prefix[-1]) + 1)
+        query = query.filter(key_column >= prefix, key_column < upper_bound)
+
+    if sort_dir == "desc":
+        lower, upper = end_marker, marker
+        query = query.order_by(key_column.desc())
+    else:
+        lower, upper = marker, end_marker
+        query = query.order_by(key_column.asc())
+    if lower is not None:
+        query = query.filter(key_column > lower)
+    if upper is not None:
+        query = query.filter(key_column < upper)
+    if limit is not None:
+        query = query.limit(limit)
+
+    return [row[0] for row in query]
+###############################
+
+
 @require_context
 def _list_common_get_query(context, model, session=None):
     return model_query(context, model, session=session)
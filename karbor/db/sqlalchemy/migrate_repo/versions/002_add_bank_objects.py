@@ -0,0 +1,51 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Column, LargeBinary, MetaData, String, Table
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+
+
+def define_tables(meta):
+    bank_objects = Table(
+        'bank_objects',
+        meta,
+        # keys are compared byte by byte, SQLite does it by default
+        Column('key', String(length=255).with_variant(
+            mysql.VARCHAR(255, charset='utf8', collation='utf8_bin'),
+            'mysql').with_variant(
+            postgresql.VARCHAR(255, collation='C'), 'postgresql'),
+            primary_key=True, nullable=False),
+        Column('value_type', String(length=8), nullable=False),
+        Column('value', LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'),
+               nullable=False),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8'
+    )
+
+    return [bank_objects]
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for table in define_tables(meta):
+        table.create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for table in define_tables(meta):
+        table.drop()
@@ -17,8 +17,10 @@ from oslo_config import cfg
 from oslo_db.sqlalchemy import models
 from oslo_utils import timeutils
 from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import DateTime, Boolean, ForeignKey
+from sqlalchemy import DateTime, Boolean, ForeignKey, LargeBinary
 from sqlalchemy import orm
 
 CONF = cfg.CONF
@@ -215,6 +217,23 @@ class CheckpointRecord(BASE, KarborBase):
     extend_info = Column(Text)
 
 
+class BankObject(BASE, models.ModelBase):
+    """Represents an object of the SQL bank."""
+
+    __tablename__ = 'bank_objects'
+    __table_args__ = {'mysql_engine': 'InnoDB'}
+
+    # bank keys are compared and sorted byte by byte, like swift does
+    key = Column(String(255).with_variant(
+        mysql.VARCHAR(255, charset='utf8', collation='utf8_bin'), 'mysql'
+    ).with_variant(
+        postgresql.VARCHAR(255, collation='C'), 'postgresql'),
+        primary_key=True, nullable=False)
+    value_type = Column(String(8), nullable=False)
+    value = Column(LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql'),
+                   nullable=False)
+
+
 def register_models():
     """Register Models and create metadata.
 
@@ -231,7 +250,8 @@ def register_models():
               ScheduledOperationState,
               ScheduledOperationLog,
               Restore,
-              CheckpointRecord)
+              CheckpointRecord,
+              BankObject)
     engine = create_engine(CONF.database.connection, echo=False)
     for model in models:
         model.metadata.create_all(engine)
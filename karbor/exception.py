@@ -271,6 +271,10 @@ class CheckpointRecordNotFound(NotFound):
     message = _("CheckpointRecord %(id)s could not be found.")
 
 
+class BankObjectNotFound(NotFound):
+    message = _("Bank object %(key)s could not be found.")
+
+
 class CreateBackupFailed(KarborException):
     message = _("Create Backup failed: %(reason)s, id=%(resource_id)s,"
                 " type=%(resource_type)s")
@@ -350,3 +354,23 @@ class CheckpointNotAvailable(KarborException):
 
 class CheckpointNotBeDeleted(KarborException):
     message = _("The checkpoint %(checkpoint_id)s can not be deleted.")
+
+
+class ProviderBusy(KarborException):
+    message = _("Provider %(provider_id)s is busy, try again later")
+    code = 503
+
+
+class ResourceWaitFailed(KarborException):
+    message = _("%(resource_type)s %(resource_id)s reached status "
+                "%(status)s while waiting for it")
+
+
+class ResourceWaitTimeout(KarborException):
+    message = _("Timed out waiting for %(resource_type)s %(resource_id)s, "
+                "last status: %(status)s")
+
+
+class ResourceWaitCancelled(KarborException):
+    message = _("Waiting for %(resource_type)s %(resource_id)s was "
+                "cancelled")
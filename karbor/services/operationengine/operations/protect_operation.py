@@ -56,8 +56,11 @@ class ProtectOperation(base.Operation):
         client = cls._create_karbor_client(
             param.get("user_id"), param.get("project_id"))
         try:
-            client.checkpoints.create(operation_definition.get("provider_id"),
-                                      operation_definition.get("plan_id"))
+            client.checkpoints.create(
+                operation_definition.get("provider_id"),
+                operation_definition.get("plan_id"),
+                checkpoint_extra_info={
+                    "created_by": constants.OPERATION_ENGINE})
         except Exception:
             state = constants.OPERATION_EXE_STATE_FAILED
         else:
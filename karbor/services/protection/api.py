@@ -32,8 +32,9 @@ class API(base.Base):
     def restore(self, context, restore, restore_auth):
         return self.protection_rpcapi.restore(context, restore, restore_auth)
 
-    def protect(self, context, plan):
-        return self.protection_rpcapi.protect(context, plan)
+    def protect(self, context, plan, priority=None):
+        return self.protection_rpcapi.protect(context, plan,
+                                              priority=priority)
 
     def delete(self, context, provider_id, checkpoint_id):
         return self.protection_rpcapi.\
@@ -72,6 +73,14 @@ class API(base.Base):
                                         protectable_id,
                                         protectable_type)
 
+    def list_protectable_dependents_bulk(self, context,
+                                         protectable_ids,
+                                         protectable_type):
+        return self.protection_rpcapi.\
+            list_protectable_dependents_bulk(context,
+                                             protectable_ids,
+                                             protectable_type)
+
     def show_protectable_instance(self, context,
                                   protectable_type,
                                   protectable_id,
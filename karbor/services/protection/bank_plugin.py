@@ -11,15 +11,48 @@
 #    under the License.
 
 import abc
+import eventlet
+import hashlib
 import os
 import six
+import time
+import zlib
 
+from eventlet import tpool
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from karbor import exception
+from karbor.i18n import _, _LI, _LW
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+bank_opts = [
+    cfg.StrOpt('compression',
+               default='none',
+               choices=['none', 'zlib', 'lzma'],
+               help='The codec used to compress binary objects written to '
+                    'the bank'),
+    cfg.IntOpt('compression_level',
+               default=6,
+               min=0,
+               max=9,
+               help='The compression level of the bank codec'),
+]
 
 LOG = logging.getLogger(__name__)
 
+_CODEC_MAGIC = b"KARBOR-CODEC:"
+_NO_CODEC = "none"
+# objects smaller than this are not worth compressing
+_MIN_ENCODE_SIZE = 1024
+# objects at least this large are (de)compressed in a native thread, so the
+# green threads are not blocked by the codec
+_TPOOL_ENCODE_SIZE = 256 * 1024
+
 
 @six.add_metaclass(abc.ABCMeta)
 class LeasePlugin(object):
@@ -41,6 +74,9 @@ class LeasePlugin(object):
 
 @six.add_metaclass(abc.ABCMeta)
 class BankPlugin(object):
+    # How many objects the default batch operations handle concurrently
+    batch_concurrency = 16
+
     def __init__(self, config=None):
         self._config = config
 
@@ -58,7 +94,13 @@ class BankPlugin(object):
 
     @abc.abstractmethod
     def list_objects(self, prefix=None, limit=None, marker=None,
-                     sort_dir=None):
+                     sort_dir=None, end_marker=None):
+        """List the keys starting with prefix, sorted by key
+
+        The listing starts after marker and stops before end_marker. With
+        sort_dir "desc" the listing runs backwards, so marker is the upper
+        bound and end_marker the lower bound.
+        """
         return
 
     @abc.abstractmethod
@@ -69,10 +111,137 @@ class BankPlugin(object):
     def get_owner_id(self):
         return
 
+    def _run_batch(self, func, items):
+        items = list(items)
+        if not items:
+            return []
+        pool = eventlet.GreenPool(min(self.batch_concurrency, len(items)))
+        return list(pool.imap(func, items))
+
+    def create_objects(self, objects):
+        """Create or replace the objects of a key to value dict
+
+        The default implementation writes the objects concurrently, plugins
+        should override it when the backend can do better.
+        """
+        self._run_batch(lambda item: self.create_object(*item),
+                        objects.items())
+
+    def get_objects(self, keys):
+        """Get several objects as a key to value dict"""
+        keys = list(keys)
+        return dict(zip(keys, self._run_batch(self.get_object, keys)))
+
+    def delete_objects(self, keys):
+        """Delete several objects"""
+        self._run_batch(self.delete_object, keys)
+
+
+class Codec(object):
+    name = None
+
+    def __init__(self, level=None):
+        self._level = level
+
+    def compress(self, data):
+        raise NotImplementedError()
+
+    def decompress(self, data):
+        raise NotImplementedError()
+
+
+class ZlibCodec(Codec):
+    name = "zlib"
+
+    def compress(self, data):
+        if self._level is None:
+            return zlib.compress(data)
+        return zlib.compress(data, self._level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class LzmaCodec(Codec):
+    name = "lzma"
+
+    def compress(self, data):
+        return lzma.compress(data, preset=self._level)
+
+    def decompress(self, data):
+        return lzma.decompress(data)
+
+
+_CODECS = {
+    ZlibCodec.name: ZlibCodec,
+    LzmaCodec.name: LzmaCodec,
+}
+
+
+def get_codec(name, level=None):
+    """Return the codec called name, or None for no compression"""
+    if not name or name == _NO_CODEC:
+        return None
+    if name not in _CODECS:
+        raise exception.InvalidInput(
+            reason=_("Unsupported bank compression: %s") % name)
+    if name == LzmaCodec.name and lzma is None:
+        raise exception.InvalidInput(
+            reason=_("lzma compression is not available"))
+    return _CODECS[name](level)
+
+
+def _codec_header(name):
+    return _CODEC_MAGIC + name.encode("ascii") + b"\n"
+
+
+def _run_codec(func, data):
+    if len(data) >= _TPOOL_ENCODE_SIZE:
+        return tpool.execute(func, data)
+    return func(data)
+
 
 class Bank(object):
-    def __init__(self, plugin):
+    def __init__(self, plugin, codec=None):
         self._plugin = plugin
+        self._codec = codec
+
+    @property
+    def codec(self):
+        return self._codec
+
+    def _encode(self, value):
+        """Frames binary values, compressing them with the bank codec
+
+        Bank plugins do not keep object metadata, so the codec name is
+        recorded in a header in front of the data. Every binary value is
+        framed, "none" marking the uncompressed ones, so a payload which
+        happens to start like a header is never mistaken for one, and
+        objects can be decoded regardless of the codec currently configured.
+        """
+        if not isinstance(value, six.binary_type):
+            return value
+
+        if self._codec is not None and len(value) >= _MIN_ENCODE_SIZE:
+            header = _codec_header(self._codec.name)
+            compressed = _run_codec(self._codec.compress, value)
+            if len(header) + len(compressed) < len(value):
+                return header + compressed
+        return _codec_header(_NO_CODEC) + value
+
+    @staticmethod
+    def _decode(value):
+        # values written before framing was introduced have no header
+        if (not isinstance(value, six.binary_type) or
+                not value.startswith(_CODEC_MAGIC)):
+            return value
+
+        name, _sep, payload = value[len(_CODEC_MAGIC):].partition(b"\n")
+        name = name.decode("ascii")
+        if name == _NO_CODEC:
+            return payload
+        codec = get_codec(name)
+        return _run_codec(codec.decompress, payload)
 
     def _normalize_key(self, key):
         """Normalizes the key
@@ -90,16 +259,18 @@ class Bank(object):
         return key
 
     def create_object(self, key, value):
-        return self._plugin.create_object(self._normalize_key(key), value)
+        return self._plugin.create_object(self._normalize_key(key),
+                                          self._encode(value))
 
     def update_object(self, key, value):
-        return self._plugin.update_object(self._normalize_key(key), value)
+        return self._plugin.update_object(self._normalize_key(key),
+                                          self._encode(value))
 
     def get_object(self, key):
-        return self._plugin.get_object(self._normalize_key(key))
+        return self._decode(self._plugin.get_object(self._normalize_key(key)))
 
     def list_objects(self, prefix=None, limit=None, marker=None,
-                     sort_dir=None):
+                     sort_dir=None, end_marker=None):
         if not prefix:
             prefix = "/"
 
@@ -107,12 +278,28 @@ class Bank(object):
             prefix=self._normalize_key(prefix) + "/",
             limit=limit,
             marker=marker,
-            sort_dir=sort_dir
+            sort_dir=sort_dir,
+            end_marker=end_marker
         )
 
     def delete_object(self, key):
         return self._plugin.delete_object(self._normalize_key(key))
 
+    def create_objects(self, objects):
+        return self._plugin.create_objects(
+            {self._normalize_key(key): self._encode(value)
+             for key, value in objects.items()})
+
+    def get_objects(self, keys):
+        keys = {self._normalize_key(key): key for key in keys}
+        values = self._plugin.get_objects(list(keys))
+        return {keys[key]: self._decode(value)
+                for key, value in values.items()}
+
+    def delete_objects(self, keys):
+        return self._plugin.delete_objects(
+            [self._normalize_key(key) for key in keys])
+
     def get_sub_section(self, prefix, is_writable=True):
         return BankSection(self, prefix, is_writable)
 
@@ -148,6 +335,10 @@ class BankSection(object):
     def is_writable(self):
         return self._is_writable
 
+    @property
+    def codec(self):
+        return self._bank.codec
+
     @staticmethod
     def _validate_key(key):
         if not key:
@@ -171,6 +362,10 @@ class BankSection(object):
         if not self.is_writable:
             raise exception.BankReadonlyViolation()
 
+    def get_bank_key(self, key):
+        """The key of an object of the section in the whole bank"""
+        return self._prepend_prefix(key)
+
     def create_object(self, key, value):
         self._validate_writable()
         return self._bank.create_object(
@@ -191,7 +386,7 @@ class BankSection(object):
         )
 
     def list_objects(self, prefix=None, limit=None, marker=None,
-                     sort_dir=None):
+                     sort_dir=None, end_marker=None):
         if not prefix:
             prefix = self._prefix
         else:
@@ -200,12 +395,16 @@ class BankSection(object):
         if marker is not None:
             marker = self._prepend_prefix(marker)
 
+        if end_marker is not None:
+            end_marker = self._prepend_prefix(end_marker)
+
         return [key[len(self._prefix) + 1:]
                 for key in self._bank.list_objects(
                     prefix,
                     limit,
                     marker,
-                    sort_dir
+                    sort_dir,
+                    end_marker
                     )
                 ]
 
@@ -215,6 +414,149 @@ class BankSection(object):
             self._prepend_prefix(key),
         )
 
+    def create_objects(self, objects):
+        self._validate_writable()
+        return self._bank.create_objects(
+            {self._prepend_prefix(key): value
+             for key, value in objects.items()})
+
+    def get_objects(self, keys):
+        keys = {self._prepend_prefix(key): key for key in keys}
+        values = self._bank.get_objects(list(keys))
+        return {keys[key]: value for key, value in values.items()}
+
+    def delete_objects(self, keys):
+        self._validate_writable()
+        return self._bank.delete_objects(
+            [self._prepend_prefix(key) for key in keys])
+
     @property
     def bank(self):
         return self._bank
+
+
+class ChunkStore(object):
+    """Content addressed chunk store on top of a bank
+
+    Every distinct chunk is stored once, as /chunks/<digest>/data. Each user
+    of a chunk holds a reference object /chunks/<digest>/refs/<ref_id>.
+
+    Releasing the last reference does not delete the chunk: bank listings
+    may be stale, and a concurrent put may have just added a reference. The
+    released digest is recorded as a candidate under /chunks_gc instead, and
+    collect_garbage() reclaims the candidates which are still unreferenced
+    once their grace period is over.
+    """
+    _DATA_NAME = "data"
+    _REFS_NAME = "refs"
+    _GC_SUFFIX = "_gc"
+
+    def __init__(self, bank, prefix="/chunks"):
+        self._section = bank.get_sub_section(prefix)
+        self._gc_section = bank.get_sub_section(prefix + self._GC_SUFFIX)
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def _data_key(self, digest):
+        return "%s/%s" % (digest, self._DATA_NAME)
+
+    def _refs_prefix(self, digest):
+        return "%s/%s" % (digest, self._REFS_NAME)
+
+    def _ref_key(self, digest, ref_id):
+        return "%s/%s" % (self._refs_prefix(digest), ref_id)
+
+    def has_chunk(self, digest):
+        # "data" sorts before "refs/...", so the first key is enough
+        keys = self._section.list_objects(prefix=digest, limit=1)
+        return self._data_key(digest) in keys
+
+    def _has_refs(self, digest):
+        return bool(self._section.list_objects(
+            prefix=self._refs_prefix(digest), limit=1))
+
+    def put_chunk(self, data, ref_id):
+        """Add a reference to a chunk and store the chunk, if needed
+
+        The reference is written first, so the garbage collector sees it
+        before it could reclaim the data this put relies on. A stale listing
+        only makes the data be written again, which is harmless.
+
+        :return: the digest identifying the chunk
+        """
+        digest = self.digest(data)
+        self._section.create_object(self._ref_key(digest, ref_id), ref_id)
+        if not self.has_chunk(digest):
+            self._section.create_object(self._data_key(digest), data)
+        return digest
+
+    def get_object(self, digest):
+        return self._section.get_object(self._data_key(digest))
+
+    def release_chunk(self, digest, ref_id):
+        """Drop a reference to a chunk and make it a reclaim candidate"""
+        try:
+            self._section.delete_object(self._ref_key(digest, ref_id))
+        except exception.BankDeleteObjectFailed:
+            LOG.warning(_LW("chunk %(digest)s reference %(ref)s not found"),
+                        {"digest": digest, "ref": ref_id})
+        self._gc_section.create_object(digest, time.time())
+
+    def release_chunks(self, digests, ref_id):
+        """Drop the references of ref_id to several chunks"""
+        digests = set(digests)
+        if not digests:
+            return
+        pool = eventlet.GreenPool(min(len(digests),
+                                      BankPlugin.batch_concurrency))
+        list(pool.imap(lambda digest: self.release_chunk(digest, ref_id),
+                       digests))
+
+    def collect_garbage(self, grace_period):
+        """Reclaim the released chunks which are still unreferenced
+
+        Only chunks released at least grace_period seconds ago are
+        considered, which leaves time for the references written meanwhile
+        to show up in the bank listings.
+
+        :return: the number of chunks deleted
+        """
+        deadline = time.time() - grace_period
+        reclaimed = 0
+        for digest in self._gc_section.list_objects():
+            try:
+                released_at = self._gc_section.get_object(digest)
+            except exception.BankGetObjectFailed:
+                continue
+            if released_at > deadline:
+                continue
+            if self._reclaim_chunk(digest):
+                reclaimed += 1
+            try:
+                self._gc_section.delete_object(digest)
+            except exception.BankDeleteObjectFailed:
+                pass
+        return reclaimed
+
+    def _reclaim_chunk(self, digest):
+        if self._has_refs(digest):
+            return False
+        try:
+            data = self.get_object(digest)
+            self._section.delete_object(self._data_key(digest))
+        except (exception.BankGetObjectFailed,
+                exception.BankDeleteObjectFailed):
+            # already reclaimed by another pass
+            return False
+
+        # A put may have added its reference and found the data between the
+        # check above and the delete, so the data is put back for it.
+        if self._has_refs(digest):
+            LOG.info(_LI("chunk %s was referenced while being reclaimed, "
+                         "restoring it"), digest)
+            self._section.create_object(self._data_key(digest), data)
+            return False
+        LOG.debug("deleted unreferenced chunk %s", digest)
+        return True
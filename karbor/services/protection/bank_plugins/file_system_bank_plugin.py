@@ -0,0 +1,258 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import itertools
+import json
+import os
+import six
+import tempfile
+
+from eventlet import tpool
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import excutils
+from oslo_utils import uuidutils
+
+from karbor import exception
+from karbor.i18n import _, _LE
+from karbor.services.protection.bank_plugin import BankPlugin
+
+file_system_bank_plugin_opts = [
+    cfg.StrOpt('file_system_bank_path',
+               default='/var/lib/karbor/bank',
+               help='The directory the bank objects are stored in.'),
+    cfg.BoolOpt('file_system_bank_fsync',
+                default=True,
+                help='Flush every object to stable storage before it '
+                     'replaces the previous version.'),
+    cfg.IntOpt('file_system_bank_tpool_threshold',
+               default=256 * 1024,
+               min=0,
+               help='Objects at least this large, in bytes, are read and '
+                    'written in a native thread so the green threads are '
+                    'not blocked by the disk I/O.'),
+]
+
+LOG = logging.getLogger(__name__)
+
+_TMP_PREFIX = ".tmp-"
+
+# The first byte of every object file tells how to decode the rest of it
+_TAG_BINARY = b"b"
+_TAG_TEXT = b"t"
+_TAG_SERIALIZED = b"j"
+
+
+class FileSystemBankPlugin(BankPlugin):
+    """Bank plugin keeping the objects in a local or shared directory
+
+    Every key is mapped to a file below file_system_bank_path. Objects are
+    written to a temporary file which is then renamed over the old version,
+    so readers never see a partially written object. As keys are paths, a
+    key can not also be the prefix of other keys ("a" and "a/b").
+
+    Leases are not supported.
+    """
+    def __init__(self, config, context=None):
+        super(FileSystemBankPlugin, self).__init__(config)
+        self._config.register_opts(file_system_bank_plugin_opts,
+                                   "file_system_bank_plugin")
+        plugin_cfg = self._config.file_system_bank_plugin
+        self._root = os.path.abspath(plugin_cfg.file_system_bank_path)
+        self._fsync = plugin_cfg.file_system_bank_fsync
+        self._tpool_threshold = plugin_cfg.file_system_bank_tpool_threshold
+        self.owner_id = uuidutils.generate_uuid()
+
+        try:
+            self._makedirs(self._root)
+        except OSError as err:
+            LOG.error(_LE("bank plugin create directory failed."))
+            raise exception.CreateContainerFailed(reason=err)
+
+    @staticmethod
+    def _makedirs(path):
+        try:
+            os.makedirs(path)
+        except OSError as err:
+            if err.errno != errno.EEXIST or not os.path.isdir(path):
+                raise
+
+    def _get_path(self, key):
+        path = os.path.normpath(os.path.join(self._root, key.lstrip("/")))
+        if not path.startswith(self._root + os.sep):
+            raise exception.InvalidParameterValue(
+                err=_("Invalid bank key: %s") % key)
+        return path
+
+    def get_owner_id(self):
+        return self.owner_id
+
+    def _execute(self, size, func, *args):
+        if size >= self._tpool_threshold:
+            return tpool.execute(func, *args)
+        return func(*args)
+
+    def _write_file(self, path, tag, data):
+        directory = os.path.dirname(path)
+        # A concurrent delete may remove the directory between makedirs and
+        # the creation of the temporary file, in which case try again
+        for attempt in range(3):
+            self._makedirs(directory)
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=directory,
+                                                prefix=_TMP_PREFIX)
+                break
+            except OSError as err:
+                if err.errno != errno.ENOENT or attempt == 2:
+                    raise
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(tag)
+                f.write(data)
+                if self._fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.rename(tmp_path, path)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                os.unlink(tmp_path)
+
+    def _put_object(self, key, value):
+        if isinstance(value, six.binary_type):
+            tag, data = _TAG_BINARY, value
+        elif isinstance(value, six.text_type):
+            tag, data = _TAG_TEXT, value.encode("utf-8")
+        else:
+            tag, data = _TAG_SERIALIZED, json.dumps(value).encode("utf-8")
+        self._execute(len(data), self._write_file, self._get_path(key), tag,
+                      data)
+
+    def create_object(self, key, value):
+        try:
+            self._put_object(key, value)
+        except (IOError, OSError) as err:
+            LOG.error(_LE("create object failed, err: %s."), err)
+            raise exception.BankCreateObjectFailed(reason=err, key=key)
+
+    def update_object(self, key, value):
+        try:
+            self._put_object(key, value)
+        except (IOError, OSError) as err:
+            LOG.error(_LE("update object failed, err: %s."), err)
+            raise exception.BankUpdateObjectFailed(reason=err, key=key)
+
+    @staticmethod
+    def _read_file(f):
+        return f.read()
+
+    def get_object(self, key):
+        try:
+            with open(self._get_path(key), "rb") as f:
+                tag = f.read(1)
+                size = os.fstat(f.fileno()).st_size
+                data = self._execute(size, self._read_file, f)
+        except (IOError, OSError) as err:
+            LOG.error(_LE("get object failed, err: %s."), err)
+            raise exception.BankGetObjectFailed(reason=err, key=key)
+
+        if tag == _TAG_TEXT:
+            return data.decode("utf-8")
+        elif tag == _TAG_SERIALIZED:
+            return json.loads(data.decode("utf-8"))
+        return data
+
+    def _iter_keys(self, directory_key, prefix, lower, upper, reverse):
+        """Walk the keys below directory_key in key order
+
+        Directory entries are sorted as if directories were named with a
+        trailing "/", which yields the keys in the same order as sorting
+        the complete keys would. Sub directories which can not hold keys in
+        range are not visited at all.
+        """
+        path = os.path.join(self._root, directory_key.lstrip("/"))
+        try:
+            names = os.listdir(path)
+        except OSError as err:
+            if err.errno == errno.ENOENT:
+                return
+            raise
+
+        entries = []
+        for name in names:
+            if name.startswith(_TMP_PREFIX):
+                continue
+            key = "%s/%s" % (directory_key, name)
+            if os.path.isdir(os.path.join(path, name)):
+                entries.append((key + "/", key, True))
+            else:
+                entries.append((key, key, False))
+        entries.sort(reverse=reverse)
+
+        for sort_key, key, is_directory in entries:
+            if is_directory:
+                # Every key in the directory starts with sort_key and is
+                # greater than it
+                if not (sort_key.startswith(prefix) or
+                        prefix.startswith(sort_key)):
+                    continue
+                if (lower is not None and sort_key < lower and
+                        not lower.startswith(sort_key)):
+                    continue
+                if upper is not None and sort_key >= upper:
+                    continue
+                for sub_key in self._iter_keys(key, prefix, lower, upper,
+                                               reverse):
+                    yield sub_key
+            else:
+                if not key.startswith(prefix):
+                    continue
+                if lower is not None and key <= lower:
+                    continue
+                if upper is not None and key >= upper:
+                    continue
+                yield key
+
+    def list_objects(self, prefix=None, limit=None, marker=None,
+                     sort_dir=None, end_marker=None):
+        prefix = prefix or "/"
+        reverse = sort_dir == "desc"
+        if reverse:
+            lower, upper = end_marker, marker
+        else:
+            lower, upper = marker, end_marker
+        # Start from the deepest directory every matching key is in
+        directory_key = prefix[:prefix.rfind("/")]
+        try:
+            keys = self._iter_keys(directory_key, prefix, lower, upper,
+                                   reverse)
+            return list(itertools.islice(keys, limit))
+        except OSError as err:
+            LOG.error(_LE("list objects failed, err: %s."), err)
+            raise exception.BankListObjectsFailed(reason=err)
+
+    def delete_object(self, key):
+        path = self._get_path(key)
+        try:
+            os.remove(path)
+        except OSError as err:
+            LOG.error(_LE("delete object failed, err: %s."), err)
+            raise exception.BankDeleteObjectFailed(reason=err, key=key)
+
+        # Remove the directories left empty so listings do not walk them
+        directory = os.path.dirname(path)
+        while directory != self._root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
@@ -0,0 +1,172 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import six
+
+from oslo_config import cfg
+from oslo_db import exception as db_exc
+from oslo_log import log as logging
+from oslo_utils import uuidutils
+
+from karbor import db
+from karbor import exception
+from karbor.i18n import _, _LE
+from karbor.services.protection.bank_plugin import BankPlugin
+
+sql_bank_plugin_opts = [
+    cfg.IntOpt('sql_bank_max_object_size',
+               default=1024 * 1024,
+               min=1,
+               help='Largest object, in bytes, the SQL bank stores. Larger '
+                    'objects are rejected. Every object is written in a '
+                    'single row, so this must stay below the largest '
+                    'statement the database accepts (max_allowed_packet of '
+                    'MySQL, 4 MiB by default before 8.0). When the SQL bank '
+                    'holds image backups, backup_image_object_size must not '
+                    'exceed it.'),
+]
+
+LOG = logging.getLogger(__name__)
+
+_TYPE_BINARY = "binary"
+_TYPE_TEXT = "text"
+_TYPE_SERIALIZED = "json"
+
+
+class SqlBankPlugin(BankPlugin):
+    """Bank plugin keeping the objects in a table of the karbor database
+
+    Keys are the primary key of the table, so listings are range scans over
+    the index and several keys can be written in one transaction. It suits
+    the small metadata objects best: the checkpoint documents, indices and
+    statuses. Objects larger than sql_bank_max_object_size are rejected.
+
+    Leases are not supported.
+    """
+    def __init__(self, config, context=None):
+        super(SqlBankPlugin, self).__init__(config)
+        self._config.register_opts(sql_bank_plugin_opts, "sql_bank_plugin")
+        self._max_object_size = \
+            self._config.sql_bank_plugin.sql_bank_max_object_size
+        self.owner_id = uuidutils.generate_uuid()
+
+    def get_owner_id(self):
+        return self.owner_id
+
+    @staticmethod
+    def _to_values(value):
+        if isinstance(value, six.binary_type):
+            return {"value_type": _TYPE_BINARY, "value": value}
+        elif isinstance(value, six.text_type):
+            return {"value_type": _TYPE_TEXT, "value": value.encode("utf-8")}
+        return {"value_type": _TYPE_SERIALIZED,
+                "value": json.dumps(value).encode("utf-8")}
+
+    @staticmethod
+    def _from_values(bank_object):
+        value = bank_object.value
+        if bank_object.value_type == _TYPE_TEXT:
+            return value.decode("utf-8")
+        elif bank_object.value_type == _TYPE_SERIALIZED:
+            return json.loads(value.decode("utf-8"))
+        return value
+
+    def _oversized_keys(self, values):
+        return [key for key, key_values in values.items()
+                if len(key_values["value"]) > self._max_object_size]
+
+    def _oversized_reason(self):
+        return _("object larger than sql_bank_max_object_size "
+                 "(%d bytes)") % self._max_object_size
+
+    def create_objects(self, objects):
+        """Create or update several objects in one transaction"""
+        values = {key: self._to_values(value)
+                  for key, value in objects.items()}
+        oversized = self._oversized_keys(values)
+        if oversized:
+            reason = self._oversized_reason()
+            LOG.error(_LE("create objects failed, err: %s."), reason)
+            raise exception.BankCreateObjectFailed(
+                reason=reason, key=", ".join(oversized))
+        try:
+            db.bank_objects_put(values)
+        except db_exc.DBError as err:
+            LOG.error(_LE("create objects failed, err: %s."), err)
+            raise exception.BankCreateObjectFailed(
+                reason=err, key=", ".join(objects))
+
+    def create_object(self, key, value):
+        self.create_objects({key: value})
+
+    def update_object(self, key, value):
+        values = {key: self._to_values(value)}
+        if self._oversized_keys(values):
+            reason = self._oversized_reason()
+            LOG.error(_LE("update object failed, err: %s."), reason)
+            raise exception.BankUpdateObjectFailed(reason=reason, key=key)
+        try:
+            db.bank_objects_put(values)
+        except db_exc.DBError as err:
+            LOG.error(_LE("update object failed, err: %s."), err)
+            raise exception.BankUpdateObjectFailed(reason=err, key=key)
+
+    def get_object(self, key):
+        try:
+            return self._from_values(db.bank_object_get(key))
+        except (exception.BankObjectNotFound, db_exc.DBError) as err:
+            LOG.error(_LE("get object failed, err: %s."), err)
+            raise exception.BankGetObjectFailed(reason=err, key=key)
+
+    def get_objects(self, keys):
+        keys = list(keys)
+        try:
+            bank_objects = db.bank_objects_get(keys)
+        except db_exc.DBError as err:
+            LOG.error(_LE("get objects failed, err: %s."), err)
+            raise exception.BankGetObjectFailed(reason=err,
+                                                key=", ".join(keys))
+        values = {bank_object.key: self._from_values(bank_object)
+                  for bank_object in bank_objects}
+        missing = set(keys) - set(values)
+        if missing:
+            raise exception.BankGetObjectFailed(
+                reason=exception.BankObjectNotFound(key=", ".join(missing)),
+                key=", ".join(missing))
+        return values
+
+    def list_objects(self, prefix=None, limit=None, marker=None,
+                     sort_dir=None, end_marker=None):
+        try:
+            return db.bank_object_get_all_keys(
+                prefix=prefix, limit=limit, marker=marker,
+                end_marker=end_marker, sort_dir=sort_dir)
+        except db_exc.DBError as err:
+            LOG.error(_LE("list objects failed, err: %s."), err)
+            raise exception.BankListObjectsFailed(reason=err)
+
+    def delete_object(self, key):
+        try:
+            db.bank_object_destroy(key)
+        except (exception.BankObjectNotFound, db_exc.DBError) as err:
+            LOG.error(_LE("delete object failed, err: %s."), err)
+            raise exception.BankDeleteObjectFailed(reason=err, key=key)
+
+    def delete_objects(self, keys):
+        keys = list(keys)
+        try:
+            db.bank_objects_destroy(keys)
+        except db_exc.DBError as err:
+            LOG.error(_LE("delete objects failed, err: %s."), err)
+            raise exception.BankDeleteObjectFailed(reason=err,
+                                                   key=", ".join(keys))
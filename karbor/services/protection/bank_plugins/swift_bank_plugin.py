@@ -10,12 +10,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+from eventlet import semaphore
 import json
 import math
+import six
+from six.moves.urllib import parse
 import time
 
 from karbor import exception
-from karbor.i18n import _, _LE
+from karbor.i18n import _, _LE, _LI, _LW
 from karbor.services.protection.bank_plugin import BankPlugin
 from karbor.services.protection.bank_plugin import LeasePlugin
 from karbor.services.protection import client_factory
@@ -29,6 +33,24 @@ swift_bank_plugin_opts = [
     cfg.StrOpt('bank_swift_object_container',
                default='karbor',
                help='The default swift container to use.'),
+    cfg.BoolOpt('bank_swift_reverse_listing',
+                default=True,
+                help='Use reverse container listings for descending '
+                     'listings. Disable for Swift clusters which do not '
+                     'support the reverse query parameter, descending '
+                     'listings then read the whole container listing.'),
+    cfg.IntOpt('bank_swift_connection_pool_size',
+               default=16,
+               min=1,
+               help='The maximum number of connections to swift the bank '
+                    'plugin keeps open. Requests beyond that wait for a '
+                    'free connection.'),
+    cfg.IntOpt('bank_swift_connection_check_interval',
+               default=60,
+               min=0,
+               help='Connections idle for longer than this, in seconds, '
+                    'are checked with a HEAD request before they are '
+                    'used again.'),
 ]
 
 LOG = logging.getLogger(__name__)
@@ -49,6 +71,78 @@ class SwiftConnectionFailed(exception.KarborException):
     message = _("Connection to swift failed: %(reason)s")
 
 
+class SwiftConnectionPool(object):
+    """Bounded pool of swift connections
+
+    Every request checks a connection out for its duration, so concurrent
+    requests do not queue on one connection and each connection keeps its
+    HTTP connection alive between requests. Connections which failed below
+    HTTP, or fail the check after being idle, are closed and replaced.
+
+    Connections set up with credentials are re-authenticated by swiftclient
+    itself. A 401 reaching the pool means the token could not be renewed,
+    as with the preauthenticated connections, so the request fails and the
+    connection is closed rather than reused.
+    """
+    def __init__(self, create_connection, max_size, check_interval):
+        self._create_connection = create_connection
+        self._semaphore = semaphore.Semaphore(max_size)
+        self._idle = collections.deque()
+        self.check_interval = check_interval
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(connection):
+        try:
+            connection.head_account()
+            return True
+        except Exception as err:
+            LOG.info(_LI("dropping idle swift connection, err: %s."), err)
+            return False
+
+    def _acquire(self):
+        # The most recently used connections are the least likely to have
+        # been closed by the server
+        while self._idle:
+            connection, last_used = self._idle.pop()
+            if (time.time() - last_used < self.check_interval or
+                    self._is_healthy(connection)):
+                return connection
+            self._close(connection)
+        return self._create_connection()
+
+    def _release(self, connection):
+        self._idle.append((connection, time.time()))
+
+    def call(self, method, *args, **kwargs):
+        with self._semaphore:
+            connection = self._acquire()
+            try:
+                result = getattr(connection, method)(*args, **kwargs)
+            except ClientException as err:
+                if err.http_status in (None, 401):
+                    self._close(connection)
+                else:
+                    self._release(connection)
+                raise
+            except Exception:
+                self._close(connection)
+                raise
+            self._release(connection)
+            return result
+
+    def close(self):
+        while self._idle:
+            connection, _last_used = self._idle.pop()
+            self._close(connection)
+
+
 class SwiftBankPlugin(BankPlugin, LeasePlugin):
     def __init__(self, config, context=None):
         super(SwiftBankPlugin, self).__init__(config)
@@ -58,6 +152,11 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
                                    "swift_bank_plugin")
         self.bank_object_container = \
             self._config.swift_bank_plugin.bank_swift_object_container
+        self.reverse_listing = \
+            self._config.swift_bank_plugin.bank_swift_reverse_listing
+        # the number of objects a bulk delete request may hold, 0 when bulk
+        # deletes are not supported and None until the cluster is asked
+        self._bulk_delete_max = None
         self.lease_expire_window = \
             self._config.swift_bank_plugin.lease_expire_window
         self.lease_renew_window = \
@@ -73,7 +172,11 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
         self.owner_id = uuidutils.generate_uuid()
         self.lease_expire_time = 0
         self.bank_leases_container = "leases"
-        self.connection = self._setup_connection()
+        self.connection_pool = SwiftConnectionPool(
+            self._setup_connection,
+            self._config.swift_bank_plugin.bank_swift_connection_pool_size,
+            self._config.swift_bank_plugin.
+            bank_swift_connection_check_interval)
 
         # create container
         try:
@@ -107,7 +210,7 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
     def create_object(self, key, value):
         serialized = False
         try:
-            if not isinstance(value, str):
+            if not isinstance(value, (str, six.binary_type)):
                 value = json.dumps(value)
                 serialized = True
             self._put_object(container=self.bank_object_container,
@@ -124,7 +227,7 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
     def update_object(self, key, value):
         serialized = False
         try:
-            if not isinstance(value, str):
+            if not isinstance(value, (str, six.binary_type)):
                 value = json.dumps(value)
                 serialized = True
             self._put_object(container=self.bank_object_container,
@@ -147,6 +250,33 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
             raise exception.BankDeleteObjectFailed(reason=err,
                                                    key=key)
 
+    def _get_bulk_delete_max(self):
+        if self._bulk_delete_max is None:
+            try:
+                capabilities = self.connection_pool.call("get_capabilities")
+            except ClientException as err:
+                LOG.warning(_LW("unable to get swift capabilities, err: "
+                                "%s."), err)
+                capabilities = {}
+            self._bulk_delete_max = capabilities.get(
+                "bulk_delete", {}).get("max_deletes_per_request", 0)
+        return self._bulk_delete_max
+
+    def delete_objects(self, keys):
+        keys = list(keys)
+        bulk_delete_max = self._get_bulk_delete_max()
+        if not bulk_delete_max:
+            return super(SwiftBankPlugin, self).delete_objects(keys)
+
+        for start in range(0, len(keys), bulk_delete_max):
+            batch = keys[start:start + bulk_delete_max]
+            try:
+                self._bulk_delete(self.bank_object_container, batch)
+            except SwiftConnectionFailed as err:
+                LOG.error(_LE("delete objects failed, err: %s."), err)
+                raise exception.BankDeleteObjectFailed(reason=err,
+                                                       key=", ".join(batch))
+
     def get_object(self, key):
         try:
             return self._get_object(container=self.bank_object_container,
@@ -157,18 +287,28 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
                                                 key=key)
 
     def list_objects(self, prefix=None, limit=None, marker=None,
-                     sort_dir=None):
+                     sort_dir=None, end_marker=None):
         try:
-            if sort_dir == "desc":
+            if sort_dir == "desc" and self.reverse_listing:
+                # In a reverse listing swift walks backwards from marker to
+                # end_marker, which is what the bank plugin API asks for
+                body = self._get_container(
+                    container=self.bank_object_container,
+                    prefix=prefix, limit=limit, marker=marker,
+                    end_marker=end_marker, query_string="reverse=true")
+                return [obj.get("name") for obj in body]
+            elif sort_dir == "desc":
                 body = self._get_container(
                     container=self.bank_object_container,
-                    prefix=prefix, end_marker=marker)
+                    prefix=prefix, marker=end_marker, end_marker=marker,
+                    full_listing=True)
                 limit_objects = body[-limit:] if limit is not None else body
-                return [obj.get("name") for obj in limit_objects]
+                return [obj.get("name") for obj in reversed(limit_objects)]
             else:
                 body = self._get_container(
                     container=self.bank_object_container,
-                    prefix=prefix, limit=limit, marker=marker)
+                    prefix=prefix, limit=limit, marker=marker,
+                    end_marker=end_marker)
                 return [obj.get("name") for obj in body]
         except SwiftConnectionFailed as err:
             LOG.error(_LE("list objects failed, err: %s."), err)
@@ -212,17 +352,19 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
 
     def _put_object(self, container, obj, contents, headers=None):
         try:
-            self.connection.put_object(container=container,
-                                       obj=obj,
-                                       contents=contents,
-                                       headers=headers)
+            self.connection_pool.call("put_object",
+                                      container=container,
+                                      obj=obj,
+                                      contents=contents,
+                                      headers=headers)
         except ClientException as err:
             raise SwiftConnectionFailed(reason=err)
 
     def _get_object(self, container, obj):
         try:
-            (_resp, body) = self.connection.get_object(container=container,
-                                                       obj=obj)
+            (_resp, body) = self.connection_pool.call("get_object",
+                                                      container=container,
+                                                      obj=obj)
             if _resp.get("x-object-meta-serialized").lower() == "true":
                 body = json.loads(body)
             return body
@@ -231,34 +373,57 @@ class SwiftBankPlugin(BankPlugin, LeasePlugin):
 
     def _post_object(self, container, obj, headers):
         try:
-            self.connection.post_object(container=container,
-                                        obj=obj,
-                                        headers=headers)
+            self.connection_pool.call("post_object",
+                                      container=container,
+                                      obj=obj,
+                                      headers=headers)
+        except ClientException as err:
+            raise SwiftConnectionFailed(reason=err)
+
+    def _bulk_delete(self, container, objs):
+        # Objects which do not exist are not reported as errors
+        data = "\n".join(parse.quote("/%s/%s" % (container, obj))
+                         for obj in objs)
+        try:
+            (_resp, body) = self.connection_pool.call(
+                "post_account",
+                headers={"Accept": "application/json",
+                         "Content-Type": "text/plain"},
+                query_string="bulk-delete",
+                data=data)
         except ClientException as err:
             raise SwiftConnectionFailed(reason=err)
+        result = json.loads(body)
+        if result.get("Errors"):
+            raise SwiftConnectionFailed(reason=result["Errors"])
 
     def _delete_object(self, container, obj):
         try:
-            self.connection.delete_object(container=container,
-                                          obj=obj)
+            self.connection_pool.call("delete_object",
+                                      container=container,
+                                      obj=obj)
         except ClientException as err:
             raise SwiftConnectionFailed(reason=err)
 
     def _put_container(self, container):
         try:
-            self.connection.put_container(container=container)
+            self.connection_pool.call("put_container", container=container)
         except ClientException as err:
             raise SwiftConnectionFailed(reason=err)
 
     def _get_container(self, container, prefix=None, limit=None, marker=None,
-                       end_marker=None):
+                       end_marker=None, full_listing=False,
+                       query_string=None):
         try:
-            (_resp, body) = self.connection.get_container(
+            (_resp, body) = self.connection_pool.call(
+                "get_container",
                 container=container,
                 prefix=prefix,
                 limit=limit,
                 marker=marker,
-                end_marker=end_marker)
+                end_marker=end_marker,
+                full_listing=full_listing,
+                query_string=query_string)
             return body
         except ClientException as err:
             raise SwiftConnectionFailed(reason=err)
@@ -10,17 +10,44 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from datetime import datetime
+import collections
+import copy
+from datetime import timedelta
+import eventlet
+import time
+
 from karbor.common import constants
 from karbor import exception
 from karbor.i18n import _, _LE
 from karbor.services.protection import graph
+from karbor.services.protection import status_aggregator
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
+checkpoint_opts = [
+    cfg.IntOpt('checkpoint_cache_size',
+               default=1000,
+               min=0,
+               help='The maximum number of checkpoint metadata documents '
+                    'cached per provider, 0 disables the cache'),
+    cfg.IntOpt('checkpoint_cache_ttl',
+               default=60,
+               min=0,
+               help='The time in seconds a cached checkpoint metadata '
+                    'document is used before it is read again from the '
+                    'bank'),
+    cfg.IntOpt('checkpoint_fetch_concurrency',
+               default=16,
+               min=1,
+               help='The maximum number of checkpoint metadata documents '
+                    'read from the bank concurrently when listing '
+                    'checkpoints'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(checkpoint_opts)
 
 LOG = logging.getLogger(__name__)
 
@@ -28,17 +55,139 @@ _INDEX_FILE_NAME = "index.json"
 _UUID_STR_LEN = 36
 
 
+def _index_keys(md):
+    checkpoint_id = md["id"]
+    created_at = md["created_at"]
+    timestamp = md["timestamp"]
+    plan_id = md["protection_plan"]["id"]
+    return (
+        "/by-provider/%s@%s" % (timestamp, checkpoint_id),
+        "/by-date/%s/%s@%s" % (created_at, timestamp, checkpoint_id),
+        "/by-plan/%s/%s/%s@%s" % (plan_id, created_at, timestamp,
+                                  checkpoint_id),
+    )
+
+
+def _summarize(md):
+    """The part of the checkpoint metadata kept in the index objects"""
+    plan = md["protection_plan"]
+    return {
+        "id": md["id"],
+        "status": md["status"],
+        "protection_plan": {
+            "id": plan.get("id"),
+            "name": plan.get("name"),
+            "provider_id": plan.get("provider_id"),
+        },
+        "project_id": md["project_id"],
+        "created_at": md["created_at"],
+    }
+
+
+def _write_metadata(checkpoint_section, indices_section, md, summary=None):
+    """Write the metadata of a checkpoint and its index objects, if given
+
+    They are written with a single batch, which the SQL bank runs in one
+    transaction so no index is left dangling by a failed write.
+    """
+    objects = {checkpoint_section.get_bank_key(_INDEX_FILE_NAME): md}
+    if summary is not None:
+        objects.update((indices_section.get_bank_key(key), summary)
+                       for key in _index_keys(md))
+    checkpoint_section.bank.create_objects(objects)
+
+
+class _ResourceBankSection(object):
+    """Bank section of a resource which reports the status it is given
+
+    Status writes go to the status aggregator of the checkpoint, when one is
+    registered, once they are in the bank.
+    """
+    def __init__(self, section, checkpoint_id, resource_id):
+        self._section = section
+        self._checkpoint_id = checkpoint_id
+        self._resource_id = resource_id
+
+    def __getattr__(self, name):
+        return getattr(self._section, name)
+
+    def _report(self, key, value):
+        if key.strip("/") == "status":
+            status_aggregator.report_resource_status(
+                self._checkpoint_id, self._resource_id, value)
+
+    def create_object(self, key, value):
+        result = self._section.create_object(key, value)
+        self._report(key, value)
+        return result
+
+    def update_object(self, key, value):
+        result = self._section.update_object(key, value)
+        self._report(key, value)
+        return result
+
+
+class CheckpointMetadataCache(object):
+    """LRU cache of checkpoint metadata documents
+
+    Entries expire after ttl seconds so that changes done by other protection
+    services are eventually seen. Changes done through Checkpoint.commit
+    update the cache directly.
+    """
+    def __init__(self, max_size=None, ttl=None):
+        self._max_size = (CONF.checkpoint_cache_size if max_size is None
+                          else max_size)
+        self._ttl = CONF.checkpoint_cache_ttl if ttl is None else ttl
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, checkpoint_id):
+        entry = self._entries.pop(checkpoint_id, None)
+        if entry is None:
+            return None
+        expires_at, md = entry
+        if expires_at < time.time():
+            return None
+        self._entries[checkpoint_id] = entry
+        return copy.deepcopy(md)
+
+    def put(self, checkpoint_id, md):
+        if self._max_size <= 0:
+            return
+        self._entries.pop(checkpoint_id, None)
+        self._entries[checkpoint_id] = (time.time() + self._ttl,
+                                        copy.deepcopy(md))
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, checkpoint_id):
+        self._entries.pop(checkpoint_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
 class Checkpoint(object):
-    VERSION = "0.9"
-    SUPPORTED_VERSIONS = ["0.9"]
+    VERSION = "1.0"
+    SUPPORTED_VERSIONS = ["0.9", "1.0"]
+
+    # 0.9 checkpoints hold their resource graph as the JSON string of
+    # serialize_resource_graph, 1.0 ones the document of encode_resource_graph
+    _RESOURCE_GRAPH_DECODERS = {
+        "0.9": graph.deserialize_resource_graph,
+        "1.0": graph.decode_resource_graph,
+    }
 
     def __init__(self, checkpoint_section, indices_section,
-                 bank_lease, checkpoint_id):
+                 bank_lease, checkpoint_id, metadata_cache=None):
         self._id = checkpoint_id
         self._checkpoint_section = checkpoint_section
         self._indices_section = indices_section
         self._bank_lease = bank_lease
-        self.reload_meta_data()
+        self._metadata_cache = metadata_cache
+        self.reload_meta_data(use_cache=True)
 
     def to_dict(self):
         return {
@@ -46,10 +195,13 @@ class Checkpoint(object):
             "status": self.status,
             "protection_plan": self.protection_plan,
             "project_id": self.project_id,
-            "resource_graph": self._md_cache.get("resource_graph", None),
+            "resource_graph": self._serialized_resource_graph(),
             "created_at": self._md_cache.get("created_at", None)
         }
 
+    def to_summary_dict(self):
+        return _summarize(self._md_cache)
+
     @property
     def checkpoint_section(self):
         return self._checkpoint_section
@@ -66,6 +218,10 @@ class Checkpoint(object):
     def created_at(self):
         return self._md_cache["created_at"]
 
+    @property
+    def timestamp(self):
+        return self._md_cache["timestamp"]
+
     @property
     def status(self):
         # TODO(saggi): check for valid values and transitions
@@ -82,13 +238,23 @@ class Checkpoint(object):
 
     @property
     def resource_graph(self):
-        serialized_resource_graph = self._md_cache.get("resource_graph", None)
-        if serialized_resource_graph is not None:
-            resource_graph = graph.deserialize_resource_graph(
-                serialized_resource_graph)
-            return resource_graph
-        else:
-            return None
+        # The decoded graph is kept until the metadata is reloaded
+        if self._resource_graph is None:
+            encoded_resource_graph = self._md_cache.get("resource_graph",
+                                                        None)
+            if encoded_resource_graph is not None:
+                decode = self._RESOURCE_GRAPH_DECODERS[
+                    self._md_cache["version"]]
+                self._resource_graph = decode(encoded_resource_graph)
+        return self._resource_graph
+
+    def _serialized_resource_graph(self):
+        """The resource graph in the format shown by the API"""
+        encoded_resource_graph = self._md_cache.get("resource_graph", None)
+        if encoded_resource_graph is None or (
+                self._md_cache["version"] == "0.9"):
+            return encoded_resource_graph
+        return graph.serialize_resource_graph(self.resource_graph)
 
     @property
     def protection_plan(self):
@@ -100,9 +266,10 @@ class Checkpoint(object):
 
     @resource_graph.setter
     def resource_graph(self, resource_graph):
-        serialized_resource_graph = graph.serialize_resource_graph(
-            resource_graph)
-        self._md_cache["resource_graph"] = serialized_resource_graph
+        self._md_cache["resource_graph"] = graph.encode_resource_graph(
+            resource_graph, codec=self._checkpoint_section.codec)
+        self._md_cache["version"] = self.VERSION
+        self._resource_graph = resource_graph
 
     def _is_supported_version(self, version):
         return version in self.SUPPORTED_VERSIONS
@@ -115,15 +282,23 @@ class Checkpoint(object):
             raise RuntimeError(
                 _("Checkpoint was created in an unsupported version"))
 
-    def reload_meta_data(self):
-        try:
-            new_md = self._checkpoint_section.get_object(_INDEX_FILE_NAME)
-        except exception.BankGetObjectFailed:
-            LOG.error(_LE("unable to reload metadata for checkpoint id: %s"),
-                      self.id)
-            raise exception.CheckpointNotFound(checkpoint_id=self.id)
-        self._assert_supported_version(new_md)
+    def reload_meta_data(self, use_cache=False):
+        new_md = None
+        if use_cache and self._metadata_cache is not None:
+            new_md = self._metadata_cache.get(self.id)
+        if new_md is None:
+            try:
+                new_md = self._checkpoint_section.get_object(_INDEX_FILE_NAME)
+            except exception.BankGetObjectFailed:
+                LOG.error(_LE("unable to reload metadata for checkpoint id: "
+                              "%s"), self.id)
+                raise exception.CheckpointNotFound(checkpoint_id=self.id)
+            self._assert_supported_version(new_md)
+            if self._metadata_cache is not None:
+                self._metadata_cache.put(self.id, new_md)
         self._md_cache = new_md
+        self._indexed_summary = _summarize(new_md)
+        self._resource_graph = None
 
     @classmethod
     def _generate_id(self):
@@ -131,66 +306,72 @@ class Checkpoint(object):
 
     @classmethod
     def get_by_section(cls, checkpoints_section, indices_section,
-                       bank_lease, checkpoint_id):
+                       bank_lease, checkpoint_id, metadata_cache=None):
         # TODO(yuvalbr) add validation that the checkpoint exists
         checkpoint_section = checkpoints_section.get_sub_section(checkpoint_id)
         return Checkpoint(checkpoint_section, indices_section,
-                          bank_lease, checkpoint_id)
+                          bank_lease, checkpoint_id,
+                          metadata_cache=metadata_cache)
 
     @classmethod
     def create_in_section(cls, checkpoints_section, indices_section,
-                          bank_lease, owner_id, plan, checkpoint_id=None):
+                          bank_lease, owner_id, plan, checkpoint_id=None,
+                          metadata_cache=None):
         checkpoint_id = checkpoint_id or cls._generate_id()
         checkpoint_section = checkpoints_section.get_sub_section(checkpoint_id)
 
         timestamp = timeutils.utcnow_ts()
         created_at = timeutils.utcnow().strftime('%Y-%m-%d')
 
-        checkpoint_section.create_object(
-            key=_INDEX_FILE_NAME,
-            value={
-                "version": cls.VERSION,
-                "id": checkpoint_id,
-                "status": "protecting",
-                "owner_id": owner_id,
+        md = {
+            "version": cls.VERSION,
+            "id": checkpoint_id,
+            "status": "protecting",
+            "owner_id": owner_id,
+            "provider_id": plan.get("provider_id"),
+            "project_id": plan.get("project_id"),
+            "protection_plan": {
+                "id": plan.get("id"),
+                "name": plan.get("name"),
                 "provider_id": plan.get("provider_id"),
-                "project_id": plan.get("project_id"),
-                "protection_plan": {
-                    "id": plan.get("id"),
-                    "name": plan.get("name"),
-                    "provider_id": plan.get("provider_id"),
-                    "resources": plan.get("resources")
-                },
-                "created_at": created_at,
-                "timestamp": timestamp
-            }
-        )
-
-        indices_section.create_object(
-            key="/by-provider/%s@%s" % (timestamp, checkpoint_id),
-            value=checkpoint_id
-        )
-
-        indices_section.create_object(
-            key="/by-date/%s/%s@%s" % (created_at, timestamp, checkpoint_id),
-            value=checkpoint_id
-        )
-
-        indices_section.create_object(
-            key="/by-plan/%s/%s/%s@%s" % (
-                plan.get("id"), created_at, timestamp, checkpoint_id),
-            value=checkpoint_id)
+                "resources": plan.get("resources")
+            },
+            "created_at": created_at,
+            "timestamp": timestamp
+        }
+        _write_metadata(checkpoint_section, indices_section, md,
+                        _summarize(md))
+        if metadata_cache is not None:
+            # Seed the cache so the checkpoint below is built without
+            # reading back the document we have just written
+            metadata_cache.put(checkpoint_id, md)
 
         return Checkpoint(checkpoint_section,
                           indices_section,
                           bank_lease,
-                          checkpoint_id)
+                          checkpoint_id,
+                          metadata_cache=metadata_cache)
 
-    def commit(self):
+    def _write_meta_data(self):
         self._checkpoint_section.create_object(
             key=_INDEX_FILE_NAME,
             value=self._md_cache,
         )
+        if self._metadata_cache is not None:
+            self._metadata_cache.put(self.id, self._md_cache)
+
+    def commit(self):
+        # Keep the summaries in the index objects in sync so listings can
+        # be served without reading the metadata of every checkpoint
+        summary = _summarize(self._md_cache)
+        if summary == self._indexed_summary:
+            self._write_meta_data()
+            return
+        _write_metadata(self._checkpoint_section, self._indices_section,
+                        self._md_cache, summary)
+        if self._metadata_cache is not None:
+            self._metadata_cache.put(self.id, self._md_cache)
+        self._indexed_summary = summary
 
     def purge(self):
         """Purge the index file of the checkpoint.
@@ -200,39 +381,27 @@ class Checkpoint(object):
         """
         all_objects = self._checkpoint_section.list_objects()
         if len(all_objects) == 1 and all_objects[0] == _INDEX_FILE_NAME:
-            created_at = self._md_cache["created_at"]
-            timestamp = self._md_cache["timestamp"]
-            plan_id = self._md_cache["protection_plan"]["id"]
-            self._indices_section.delete_object(
-                "/by-provider/%s@%s" % (timestamp, self.id))
-            self._indices_section.delete_object(
-                "/by-date/%s/%s@%s" % (created_at, timestamp, self.id))
-            self._indices_section.delete_object(
-                "/by-plan/%s/%s/%s@%s" % (
-                    plan_id, created_at, timestamp, self.id))
+            self._indices_section.delete_objects(_index_keys(self._md_cache))
 
             self._checkpoint_section.delete_object(_INDEX_FILE_NAME)
+            if self._metadata_cache is not None:
+                self._metadata_cache.invalidate(self.id)
         else:
             raise RuntimeError(_("Could not delete: Checkpoint is not empty"))
 
     def delete(self):
         self.status = constants.CHECKPOINT_STATUS_DELETED
-        self.commit()
+        self._write_meta_data()
         # delete indices
-        created_at = self._md_cache["created_at"]
-        timestamp = self._md_cache["timestamp"]
-        plan_id = self._md_cache["protection_plan"]["id"]
-        self._indices_section.delete_object(
-            "/by-provider/%s@%s" % (timestamp, self.id))
-        self._indices_section.delete_object(
-            "/by-date/%s/%s@%s" % (created_at, timestamp, self.id))
-        self._indices_section.delete_object(
-            "/by-plan/%s/%s/%s@%s" % (
-                plan_id, created_at, timestamp, self.id))
+        self._indices_section.delete_objects(_index_keys(self._md_cache))
+        if self._metadata_cache is not None:
+            self._metadata_cache.invalidate(self.id)
 
     def get_resource_bank_section(self, resource_id):
         prefix = "/resource-data/%s/" % resource_id
-        return self._checkpoint_section.get_sub_section(prefix)
+        return _ResourceBankSection(
+            self._checkpoint_section.get_sub_section(prefix), self.id,
+            resource_id)
 
 
 class CheckpointCollection(object):
@@ -243,72 +412,122 @@ class CheckpointCollection(object):
         self._bank_lease = bank_lease
         self._checkpoints_section = bank.get_sub_section("/checkpoints")
         self._indices_section = bank.get_sub_section("/indices")
+        self._metadata_cache = CheckpointMetadataCache()
+
+    @staticmethod
+    def _index_key_to_id(key):
+        return key[key.find("@") + 1:]
 
     def list_ids(self, limit=None, marker=None, plan_id=None, start_date=None,
                  end_date=None, sort_dir=None):
-        marker_checkpoint = None
-        if marker is not None:
-            checkpoint_section = self._checkpoints_section.get_sub_section(
-                marker)
-            marker_checkpoint = checkpoint_section.get_object(_INDEX_FILE_NAME)
-            timestamp = marker_checkpoint["timestamp"]
-            marker = "%s@%s" % (timestamp, marker)
-
-        if start_date is not None:
-            if end_date is None:
-                end_date = timeutils.utcnow()
-
+        return [self._index_key_to_id(key)
+                for key in self._list_index_keys(limit, marker, plan_id,
+                                                 start_date, end_date,
+                                                 sort_dir)]
+
+    def list_summaries(self, limit=None, marker=None, plan_id=None,
+                       start_date=None, end_date=None, sort_dir=None):
+        """List checkpoint summaries using the index objects only
+
+        A summary holds what Checkpoint.to_dict() returns without the
+        resource graph and the plan resources.
+
+        Bank listings only return keys, so the summaries not in the metadata
+        cache still cost a read of their index object. They are read with
+        one get_objects call per page: a single query on banks with batch
+        reads, such as the SQL bank, and concurrent GETs of small objects
+        on the others. The index.json documents are only read for the index
+        objects written by older versions, which hold the id alone.
+        """
+        keys = list(self._list_index_keys(limit, marker, plan_id, start_date,
+                                          end_date, sort_dir))
+        summaries = {}
+        for key in keys:
+            md = self._metadata_cache.get(self._index_key_to_id(key))
+            if md is not None:
+                summaries[key] = _summarize(md)
+
+        missing = [key for key in keys if key not in summaries]
+        if missing:
+            summaries.update(self._indices_section.get_objects(missing))
+
+        legacy = [key for key in keys if not isinstance(summaries[key], dict)]
+        checkpoints = self.get_many(self._index_key_to_id(key)
+                                    for key in legacy)
+        for key, checkpoint in zip(legacy, checkpoints):
+            summaries[key] = checkpoint.to_summary_dict()
+        return [summaries[key] for key in keys]
+
+    def _list_index_keys(self, limit, marker, plan_id, start_date, end_date,
+                         sort_dir):
         if plan_id is None and start_date is None:
             prefix = "/by-provider/"
-            if marker is not None:
-                marker = "/%s" % marker
         elif plan_id is not None:
             prefix = "/by-plan/%s/" % plan_id
-            if marker is not None:
-                date = marker_checkpoint["created_at"]
-                marker = "/by-plan/%s/%s/%s" % (plan_id, date, marker)
         else:
             prefix = "/by-date/"
-            if marker is not None:
-                date = marker_checkpoint["created_at"]
-                marker = "/by-date/%s/%s" % (date, marker)
-
-        return self._list_ids(prefix, limit, marker, start_date, end_date,
-                              sort_dir)
-
-    def _list_ids(self, prefix, limit, marker, start_date, end_date, sort_dir):
-        if start_date is None:
-            return [key[key.find("@") + 1:]
-                    for key in self._indices_section.list_objects(
-                    prefix=prefix,
-                    limit=limit,
-                    marker=marker,
-                    sort_dir=sort_dir
-                    )]
-        else:
-            ids = []
-            for key in self._indices_section.list_objects(prefix=prefix,
-                                                          marker=marker,
-                                                          sort_dir=sort_dir):
-                date = datetime.strptime(key.split("/")[-2], "%Y-%m-%d")
-                if start_date <= date <= end_date:
-                    ids.append(key[key.find("@") + 1:])
-                if limit is not None and len(ids) == limit:
-                    return ids
-            return ids
+
+        if marker is not None:
+            marker_checkpoint = self.get(marker)
+            timestamp = marker_checkpoint.timestamp
+            if prefix == "/by-provider/":
+                marker = "%s%s@%s" % (prefix, timestamp, marker)
+            else:
+                marker = "%s%s/%s@%s" % (prefix, marker_checkpoint.created_at,
+                                         timestamp, marker)
+
+        end_marker = None
+        if start_date is not None:
+            if end_date is None:
+                end_date = timeutils.utcnow()
+            # Index keys under by-date and by-plan start with the creation
+            # date, so the date range maps to a range of keys the bank can
+            # seek to instead of listing the whole history
+            lower = "%s%s" % (prefix, start_date.strftime("%Y-%m-%d"))
+            upper = "%s%s" % (prefix, (end_date + timedelta(days=1)).strftime(
+                "%Y-%m-%d"))
+            if sort_dir == "desc":
+                marker = upper if marker is None else min(marker, upper)
+                end_marker = lower
+            else:
+                marker = lower if marker is None else max(marker, lower)
+                end_marker = upper
+
+        return list(self._indices_section.list_objects(
+            prefix=prefix,
+            limit=limit,
+            marker=marker,
+            end_marker=end_marker,
+            sort_dir=sort_dir
+        ))
 
     def get(self, checkpoint_id):
         # TODO(saggi): handle multiple instances of the same checkpoint
         return Checkpoint.get_by_section(self._checkpoints_section,
                                          self._indices_section,
                                          self._bank_lease,
-                                         checkpoint_id)
+                                         checkpoint_id,
+                                         metadata_cache=self._metadata_cache)
+
+    def get_many(self, checkpoint_ids):
+        """Get several checkpoints, reading their metadata concurrently
+
+        The checkpoints are returned in the order of checkpoint_ids.
+        """
+        checkpoint_ids = list(checkpoint_ids)
+        if not checkpoint_ids:
+            return []
+        pool = eventlet.GreenPool(min(CONF.checkpoint_fetch_concurrency,
+                                      len(checkpoint_ids)))
+        return list(pool.imap(self.get, checkpoint_ids))
 
     def create(self, plan):
         # TODO(saggi): Serialize plan to checkpoint. Will be done in
         # future patches.
-        return Checkpoint.create_in_section(self._checkpoints_section,
-                                            self._indices_section,
-                                            self._bank_lease,
-                                            self._bank.get_owner_id(),
-                                            plan)
+        return Checkpoint.create_in_section(
+            self._checkpoints_section,
+            self._indices_section,
+            self._bank_lease,
+            self._bank.get_owner_id(),
+            plan,
+            metadata_cache=self._metadata_cache)
@@ -0,0 +1,423 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import eventlet
+import re
+import time
+
+from karbor import exception
+from karbor.i18n import _LE, _LI, _LW
+from karbor.services.protection import bank_plugin
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import uuidutils
+
+chunked_transfer_opts = [
+    cfg.IntOpt('restore_prefetch_chunks',
+               default=2,
+               min=1,
+               help='The number of chunk objects fetched ahead from the '
+                    'bank while restoring data'),
+    cfg.IntOpt('chunk_gc_grace_period',
+               default=3600,
+               min=0,
+               help='The number of seconds a released deduplicated chunk '
+                    'is kept before it may be reclaimed'),
+]
+
+chunk_writer_opts = [
+    cfg.IntOpt('upload_concurrency',
+               default=4,
+               min=1,
+               help='The number of chunk objects uploaded to the bank in '
+                    'parallel for a single resource'),
+    cfg.IntOpt('upload_retries',
+               default=3,
+               min=0,
+               help='The number of times a failed chunk upload is retried'),
+    cfg.FloatOpt('upload_retry_interval',
+                 default=1.0,
+                 help='The base interval in seconds between chunk upload '
+                      'retries, multiplied by the attempt number'),
+    cfg.BoolOpt('deduplicate',
+                default=False,
+                help='Store chunks once in the content addressed chunk '
+                     'store of the bank instead of per checkpoint'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(chunked_transfer_opts)
+LOG = logging.getLogger(__name__)
+
+_CHUNK_WRITER_GROUP = 'chunk_writer'
+_MANIFEST_SUFFIX = 'manifest'
+
+
+def chunk_object_name(prefix, index):
+    return "%s_%d" % (prefix, index)
+
+
+def chunk_manifest_name(prefix):
+    return "%s_%s" % (prefix, _MANIFEST_SUFFIX)
+
+
+def chunk_writer_options(config=None):
+    """Return the ParallelChunkWriter arguments configured for a provider
+
+    The options are read from the [chunk_writer] group of the provider
+    configuration, or of the global configuration if there is none.
+    """
+    conf = config if config is not None else CONF
+    conf.register_opts(chunk_writer_opts, _CHUNK_WRITER_GROUP)
+    group = getattr(conf, _CHUNK_WRITER_GROUP)
+    return {
+        "concurrency": group.upload_concurrency,
+        "retries": group.upload_retries,
+        "retry_interval": group.upload_retry_interval,
+        "deduplicate": group.deduplicate,
+    }
+
+
+def sorted_chunk_names(object_names, prefix):
+    """Return the chunk object names of prefix, in chunk order
+
+    Chunk objects are named <prefix>_<index>. Bank listings are sorted
+    lexicographically (so "data_10" comes before "data_2"), this sorts them by
+    their numeric index instead.
+    """
+    pattern = re.compile(r"^%s_(\d+)$" % re.escape(prefix))
+    chunks = []
+    for name in object_names:
+        match = pattern.match(name.split("/")[-1])
+        if match is not None:
+            chunks.append((int(match.group(1)), name))
+    return [name for _index, name in sorted(chunks)]
+
+
+def iter_fixed_size_chunks(data_iterator, chunk_size):
+    """Re-chunk a stream of byte strings into fixed size chunks
+
+    Every chunk yielded, apart from the last one, is exactly chunk_size
+    bytes long. At most one chunk worth of data (plus the piece currently
+    being consumed) is kept in memory.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    pending = []
+    pending_size = 0
+    for data in data_iterator:
+        if not data:
+            continue
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size < chunk_size:
+            continue
+
+        buf = b"".join(pending)
+        offset = 0
+        while pending_size - offset >= chunk_size:
+            yield buf[offset:offset + chunk_size]
+            offset += chunk_size
+        remainder = buf[offset:]
+        pending = [remainder] if remainder else []
+        pending_size = len(remainder)
+
+    if pending_size > 0:
+        yield b"".join(pending)
+
+
+def upload_chunks(bank_section, prefix, data_iterator, chunk_size,
+                  **writer_kwargs):
+    """Stream data into the bank as numbered chunk objects
+
+    Each chunk is handed to a ParallelChunkWriter as soon as it is full, and
+    written as <prefix>_0, <prefix>_1, ...
+
+    :return: the number of chunk objects written
+    """
+    with ParallelChunkWriter(bank_section, prefix,
+                             **writer_kwargs) as writer:
+        for data in iter_fixed_size_chunks(data_iterator, chunk_size):
+            writer.write(data)
+    return writer.chunks
+
+
+class ParallelChunkWriter(object):
+    """Write numbered chunk objects to a bank section concurrently
+
+    Up to `concurrency` chunk writes are kept in flight; write() blocks when
+    they are all busy so memory use stays bounded. A failed chunk is retried
+    on its own. When closed, a <prefix>_manifest object records the number of
+    chunks and the total size so the chunks can be reassembled in order.
+
+    With deduplicate, chunks go to the ChunkStore of the bank instead, and the
+    manifest lists their digests together with the reference held on them.
+    """
+    def __init__(self, bank_section, prefix, concurrency=1, retries=0,
+                 retry_interval=1.0, deduplicate=False):
+        self._bank_section = bank_section
+        self._prefix = prefix
+        self._chunk_store = None
+        self._ref_id = None
+        self._digests = []
+        if deduplicate:
+            self._chunk_store = bank_plugin.ChunkStore(bank_section.bank)
+            self._ref_id = uuidutils.generate_uuid()
+        self._pool = eventlet.GreenPool(max(concurrency, 1))
+        self._retries = retries
+        self._retry_interval = retry_interval
+        self._chunks = 0
+        self._bytes_written = 0
+        self._errors = []
+        self._start_time = None
+        self._elapsed = 0.0
+        self._closed = False
+
+    @property
+    def chunks(self):
+        return self._chunks
+
+    @property
+    def bytes_written(self):
+        return self._bytes_written
+
+    @property
+    def elapsed(self):
+        if self._start_time is not None and not self._closed:
+            return time.time() - self._start_time
+        return self._elapsed
+
+    @property
+    def throughput(self):
+        """Bytes written per second"""
+        elapsed = self.elapsed
+        if elapsed <= 0:
+            return 0.0
+        return self._bytes_written / elapsed
+
+    def _raise_on_error(self):
+        if self._errors:
+            name, err = self._errors[0]
+            raise exception.BankCreateObjectFailed(reason=err, key=name)
+
+    def write(self, data):
+        if self._closed:
+            raise ValueError("write to a closed chunk writer")
+        self._raise_on_error()
+        if self._start_time is None:
+            self._start_time = time.time()
+        index = self._chunks
+        self._chunks += 1
+        if self._chunk_store is not None:
+            self._digests.append(None)
+        self._pool.spawn_n(self._write_chunk, index, data)
+
+    def _put_chunk(self, index, data):
+        if self._chunk_store is None:
+            self._bank_section.create_object(
+                chunk_object_name(self._prefix, index), data)
+        else:
+            self._digests[index] = self._chunk_store.put_chunk(data,
+                                                               self._ref_id)
+
+    def _write_chunk(self, index, data):
+        name = chunk_object_name(self._prefix, index)
+        attempt = 0
+        while True:
+            try:
+                self._put_chunk(index, data)
+                break
+            except Exception as err:
+                attempt += 1
+                if attempt > self._retries:
+                    LOG.error(_LE("writing chunk %(name)s failed after "
+                                  "%(attempts)d attempts: %(err)s"),
+                              {"name": name, "attempts": attempt,
+                               "err": err})
+                    self._errors.append((name, err))
+                    return
+                LOG.warning(_LW("writing chunk %(name)s failed, retrying: "
+                                "%(err)s"), {"name": name, "err": err})
+                eventlet.sleep(self._retry_interval * attempt)
+        self._bytes_written += len(data)
+
+    def close(self, abort=False):
+        """Wait for the in-flight chunks and write the manifest
+
+        :param abort: only wait for the in-flight chunks, do not write the
+                      manifest nor raise chunk errors
+        """
+        if self._closed:
+            return
+        self._pool.waitall()
+        self._closed = True
+        if self._start_time is not None:
+            self._elapsed = time.time() - self._start_time
+        if abort or self._errors:
+            self._release_references()
+        if abort:
+            return
+        self._raise_on_error()
+        manifest = {"chunks": self._chunks, "size": self._bytes_written}
+        if self._chunk_store is not None:
+            manifest["digests"] = self._digests
+            manifest["ref_id"] = self._ref_id
+        self._bank_section.create_object(chunk_manifest_name(self._prefix),
+                                         manifest)
+        LOG.info(_LI("wrote %(chunks)d chunks (%(size)d bytes) with prefix "
+                     "%(prefix)s at %(rate).0f bytes/sec"),
+                 {"chunks": self._chunks, "size": self._bytes_written,
+                  "prefix": self._prefix, "rate": self.throughput})
+
+    def _release_references(self):
+        if self._chunk_store is None:
+            return
+        self._chunk_store.release_chunks(
+            [digest for digest in self._digests if digest is not None],
+            self._ref_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(abort=exc_type is not None)
+
+
+def release_chunks(bank_section, object_names):
+    """Release the deduplicated chunks referenced by chunk manifests
+
+    Must be called before the manifests themselves are deleted. The chunks
+    released long enough ago and still unreferenced are reclaimed afterwards.
+    """
+    chunk_store = None
+    for name in object_names:
+        if not name.endswith("_" + _MANIFEST_SUFFIX):
+            continue
+        manifest = bank_section.get_object(name)
+        if manifest.get("digests") is None:
+            continue
+        if chunk_store is None:
+            chunk_store = bank_plugin.ChunkStore(bank_section.bank)
+        chunk_store.release_chunks(manifest["digests"], manifest["ref_id"])
+    if chunk_store is not None:
+        chunk_store.collect_garbage(CONF.chunk_gc_grace_period)
+
+
+class ChunkedRestoreReader(object):
+    """File-like reader over chunk objects stored in a bank section
+
+    The section may also be a ChunkStore, with chunk digests as names.
+    Chunks are read in the given order while the next few chunks are fetched
+    concurrently, so only the current chunk and the prefetched ones are held
+    in memory.
+    """
+    def __init__(self, bank_section, chunk_names, prefetch=None):
+        if prefetch is None:
+            prefetch = CONF.restore_prefetch_chunks
+        self._bank_section = bank_section
+        self._chunk_names = iter(chunk_names)
+        self._prefetch = max(prefetch, 1)
+        # one extra slot so the next fetch starts before the current one is
+        # consumed
+        self._pool = eventlet.GreenPool(self._prefetch + 1)
+        self._pending = collections.deque()
+        self._buffer = b""
+        self._offset = 0
+        self._closed = False
+        self._fill_pending()
+
+    @classmethod
+    def from_section(cls, bank_section, prefix, object_names=None,
+                     prefetch=None):
+        if object_names is None:
+            object_names = bank_section.list_objects()
+        manifest_name = chunk_manifest_name(prefix)
+        if manifest_name in object_names:
+            manifest = bank_section.get_object(manifest_name)
+            if manifest.get("digests") is not None:
+                return cls(bank_plugin.ChunkStore(bank_section.bank),
+                           manifest["digests"], prefetch=prefetch)
+        return cls(bank_section, sorted_chunk_names(object_names, prefix),
+                   prefetch=prefetch)
+
+    def _fill_pending(self):
+        while len(self._pending) < self._prefetch:
+            name = next(self._chunk_names, None)
+            if name is None:
+                return
+            self._pending.append(
+                self._pool.spawn(self._bank_section.get_object, name))
+
+    def _next_chunk(self):
+        if not self._pending:
+            return None
+        green_thread = self._pending.popleft()
+        self._fill_pending()
+        return green_thread.wait()
+
+    def _buffered(self):
+        return len(self._buffer) - self._offset
+
+    def read(self, size=-1):
+        if self._closed:
+            raise ValueError("I/O operation on closed reader")
+        if size is None or size < 0:
+            parts = [self._buffer[self._offset:]]
+            self._buffer, self._offset = b"", 0
+            chunk = self._next_chunk()
+            while chunk is not None:
+                parts.append(chunk)
+                chunk = self._next_chunk()
+            return b"".join(parts)
+
+        while self._buffered() < size:
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+            if not chunk:
+                continue
+            if self._offset < len(self._buffer):
+                self._buffer = self._buffer[self._offset:] + chunk
+            else:
+                self._buffer = chunk
+            self._offset = 0
+
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def __iter__(self):
+        if self._buffered() > 0:
+            data = self._buffer[self._offset:]
+            self._buffer, self._offset = b"", 0
+            yield data
+        chunk = self._next_chunk()
+        while chunk is not None:
+            if chunk:
+                yield chunk
+            chunk = self._next_chunk()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        while self._pending:
+            self._pending.popleft().kill()
+        self._buffer, self._offset = b"", 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -10,11 +10,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
+
 from karbor.common import constants
 from karbor.i18n import _LI
+from karbor.services.protection import status_aggregator
+from karbor.services.protection import status_poller
 from oslo_config import cfg
 from oslo_log import log as logging
-from oslo_service import loopingcall
 from taskflow import task
 
 sync_status_opts = [
@@ -54,34 +57,61 @@ class SyncCheckpointStatusTask(task.Task):
     def execute(self, checkpoint):
         LOG.info(_LI("Start sync checkpoint status,checkpoint_id: %s"),
                  checkpoint.id)
-        sync_status = loopingcall.FixedIntervalLoopingCall(
-            self._sync_status, checkpoint, self._status_getters)
-        sync_status.start(interval=CONF.sync_status_interval)
-
-    def _sync_status(self, checkpoint, status_getters):
-        statuses = set()
-        for s in status_getters:
-            resource_id = s.get('resource_id')
-            get_resource_stats = s.get('get_resource_stats')
-            statuses.add(get_resource_stats(checkpoint, resource_id))
+        aggregator = status_aggregator.register(
+            checkpoint.id,
+            [s.get('resource_id') for s in self._status_getters])
+        # Statuses written before the aggregator was registered are polled
+        # right away, later polls are only a fallback for missed reports
+        watch = status_poller.get_poller().add_watch(
+            checkpoint.id,
+            functools.partial(self._check_status, checkpoint),
+            fetch=functools.partial(self._poll_statuses, checkpoint,
+                                    aggregator),
+            initial_delay=0,
+            interval=CONF.sync_status_interval,
+            max_interval=CONF.sync_status_interval)
+        aggregator.on_change = watch.notify
+
+    def _poll_statuses(self, checkpoint, aggregator, checkpoint_id):
+        aggregator.poll(checkpoint, self._status_getters)
+        return aggregator.statuses
+
+    def _check_status(self, checkpoint, statuses):
+        try:
+            done = self._update_checkpoint_status(checkpoint, statuses)
+        except Exception:
+            status_aggregator.unregister(checkpoint.id)
+            raise
+        if done:
+            status_aggregator.unregister(checkpoint.id)
+        return done
+
+    def _update_checkpoint_status(self, checkpoint, statuses):
+        """Commit the status derived from statuses if it changed
+
+        :return: True once no resource is being protected any more
+        """
+        in_progress = (constants.RESOURCE_STATUS_PROTECTING in statuses or
+                       constants.RESOURCE_STATUS_UNDEFINED in statuses)
         if constants.RESOURCE_STATUS_ERROR in statuses:
-            checkpoint.status = constants.CHECKPOINT_STATUS_ERROR
-            checkpoint.commit()
-        elif constants.RESOURCE_STATUS_PROTECTING in statuses:
-            checkpoint.status = constants.CHECKPOINT_STATUS_PROTECTING
-            checkpoint.commit()
-        elif constants.RESOURCE_STATUS_UNDEFINED in statuses:
-            checkpoint.status = constants.CHECKPOINT_STATUS_PROTECTING
-            checkpoint.commit()
+            status = constants.CHECKPOINT_STATUS_ERROR
+        elif in_progress:
+            status = constants.CHECKPOINT_STATUS_PROTECTING
         else:
-            checkpoint.status = constants.CHECKPOINT_STATUS_AVAILABLE
+            status = constants.CHECKPOINT_STATUS_AVAILABLE
+
+        if checkpoint.status != status:
+            checkpoint.status = status
             checkpoint.commit()
-            LOG.info(_LI("Stop sync checkpoint status,checkpoint_id: "
-                         "%(checkpoint_id)s,checkpoint status: "
-                         "%(checkpoint_status)s"),
-                     {"checkpoint_id": checkpoint.id,
-                      "checkpoint_status": checkpoint.status})
-            raise loopingcall.LoopingCallDone()
+        if in_progress:
+            return False
+
+        LOG.info(_LI("Stop sync checkpoint status,checkpoint_id: "
+                     "%(checkpoint_id)s,checkpoint status: "
+                     "%(checkpoint_status)s"),
+                 {"checkpoint_id": checkpoint.id,
+                  "checkpoint_status": checkpoint.status})
+        return True
 
 
 def get_flow(context, workflow_engine, operation_type, plan, provider):
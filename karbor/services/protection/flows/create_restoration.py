@@ -10,14 +10,16 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
+
 from oslo_config import cfg
 from oslo_log import log as logging
-from oslo_service import loopingcall
 from oslo_utils import uuidutils
 
 from karbor.common import constants
 from karbor.i18n import _LE, _LI
 from karbor.services.protection.client_factory import ClientFactory
+from karbor.services.protection import status_poller
 from karbor.services.protection.restore_heat import HeatTemplate
 from taskflow import task
 
@@ -63,31 +65,40 @@ class SyncStackStatusTask(task.Task):
 
     def execute(self, stack_id):
         LOG.info(_LI("syncing stack status, stack_id: %s"), stack_id)
-        sync_status_loop = loopingcall.FixedIntervalLoopingCall(
-            self._sync_status, self._checkpoint, stack_id)
-        sync_status_loop.start(interval=CONF.sync_status_interval)
-
-    def _sync_status(self, checkpoint, stack_id):
-        try:
-            stack = self._heat_client.stacks.get(stack_id)
-            stack_status = getattr(stack, 'stack_status')
-            if stack_status == 'CREATE_IN_PROGRESS':
-                return
-
-            if stack_status == 'CREATE_FAILED':
-                status = constants.OPERATION_EXE_STATE_FAILED
-            elif stack_status == 'CREATE_COMPLETE':
-                status = constants.OPERATION_EXE_STATE_SUCCESS
-
-            status_dict = {
-                "status": status
-            }
-            self._restore.update(status_dict)
-            self._restore.save()
-            raise loopingcall.LoopingCallDone()
-        except Exception:
-            LOG.info(_LI("stop sync stack status, stack_id: %s"), stack_id)
-            raise
+        status_poller.get_poller().add_watch(
+            stack_id,
+            functools.partial(self._sync_status, stack_id),
+            fetch=self._get_stack_status,
+            initial_delay=0,
+            max_interval=CONF.sync_status_interval)
+
+    def _get_stack_status(self, stack_id):
+        stack = self._heat_client.stacks.get(stack_id)
+        return getattr(stack, 'stack_status')
+
+    def _sync_status(self, stack_id, stack_status):
+        # Rollbacks and the other operations heat runs on a failed stack
+        # are in progress as well
+        if stack_status.endswith('_IN_PROGRESS'):
+            return False
+
+        if stack_status == 'CREATE_COMPLETE':
+            status = constants.OPERATION_EXE_STATE_SUCCESS
+        else:
+            # CREATE_FAILED, and the statuses a stack reaches after its
+            # creation failed: ROLLBACK_COMPLETE, DELETE_COMPLETE...
+            LOG.error(_LE("restore stack failed, stack_id: %(stack_id)s, "
+                          "stack status: %(stack_status)s"),
+                      {"stack_id": stack_id, "stack_status": stack_status})
+            status = constants.OPERATION_EXE_STATE_FAILED
+
+        status_dict = {
+            "status": status
+        }
+        self._restore.update(status_dict)
+        self._restore.save()
+        LOG.info(_LI("stop sync stack status, stack_id: %s"), stack_id)
+        return True
 
 
 def get_flow(context, workflow_engine, operation_type, checkpoint, provider,
@@ -10,11 +10,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import functools
+
 from karbor.common import constants
 from karbor.i18n import _LI
+from karbor.services.protection import status_poller
 from oslo_config import cfg
 from oslo_log import log as logging
-from oslo_service import loopingcall
 from taskflow import task
 
 sync_status_opts = [
@@ -38,16 +40,23 @@ class SyncCheckpointStatusTask(task.Task):
     def execute(self):
         LOG.info(_LI("Start sync checkpoint status,checkpoint_id:%s"),
                  self._checkpoint.id)
-        sync_status = loopingcall.FixedIntervalLoopingCall(
-            self._sync_status, self._checkpoint, self._status_getters)
-        sync_status.start(interval=CONF.sync_status_interval)
+        status_poller.get_poller().add_watch(
+            self._checkpoint.id,
+            functools.partial(self._sync_status, self._checkpoint),
+            fetch=functools.partial(self._get_statuses, self._checkpoint,
+                                    self._status_getters),
+            initial_delay=0,
+            max_interval=CONF.sync_status_interval)
 
-    def _sync_status(self, checkpoint, status_getters):
+    def _get_statuses(self, checkpoint, status_getters, checkpoint_id):
         statuses = set()
         for s in status_getters:
             resource_id = s.get('resource_id')
             get_resource_stats = s.get('get_resource_stats')
             statuses.add(get_resource_stats(checkpoint, resource_id))
+        return statuses
+
+    def _sync_status(self, checkpoint, statuses):
         LOG.info(_LI("Start sync checkpoint status,checkpoint_id:"
                      "%(checkpoint_id)s, resource_status:"
                      "%(resource_status)s") %
@@ -56,7 +65,7 @@ class SyncCheckpointStatusTask(task.Task):
         if constants.RESOURCE_STATUS_ERROR in statuses:
             checkpoint.status = constants.CHECKPOINT_STATUS_ERROR_DELETING
             checkpoint.commit()
-            raise loopingcall.LoopingCallDone()
+            return True
         elif statuses == {constants.RESOURCE_STATUS_DELETED, }:
             checkpoint.delete()
             LOG.info(_LI("Stop sync checkpoint status,checkpoint_id: "
@@ -64,7 +73,8 @@ class SyncCheckpointStatusTask(task.Task):
                          "%(checkpoint_status)s"),
                      {"checkpoint_id": checkpoint.id,
                       "checkpoint_status": checkpoint.status})
-            raise loopingcall.LoopingCallDone()
+            return True
+        return False
 
 
 def get_flow(context, workflow_engine, operation_type, checkpoint, provider):
@@ -13,9 +13,11 @@
 import abc
 import futurist
 import six
+import weakref
 
 from karbor import exception
 from karbor.i18n import _, _LE
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from taskflow import engines
@@ -24,6 +26,15 @@ from taskflow.patterns import linear_flow
 from taskflow import task
 
 
+workflow_engine_opts = [
+    cfg.IntOpt('flow_executor_max_workers',
+               default=64,
+               help='number of tasks the flows of the service run at once')
+]
+
+CONF = cfg.CONF
+CONF.register_opts(workflow_engine_opts)
+
 LOG = logging.getLogger(__name__)
 
 
@@ -89,12 +100,18 @@ class WorkFlowEngine(object):
 class TaskFlowEngine(WorkFlowEngine):
     def __init__(self):
         super(TaskFlowEngine, self).__init__()
+        # name => task index of the graph flows built by this engine, filled
+        # as tasks are added so search_task does not scan the whole flow
+        self._task_indexes = weakref.WeakKeyDictionary()
+        self._executor = None
 
     def build_flow(self, flow_name, flow_type='graph'):
         if flow_type == 'linear':
             return linear_flow.Flow(flow_name)
         elif flow_type == 'graph':
-            return graph_flow.Flow(flow_name)
+            flow = graph_flow.Flow(flow_name)
+            self._task_indexes[flow] = {}
+            return flow
         else:
             raise ValueError(_("unsupported flow type: %s") % flow_type)
 
@@ -107,7 +124,12 @@ class TaskFlowEngine(WorkFlowEngine):
         engine = kwargs.get('engine', None)
         store = kwargs.get('store', None)
         if not executor:
-            executor = futurist.GreenThreadPoolExecutor()
+            # One bounded executor for all the flows, tasks queue up once
+            # it is busy
+            if self._executor is None:
+                self._executor = futurist.GreenThreadPoolExecutor(
+                    max_workers=CONF.flow_executor_max_workers)
+            executor = self._executor
         if not engine:
             engine = 'parallel'
         flow_engine = engines.load(flow,
@@ -164,11 +186,20 @@ class TaskFlowEngine(WorkFlowEngine):
             raise exception.InvalidTaskFlowObject(
                 reason=_("The flow is None"))
         flow.add(*nodes, **kwargs)
+        task_index = self._task_indexes.get(flow)
+        if task_index is not None:
+            for node in nodes:
+                if isinstance(node, task.FunctorTask):
+                    task_index.setdefault(node.name, node)
 
     def search_task(self, flow, task_id):
         if not isinstance(flow, graph_flow.Flow):
             LOG.error(_LE("this is not a graph flow,flow name:%s"), flow.name)
             return
+        task_index = self._task_indexes.get(flow)
+        if task_index is not None:
+            return task_index.get(task_id)
+        # The flow was not built by this engine, its tasks are not indexed
         for node, meta in flow.iter_nodes():
             if not isinstance(node, task.FunctorTask):
                 continue
@@ -10,9 +10,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import abc
+import base64
 from collections import namedtuple
 import json
 
+import eventlet
 from oslo_log import log as logging
 
 import six
@@ -20,6 +22,7 @@ import six
 from karbor import exception
 from karbor.i18n import _
 from karbor.resource import Resource
+from karbor.services.protection import bank_plugin
 
 
 _GraphBuilderContext = namedtuple("_GraphBuilderContext", (
@@ -38,6 +41,10 @@ PackedGraph = namedtuple('PackedGraph', ['nodes', 'adjacency'])
 
 LOG = logging.getLogger(__name__)
 
+RESOURCE_GRAPH_FORMAT_VERSION = 2
+# encoded resource graphs smaller than this are not worth compressing
+_MIN_COMPRESS_SIZE = 1024
+
 
 class FoundLoopError(RuntimeError):
     def __init__(self):
@@ -76,12 +83,47 @@ def _build_graph_rec(context, node):
     return graph_node
 
 
-def build_graph(start_nodes, get_child_nodes_func):
+def _discover_child_nodes(start_nodes, get_child_nodes_func, concurrency):
+    """Fetch the child nodes of every node reachable from start_nodes
+
+    The graph is explored breadth first and the child nodes of a whole level
+    are fetched concurrently, so the number of sequential calls is the depth
+    of the graph rather than the number of nodes.
+    """
+    child_nodes_map = {}
+    pool = eventlet.GreenPool(concurrency)
+    queued_nodes = set()
+    frontier = []
+    for node in start_nodes:
+        if node not in queued_nodes:
+            queued_nodes.add(node)
+            frontier.append(node)
+
+    while frontier:
+        LOG.trace("Discovering the child nodes of %s", frontier)
+        next_frontier = []
+        results = pool.imap(get_child_nodes_func, frontier)
+        for node, child_nodes in six.moves.zip(frontier, results):
+            child_nodes = list(child_nodes)
+            child_nodes_map[node] = child_nodes
+            for child_node in child_nodes:
+                if child_node not in queued_nodes:
+                    queued_nodes.add(child_node)
+                    next_frontier.append(child_node)
+        frontier = next_frontier
+
+    return child_nodes_map
+
+
+def build_graph(start_nodes, get_child_nodes_func, concurrency=1):
+    start_nodes = list(start_nodes)
+    child_nodes_map = _discover_child_nodes(start_nodes, get_child_nodes_func,
+                                            concurrency)
     context = _GraphBuilderContext(
         source_set=set(start_nodes),
         encountered_set=set(),
         finished_nodes={},
-        get_child_nodes=get_child_nodes_func,
+        get_child_nodes=child_nodes_map.__getitem__,
     )
 
     result = []
@@ -110,8 +152,19 @@ class GraphWalkerListener(object):
 
 
 class GraphWalker(object):
-    def __init__(self):
+    """Walk a graph depth first, notifying the registered listeners
+
+    Nodes are told apart by their value. A node reachable from several
+    parents is entered once for each of them, with already_visited set
+    after the first time. By default its child nodes are walked again every
+    time, when descend_visited is False they are only walked the first
+    time, which keeps the cost of the walk linear in the size of the graph.
+    The walk uses an explicit stack, so deep graphs do not hit the
+    recursion limit.
+    """
+    def __init__(self, descend_visited=True):
         self._listeners = []
+        self._descend_visited = descend_visited
 
     def register_listener(self, graph_walker_listener):
         self._listeners.append(graph_walker_listener)
@@ -119,19 +172,35 @@ class GraphWalker(object):
     def unregister_listener(self, graph_walker_listener):
         self._listeners.remove(graph_walker_listener)
 
-    def walk_graph(self, source_nodes):
-        self._walk_graph(source_nodes, set())
-
-    def _walk_graph(self, source_nodes, visited_nodes):
-        for node in source_nodes:
-            for listener in self._listeners:
-                listener.on_node_enter(node, node in visited_nodes)
-                visited_nodes.add(node)
+    def _enter_node(self, node, already_visited):
+        for listener in self._listeners:
+            listener.on_node_enter(node, already_visited)
 
-            self._walk_graph(node.child_nodes, visited_nodes)
+    def _exit_node(self, node):
+        for listener in self._listeners:
+            listener.on_node_exit(node)
 
-            for listener in self._listeners:
-                listener.on_node_exit(node)
+    def walk_graph(self, source_nodes):
+        visited_values = set()
+        # Every entry is a node and an iterator over the child nodes left to
+        # walk, the entry of the source nodes has no node
+        stack = [(None, iter(source_nodes))]
+        while stack:
+            parent_node, child_nodes = stack[-1]
+            node = next(child_nodes, None)
+            if node is None:
+                stack.pop()
+                if parent_node is not None:
+                    self._exit_node(parent_node)
+                continue
+
+            already_visited = node.value in visited_values
+            visited_values.add(node.value)
+            self._enter_node(node, already_visited)
+            if already_visited and not self._descend_visited:
+                self._exit_node(node)
+            else:
+                stack.append((node, iter(node.child_nodes)))
 
 
 class PackGraphWalker(GraphWalkerListener):
@@ -154,14 +223,18 @@ class PackGraphWalker(GraphWalkerListener):
         def key_serialize(key):
             return hex(key)
 
+        # A node shared by several parents is packed once
+        if node.value in self._node_to_sid:
+            return
+
         node_sid = self._sid_counter
         self._sid_counter += 1
-        self._node_to_sid[node] = node_sid
+        self._node_to_sid[node.value] = node_sid
         self._sid_to_node[key_serialize(node_sid)] = node.value
 
         if len(node.child_nodes) > 0:
             children_sids = map(lambda node:
-                                key_serialize(self._node_to_sid[node]),
+                                key_serialize(self._node_to_sid[node.value]),
                                 node.child_nodes)
             self._adjacency_list.append(
                 (key_serialize(node_sid), tuple(children_sids))
@@ -173,7 +246,7 @@ def pack_graph(start_nodes):
 
     Packs a graph into a flat PackedGraph (nodes dictionary, adjacency list).
     """
-    walker = GraphWalker()
+    walker = GraphWalker(descend_visited=False)
     nodes_dict = {}
     adjacency_list = []
     packer = PackGraphWalker(adjacency_list, nodes_dict)
@@ -203,7 +276,8 @@ def unpack_graph(packed_graph):
                 graph_nodes_dict[child_sid] = GraphNode(
                     nodes_dict[child_sid], ())
             children.append(graph_nodes_dict[child_sid])
-            del(nodes_dict[child_sid])
+            # A child shared by several parents is not a source node either
+            nodes_dict.pop(child_sid, None)
         graph_nodes_dict[parent_sid] = GraphNode(nodes_dict[parent_sid],
                                                  tuple(children))
 
@@ -230,3 +304,76 @@ def deserialize_resource_graph(serialized_resource_graph):
                                                     name=node[2])
     resource_graph = unpack_graph(packed_resource_graph)
     return resource_graph
+
+
+def encode_resource_graph(resource_graph, codec=None):
+    """Return the compact form of a resource graph
+
+    The result can be stored as is in a JSON document. Resource types are
+    kept once in a type table, nodes are numbered by their position in the
+    node list and every adjacency entry is an array of a parent followed by
+    its children, children coming before their parents. When a codec is
+    given large graphs are compressed with it and base64 encoded.
+    """
+    packed_graph = pack_graph(resource_graph)
+    type_ids = {}
+    nodes = [None] * len(packed_graph.nodes)
+    for sid, resource in packed_graph.nodes.items():
+        type_id = type_ids.setdefault(resource.type, len(type_ids))
+        nodes[int(sid, 16)] = [type_id, resource.id, resource.name]
+    types = sorted(type_ids, key=type_ids.get)
+    adjacency = [[int(parent_sid, 16)] + [int(sid, 16) for sid in child_sids]
+                 for parent_sid, child_sids in packed_graph.adjacency]
+    encoded_graph = {
+        "types": types,
+        "nodes": nodes,
+        "adjacency": adjacency,
+    }
+
+    if codec is not None:
+        data = json.dumps(encoded_graph).encode("utf-8")
+        if len(data) >= _MIN_COMPRESS_SIZE:
+            return {
+                "version": RESOURCE_GRAPH_FORMAT_VERSION,
+                "codec": codec.name,
+                "data": base64.b64encode(codec.compress(data)).decode("ascii"),
+            }
+    encoded_graph["version"] = RESOURCE_GRAPH_FORMAT_VERSION
+    return encoded_graph
+
+
+def decode_resource_graph(encoded_resource_graph):
+    """Return the resource graph of encode_resource_graph"""
+    version = encoded_resource_graph.get("version")
+    if version != RESOURCE_GRAPH_FORMAT_VERSION:
+        raise exception.InvalidInput(
+            reason=_("Unsupported resource graph version: %s") % version)
+    if "codec" in encoded_resource_graph:
+        codec = bank_plugin.get_codec(encoded_resource_graph["codec"])
+        data = codec.decompress(
+            base64.b64decode(encoded_resource_graph["data"]))
+        encoded_resource_graph = json.loads(data.decode("utf-8"))
+
+    types = encoded_resource_graph["types"]
+    resources = [Resource(type=types[type_id], id=resource_id, name=name)
+                 for type_id, resource_id, name
+                 in encoded_resource_graph["nodes"]]
+    graph_nodes = {}
+    source_ids = set(range(len(resources)))
+    for entry in encoded_resource_graph["adjacency"]:
+        parent_id = entry[0]
+        if parent_id in graph_nodes:
+            raise exception.InvalidInput(
+                reason=_("Resource graph adjacency list must be "
+                         "topologically ordered"))
+        child_nodes = []
+        for child_id in entry[1:]:
+            if child_id not in graph_nodes:
+                graph_nodes[child_id] = GraphNode(resources[child_id], ())
+            child_nodes.append(graph_nodes[child_id])
+            source_ids.discard(child_id)
+        graph_nodes[parent_id] = GraphNode(resources[parent_id],
+                                           tuple(child_nodes))
+
+    return [graph_nodes.get(node_id) or GraphNode(resources[node_id], ())
+            for node_id in sorted(source_ids)]
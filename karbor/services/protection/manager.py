@@ -20,14 +20,16 @@ import six
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_service import periodic_task
 
 from karbor.common import constants
 from karbor import exception
-from karbor.i18n import _, _LI, _LE
+from karbor.i18n import _, _LE, _LI, _LW
 from karbor import manager
 from karbor.resource import Resource
 from karbor.services.protection.flows import worker as flow_manager
 from karbor.services.protection.protectable_registry import ProtectableRegistry
+from karbor.services.protection import waiter
 from karbor import utils
 
 LOG = logging.getLogger(__name__)
@@ -47,7 +49,7 @@ PROVIDER_NAMESPACE = 'karbor.provider'
 class ProtectionManager(manager.Manager):
     """karbor Protection Manager."""
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.2'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -66,13 +68,25 @@ class ProtectionManager(manager.Manager):
         # TODO(wangliuan)
         LOG.info(_LI("Starting protection service"))
 
+    @periodic_task.periodic_task
+    def _log_worker_pool_stats(self, context):
+        for provider_id, provider in self.provider_registry.providers.items():
+            LOG.debug("Worker pool of provider %(provider_id)s: %(stats)s",
+                      {"provider_id": provider_id,
+                       "stats": provider.worker_pool.stats})
+
     @messaging.expected_exceptions(exception.InvalidPlan,
                                    exception.ProviderNotFound,
+                                   exception.ProviderBusy,
                                    exception.FlowError)
-    def protect(self, context, plan):
+    def protect(self, context, plan,
+                priority=constants.PROTECTION_PRIORITY_MANUAL):
         """create protection for the given plan
 
         :param plan: Define that protection plan should be done
+        :param priority: whether the protection was requested by a user or
+                         scheduled, the scheduled ones are rejected first
+                         when the provider is busy
         """
 
         LOG.info(_LI("Starting protection service:protect action"))
@@ -84,6 +98,16 @@ class ProtectionManager(manager.Manager):
         provider_id = plan.get('provider_id', None)
         plan_id = plan.get('id', None)
         provider = self.provider_registry.show_provider(provider_id)
+        if provider.worker_pool.is_saturated(priority):
+            provider.worker_pool.reject()
+            LOG.warning(_LW("Rejecting %(priority)s protection of plan "
+                            "%(plan_id)s, provider %(provider_id)s is busy: "
+                            "%(stats)s"),
+                        {"priority": priority,
+                         "plan_id": plan_id,
+                         "provider_id": provider_id,
+                         "stats": provider.worker_pool.stats})
+            raise exception.ProviderBusy(provider_id=provider_id)
         try:
             protection_flow = self.worker.get_flow(context,
                                                    constants.OPERATION_PROTECT,
@@ -177,6 +201,9 @@ class ProtectionManager(manager.Manager):
                 checkpoint_id=checkpoint_id)
         checkpoint.status = constants.CHECKPOINT_STATUS_DELETING
         checkpoint.commit()
+        # the backups of a failed protection may still be waiting for their
+        # resources, stop them before their bank sections are deleted
+        waiter.cancel_checkpoint_waits(checkpoint_id)
 
         try:
             delete_checkpoint_flow = self.worker.get_delete_checkpoint_flow(
@@ -223,14 +250,9 @@ class ProtectionManager(manager.Manager):
                 filters.get("end_date"), "%Y-%m-%d")
         sort_dir = None if sort_dirs is None else sort_dirs[0]
         provider = self.provider_registry.show_provider(provider_id)
-        checkpoint_ids = provider.list_checkpoints(
+        return provider.list_checkpoint_summaries(
             limit=limit, marker=marker, plan_id=plan_id,
             start_date=start_date, end_date=end_date, sort_dir=sort_dir)
-        checkpoints = []
-        for checkpoint_id in checkpoint_ids:
-            checkpoint = provider.get_checkpoint(checkpoint_id)
-            checkpoints.append(checkpoint.to_dict())
-        return checkpoints
 
     @messaging.expected_exceptions(exception.ProviderNotFound,
                                    exception.CheckpointNotFound)
@@ -350,6 +372,38 @@ class ProtectionManager(manager.Manager):
 
         return result
 
+    @messaging.expected_exceptions(exception.ListProtectableResourceFailed)
+    def list_protectable_dependents_bulk(self, context,
+                                         protectable_ids,
+                                         protectable_type):
+        LOG.info(_LI("Start to list dependents of %(count)d resources "
+                     "(type:%(type)s)"),
+                 {'count': len(protectable_ids),
+                  'type': protectable_type})
+
+        parent_resources = [Resource(type=protectable_type, id=protectable_id,
+                                     name="")
+                            for protectable_id in protectable_ids]
+
+        try:
+            dependent_resources = \
+                self.protectable_registry.fetch_dependent_resources_bulk(
+                    context, parent_resources)
+        except exception.ListProtectableResourceFailed as err:
+            LOG.error(_LE("List dependent resources of %(type)s resources "
+                          "failed: %(err)s"),
+                      {'type': protectable_type,
+                       'err': six.text_type(err)})
+            raise
+
+        result = {}
+        for parent_resource, resources in dependent_resources.items():
+            result[parent_resource.id] = [
+                dict(type=resource.type, id=resource.id, name=resource.name)
+                for resource in resources]
+
+        return result
+
     def list_providers(self, context, marker=None, limit=None,
                        sort_keys=None, sort_dirs=None, filters=None):
         return self.provider_registry.list_providers(marker=marker,
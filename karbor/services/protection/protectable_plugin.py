@@ -11,9 +11,32 @@
 #    under the License.
 
 import abc
+from eventlet import event
 import six
 
 
+class InventoryCache(object):
+    """Resources listed once and shared by the lookups of one request
+
+    Protectable plugins keep the listings they need to find dependent
+    resources here, usually indexed by parent, so building a resource graph
+    lists each kind of resource once rather than once per parent resource.
+    Concurrent lookups of the same key wait for the first one to load it.
+    """
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, load_func):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = event.Event()
+            try:
+                entry.send(load_func())
+            except Exception as e:
+                entry.send_exception(e)
+        return entry.wait()
+
+
 @six.add_metaclass(abc.ABCMeta)
 class ProtectablePlugin(object):
     """Base abstract class for protectable plugin.
@@ -69,3 +92,15 @@ class ProtectablePlugin(object):
         :return: the list of dependent resource instances.
         """
         pass
+
+    def get_dependent_resources_from_inventory(self, context, parent_resource,
+                                               inventory):
+        """List dependent resource instances using an inventory cache.
+
+        Plugins which can find the dependent resources of many parents from
+        a single listing override this to keep the listing in inventory.
+
+        :param inventory: the InventoryCache shared by the request.
+        :return: the list of dependent resource instances.
+        """
+        return self.get_dependent_resources(context, parent_resource)
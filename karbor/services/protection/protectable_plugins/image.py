@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import six
 
 from karbor.common import constants
@@ -56,47 +57,66 @@ class ImageProtectablePlugin(protectable_plugin.ProtectablePlugin):
                                       id=image.id, name=image.name)
                     for image in images]
 
-    def _get_dependent_resources_by_server(self,
-                                           context,
-                                           parent_resource):
+    def _list_images(self, context):
         try:
-            server = self._nova_client(context).servers.get(parent_resource.id)
+            return list(self._glance_client(context).images.list())
         except Exception as e:
-            LOG.exception(_LE("List all server from nova failed."))
+            LOG.exception(_LE("List all images from glance failed."))
             raise exception.ListProtectableResourceFailed(
                 type=self._SUPPORT_RESOURCE_TYPE,
                 reason=six.text_type(e))
 
-        if not server.image:
-            return []
+    def _get_image(self, context, image_id):
         try:
-            image = self._glance_client(context).images.get(server.image['id'])
+            return self._glance_client(context).images.get(image_id)
         except Exception as e:
             LOG.exception(_LE("Getting image from glance failed."))
             raise exception.ListProtectableResourceFailed(
                 type=self._SUPPORT_RESOURCE_TYPE,
                 reason=six.text_type(e))
 
-        return [resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
-                                  id=server.image['id'],
-                                  name=image.name)]
-
-    def _get_dependent_resources_by_project(self,
-                                            context,
-                                            parent_resource):
+    def _get_dependent_resources_by_server(self,
+                                           context,
+                                           parent_resource,
+                                           inventory):
         try:
-            images = self._glance_client(context).images.list()
+            server = self._nova_client(context).servers.get(parent_resource.id)
         except Exception as e:
-            LOG.exception(_LE("List all images from glance failed."))
+            LOG.exception(_LE("List all server from nova failed."))
             raise exception.ListProtectableResourceFailed(
                 type=self._SUPPORT_RESOURCE_TYPE,
                 reason=six.text_type(e))
-        else:
-            return [resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
-                                      id=image.id,
-                                      name=image.name)
-                    for image in images
-                    if image.owner == parent_resource.id]
+
+        if not server.image:
+            return []
+        # Many servers are usually booted from the same few images
+        image_id = server.image['id']
+        image = inventory.get((self._SUPPORT_RESOURCE_TYPE, 'id', image_id),
+                              lambda: self._get_image(context, image_id))
+
+        return [resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
+                                  id=image_id,
+                                  name=image.name)]
+
+    def _index_images_by_owner(self, images):
+        index = collections.defaultdict(list)
+        for image in images:
+            index[image.owner].append(
+                resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
+                                  id=image.id,
+                                  name=image.name))
+        return index
+
+    def _get_dependent_resources_by_project(self,
+                                            context,
+                                            parent_resource,
+                                            inventory):
+        images_by_owner = inventory.get(
+            (self._SUPPORT_RESOURCE_TYPE, constants.PROJECT_RESOURCE_TYPE),
+            lambda: self._index_images_by_owner(inventory.get(
+                (self._SUPPORT_RESOURCE_TYPE, None),
+                lambda: self._list_images(context))))
+        return list(images_by_owner.get(parent_resource.id, ()))
 
     def show_resource(self, context, resource_id, parameters=None):
         try:
@@ -110,13 +130,20 @@ class ImageProtectablePlugin(protectable_plugin.ProtectablePlugin):
             return resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
                                      id=image.id, name=image.name)
 
-    def get_dependent_resources(self, context, parent_resource):
+    def get_dependent_resources_from_inventory(self, context, parent_resource,
+                                               inventory):
         if parent_resource.type == constants.SERVER_RESOURCE_TYPE:
             return self._get_dependent_resources_by_server(context,
-                                                           parent_resource)
+                                                           parent_resource,
+                                                           inventory)
 
         if parent_resource.type == constants.PROJECT_RESOURCE_TYPE:
             return self._get_dependent_resources_by_project(context,
-                                                            parent_resource)
+                                                            parent_resource,
+                                                            inventory)
 
         return []
+
+    def get_dependent_resources(self, context, parent_resource):
+        return self.get_dependent_resources_from_inventory(
+            context, parent_resource, protectable_plugin.InventoryCache())
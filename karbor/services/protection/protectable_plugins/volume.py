@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import six
 
 from karbor.common import constants
@@ -71,24 +72,44 @@ class VolumeProtectablePlugin(protectable_plugin.ProtectablePlugin):
             return resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
                                      id=volume.id, name=volume.name)
 
-    def get_dependent_resources(self, context, parent_resource):
-        def _is_attached_to(vol):
-            if parent_resource.type == constants.SERVER_RESOURCE_TYPE:
-                return any([s.get('server_id') == parent_resource.id
-                            for s in vol.attachments])
-            if parent_resource.type == constants.PROJECT_RESOURCE_TYPE:
-                return getattr(vol, 'os-vol-tenant-attr:tenant_id') == \
-                    parent_resource.id
-
+    def _list_detailed_volumes(self, context):
         try:
-            volumes = self._client(context).volumes.list(detailed=True)
+            return self._client(context).volumes.list(detailed=True)
         except Exception as e:
             LOG.exception(_LE("List all detailed volumes "
                               "from cinder failed."))
             raise exception.ListProtectableResourceFailed(
                 type=self._SUPPORT_RESOURCE_TYPE,
                 reason=six.text_type(e))
-        else:
-            return [resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
-                                      id=vol.id, name=vol.name)
-                    for vol in volumes if _is_attached_to(vol)]
+
+    def _index_volumes(self, volumes, parent_resource_type):
+        index = collections.defaultdict(list)
+        for vol in volumes:
+            if parent_resource_type == constants.SERVER_RESOURCE_TYPE:
+                parent_ids = set(s.get('server_id') for s in vol.attachments)
+            else:
+                parent_ids = (getattr(vol, 'os-vol-tenant-attr:tenant_id'), )
+            for parent_id in parent_ids:
+                index[parent_id].append(
+                    resource.Resource(type=self._SUPPORT_RESOURCE_TYPE,
+                                      id=vol.id, name=vol.name))
+        return index
+
+    def get_dependent_resources_from_inventory(self, context, parent_resource,
+                                               inventory):
+        if parent_resource.type not in self.get_parent_resource_types():
+            return []
+
+        def _load_index():
+            volumes = inventory.get(
+                (self._SUPPORT_RESOURCE_TYPE, None),
+                lambda: self._list_detailed_volumes(context))
+            return self._index_volumes(volumes, parent_resource.type)
+
+        index = inventory.get(
+            (self._SUPPORT_RESOURCE_TYPE, parent_resource.type), _load_index)
+        return list(index.get(parent_resource.id, ()))
+
+    def get_dependent_resources(self, context, parent_resource):
+        return self.get_dependent_resources_from_inventory(
+            context, parent_resource, protectable_plugin.InventoryCache())
@@ -10,14 +10,29 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
+
 from karbor import exception
 from karbor.i18n import _
 from karbor.services.protection.graph import build_graph
+from karbor.services.protection.protectable_plugin import InventoryCache
 import six
 
+from oslo_config import cfg
 from oslo_log import log as logging
 from stevedore import extension
 
+protectable_registry_opts = [
+    cfg.IntOpt('dependent_resources_fetch_concurrency',
+               default=16,
+               min=1,
+               help='The number of resources whose dependent resources are '
+                    'fetched concurrently while building a resource graph.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(protectable_registry_opts)
+
 LOG = logging.getLogger(__name__)
 
 
@@ -91,28 +106,55 @@ class ProtectableRegistry(object):
         return protectable.show_resource(context, resource_id,
                                          parameters=parameters)
 
-    def fetch_dependent_resources(self, context, resource):
+    def fetch_dependent_resources(self, context, resource, inventory=None):
         """List dependent resources under given parent resource.
 
         :param resource: The parent resource to list dependent resources.
+        :param inventory: The InventoryCache shared by the lookups of the
+                          request, a new one when not given.
         :return: The list of dependent resources.
         """
+        if inventory is None:
+            inventory = InventoryCache()
         result = []
         for plugin in six.itervalues(self._plugin_map):
             if resource.type in plugin.get_parent_resource_types():
                 protectable = self._get_protectable(
                     context,
                     plugin.get_resource_type())
-                result.extend(protectable.get_dependent_resources(context,
-                                                                  resource))
+                result.extend(
+                    protectable.get_dependent_resources_from_inventory(
+                        context, resource, inventory))
 
         return result
 
+    def fetch_dependent_resources_bulk(self, context, resources):
+        """List dependent resources under several parent resources.
+
+        The lookups run concurrently and share one InventoryCache, so each
+        kind of resource is listed once for all the parents.
+
+        :param resources: The parent resources to list dependent resources.
+        :return: A dict mapping each parent resource to the list of its
+                 dependent resources.
+        """
+        inventory = InventoryCache()
+        pool = eventlet.GreenPool(CONF.dependent_resources_fetch_concurrency)
+        results = pool.imap(
+            lambda resource: self.fetch_dependent_resources(
+                context, resource, inventory),
+            resources)
+        return dict(six.moves.zip(resources, results))
+
     def build_graph(self, context, resources):
+        inventory = InventoryCache()
+
         def fetch_dependent_resources_context(resource):
-            return self.fetch_dependent_resources(context, resource)
+            return self.fetch_dependent_resources(context, resource,
+                                                  inventory)
 
         return build_graph(
             start_nodes=resources,
             get_child_nodes_func=fetch_dependent_resources_context,
+            concurrency=CONF.dependent_resources_fetch_concurrency,
         )
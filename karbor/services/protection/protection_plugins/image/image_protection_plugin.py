@@ -10,28 +10,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import eventlet
-import os
 
-from io import BytesIO
 from karbor.common import constants
 from karbor import exception
 from karbor.i18n import _LE, _LI
+from karbor.services.protection import chunked_transfer
 from karbor.services.protection.client_factory import ClientFactory
+from karbor.services.protection import waiter
+from karbor.services.protection import worker_pool
 from karbor.services.protection.protection_plugins.base_protection_plugin \
     import BaseProtectionPlugin
 from karbor.services.protection.protection_plugins.image \
     import image_plugin_schemas as image_schemas
 from oslo_config import cfg
 from oslo_log import log as logging
-from time import sleep
 
 protection_opts = [
     cfg.IntOpt('backup_image_object_size',
                default=52428800,
-               help='The size in bytes of instance image objects'),
-    cfg.IntOpt('retry_attempts',
-               default=10)
+               help='The size in bytes of instance image objects')
 ]
 
 CONF = cfg.CONF
@@ -44,8 +41,10 @@ class GlanceProtectionPlugin(BaseProtectionPlugin):
 
     def __init__(self, config=None):
         super(GlanceProtectionPlugin, self).__init__(config)
-        self._tp = eventlet.GreenPool()
+        self._tp = worker_pool.get_worker_pool(config)
         self.data_block_size_bytes = CONF.backup_image_object_size
+        self._chunk_writer_options = \
+            chunked_transfer.chunk_writer_options(config)
 
     def _add_to_threadpool(self, func, *args, **kwargs):
         self._tp.spawn_n(func, *args, **kwargs)
@@ -106,34 +105,21 @@ class GlanceProtectionPlugin(BaseProtectionPlugin):
                 resource_type=constants.IMAGE_RESOURCE_TYPE)
 
         self._add_to_threadpool(self._create_backup, glance_client,
-                                bank_section, image_id)
+                                bank_section, image_id, checkpoint.id)
 
-    def _create_backup(self, glance_client, bank_section, image_id):
+    def _create_backup(self, glance_client, bank_section, image_id,
+                       checkpoint_id):
         try:
-            image_info = glance_client.images.get(image_id)
-
-            retry_attempts = CONF.retry_attempts
-            while image_info.status != "active" and retry_attempts != 0:
-                sleep(60)
-                image_info = glance_client.images.get(image_id)
-                retry_attempts -= 1
-
-            if retry_attempts == 0:
-                raise Exception
+            waiter.ResourceWaiter(
+                constants.IMAGE_RESOURCE_TYPE,
+                checkpoint_id=checkpoint_id).wait_for_image(glance_client,
+                                                            image_id)
 
             image_response = glance_client.images.data(image_id)
-            image_response_data = BytesIO()
-            for chunk in image_response:
-                image_response_data.write(chunk)
-            image_response_data.seek(0, os.SEEK_SET)
-
-            chunks = 0
-            while True:
-                data = image_response_data.read(self.data_block_size_bytes)
-                if data == '':
-                    break
-                bank_section.create_object("data_" + str(chunks), data)
-                chunks += 1
+            chunked_transfer.upload_chunks(bank_section, "data",
+                                           image_response,
+                                           self.data_block_size_bytes,
+                                           **self._chunk_writer_options)
 
             # update resource_definition backup_status
             bank_section.update_object("status",
@@ -164,32 +150,19 @@ class GlanceProtectionPlugin(BaseProtectionPlugin):
         try:
             resource_definition = bank_section.get_object('metadata')
             image_metadata = resource_definition['image_metadata']
-            objects = [key.split("/")[-1] for key in
-                       bank_section.list_objects()]
-
-            # get image_data
-            image_data = BytesIO()
-            for obj in objects:
-                if obj.find("data_") == 0:
-                    data = bank_section.get_object(obj)
-                    image_data.write(data)
-            image_data.seek(0, os.SEEK_SET)
             disk_format = image_metadata["disk_format"]
             container_format = image_metadata["container_format"]
             image = glance_client.images.create(
                 disk_format=disk_format,
                 container_format=container_format,
                 name=name)
-            glance_client.images.upload(image.id, image_data)
+            with chunked_transfer.ChunkedRestoreReader.from_section(
+                    bank_section, "data") as image_data:
+                glance_client.images.upload(image.id, image_data)
 
-            image_info = glance_client.images.get(image.id)
-            retry_attempts = CONF.retry_attempts
-            while image_info.status != "active" and retry_attempts != 0:
-                sleep(60)
-                image_info = glance_client.images.get(image.id)
-                retry_attempts -= 1
-            if retry_attempts == 0:
-                raise Exception
+            waiter.ResourceWaiter(
+                constants.IMAGE_RESOURCE_TYPE).wait_for_image(glance_client,
+                                                              image.id)
 
             heat_template.put_parameter(original_image_id, image.id)
         except Exception as e:
@@ -212,10 +185,9 @@ class GlanceProtectionPlugin(BaseProtectionPlugin):
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETING)
             objects = bank_section.list_objects()
-            for obj in objects:
-                if obj == "status":
-                    continue
-                bank_section.delete_object(obj)
+            chunked_transfer.release_chunks(bank_section, objects)
+            bank_section.delete_objects(
+                [obj for obj in objects if obj != "status"])
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETED)
         except Exception as err:
@@ -10,20 +10,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import eventlet
-from io import BytesIO
-import os
-from time import sleep
+import time
 
 from karbor.common import constants
 from karbor import exception
 from karbor.i18n import _LE, _LI
+from karbor.services.protection import chunked_transfer
 from karbor.services.protection.client_factory import ClientFactory
 from karbor.services.protection.protection_plugins.base_protection_plugin \
     import BaseProtectionPlugin
 from karbor.services.protection.protection_plugins.server \
     import server_plugin_schemas
 from karbor.services.protection.restore_heat import HeatResource
+from karbor.services.protection import waiter
+from karbor.services.protection import worker_pool
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import uuidutils
@@ -47,8 +47,10 @@ class NovaProtectionPlugin(BaseProtectionPlugin):
 
     def __init__(self, config=None):
         super(NovaProtectionPlugin, self).__init__(config)
-        self._tp = eventlet.GreenPool()
+        self._tp = worker_pool.get_worker_pool(config)
         self.image_object_size = CONF.backup_image_object_size
+        self._chunk_writer_options = \
+            chunked_transfer.chunk_writer_options(config)
 
     def _add_to_threadpool(self, func, *args, **kwargs):
         self._tp.spawn_n(func, *args, **kwargs)
@@ -163,15 +165,14 @@ class NovaProtectionPlugin(BaseProtectionPlugin):
     def _create_backup(self, glance_client, bank_section, server_id,
                        snapshot_id, resource_definition, checkpoint):
         try:
-            image = glance_client.images.get(snapshot_id)
-            # TODO(luobin): config retry_attempts
-            retry_attempts = 10
-            while image.status == "queued" and retry_attempts != 0:
-                sleep(60)
-                image = glance_client.images.get(snapshot_id)
-                retry_attempts -= 1
-            if retry_attempts == 0:
-                raise Exception
+            image_waiter = waiter.ResourceWaiter(
+                constants.SERVER_RESOURCE_TYPE, checkpoint_id=checkpoint.id)
+            deadline = time.time() + image_waiter.timeout
+            image = image_waiter.wait_for_image(
+                glance_client, snapshot_id,
+                ready_statuses=(waiter.IMAGE_STATUS_SAVING,
+                                waiter.IMAGE_STATUS_ACTIVE),
+                deadline=deadline)
 
             resource_definition["snapshot_id"] = snapshot_id
             snapshot_metadata = {
@@ -202,64 +203,33 @@ class NovaProtectionPlugin(BaseProtectionPlugin):
             # write resource_definition in bank
             bank_section.create_object("metadata", resource_definition)
 
-            image = glance_client.images.get(snapshot_id)
-            # TODO(luobin): config retry_attempts
-            retry_attempts = 10
-            while image.status != "active" and retry_attempts != 0:
-                sleep(60)
-                image = glance_client.images.get(snapshot_id)
-                retry_attempts -= 1
-            if retry_attempts == 0:
-                raise Exception
+            image = image_waiter.wait_for_image(glance_client, snapshot_id,
+                                                deadline=deadline)
 
             # store kernel_data if need
             if getattr(image, "kernel_id", None) is not None:
                 kernel_id = image.kernel_id
                 kernel_response = glance_client.images.data(kernel_id)
-                kernel_response_data = BytesIO()
-                for chunk in kernel_response:
-                    kernel_response_data.write(chunk)
-                kernel_response_data.seek(0, os.SEEK_SET)
-
-                chunks = 0
-                while True:
-                    data = kernel_response_data.read(self.image_object_size)
-                    if data == '':
-                        break
-                    bank_section.create_object("kernel_" + str(chunks), data)
-                    chunks += 1
+                chunked_transfer.upload_chunks(bank_section, "kernel",
+                                               kernel_response,
+                                               self.image_object_size,
+                                               **self._chunk_writer_options)
 
             # store ramdisk_data if need
             if getattr(image, "ramdisk_id", None) is not None:
                 ramdisk_id = image.ramdisk_id
                 ramdisk_response = glance_client.images.data(ramdisk_id)
-                ramdisk_response_data = BytesIO()
-                for chunk in ramdisk_response:
-                    ramdisk_response_data.write(chunk)
-                ramdisk_response_data.seek(0, os.SEEK_SET)
-
-                chunks = 0
-                while True:
-                    data = ramdisk_response_data.read(self.image_object_size)
-                    if data == '':
-                        break
-                    bank_section.create_object("ramdisk_" + str(chunks), data)
-                    chunks += 1
+                chunked_transfer.upload_chunks(bank_section, "ramdisk",
+                                               ramdisk_response,
+                                               self.image_object_size,
+                                               **self._chunk_writer_options)
 
             # store snapshot_data
             image_response = glance_client.images.data(snapshot_id)
-            image_response_data = BytesIO()
-            for chunk in image_response:
-                image_response_data.write(chunk)
-            image_response_data.seek(0, os.SEEK_SET)
-
-            chunks = 0
-            while True:
-                data = image_response_data.read(self.image_object_size)
-                if data == '':
-                    break
-                bank_section.create_object("snapshot_" + str(chunks), data)
-                chunks += 1
+            chunked_transfer.upload_chunks(bank_section, "snapshot",
+                                           image_response,
+                                           self.image_object_size,
+                                           **self._chunk_writer_options)
 
             glance_client.images.delete(snapshot_id)
 
@@ -348,14 +318,8 @@ class NovaProtectionPlugin(BaseProtectionPlugin):
             snapshot_metadata, objects, original_id,
             kernel_id=kernel_id, ramdisk_id=ramdisk_id)
 
-        image_info = glance_client.images.get(image_id)
-        retry_attempts = 10
-        while image_info.status != "active" and retry_attempts != 0:
-            sleep(60)
-            image_info = glance_client.images.get(image_id)
-            retry_attempts -= 1
-        if retry_attempts == 0:
-            raise Exception
+        waiter.ResourceWaiter(constants.IMAGE_RESOURCE_TYPE).wait_for_image(
+            glance_client, image_id)
         return image_id
 
     def _restore_image(self, bank_section, checkpoint, glance_client,
@@ -368,12 +332,6 @@ class NovaProtectionPlugin(BaseProtectionPlugin):
             name = image_metadata["name"]
         disk_format = image_metadata["disk_format"]
         container_format = image_metadata["container_format"]
-        image_data = BytesIO()
-        for obj in objects:
-            if obj.find("%s_" % image_format) == 0:
-                data = bank_section.get_object(obj)
-                image_data.write(data)
-        image_data.seek(0, os.SEEK_SET)
         image = glance_client.images.create(
             disk_format=disk_format,
             container_format=container_format,
@@ -381,7 +339,10 @@ class NovaProtectionPlugin(BaseProtectionPlugin):
             kernel_id=kwargs.get("kernel_id"),
             ramdisk_id=kwargs.get("ramdisk_id"))
         image_id = image.id
-        glance_client.images.upload(image_id, image_data)
+        with chunked_transfer.ChunkedRestoreReader.from_section(
+                bank_section, image_format,
+                object_names=objects) as image_data:
+            glance_client.images.upload(image_id, image_data)
         return image_id
 
     def _heat_restore_server_instance(self, heat_template, image_id,
@@ -471,10 +432,9 @@ class NovaProtectionPlugin(BaseProtectionPlugin):
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETING)
             objects = bank_section.list_objects()
-            for obj in objects:
-                if obj == "status":
-                    continue
-                bank_section.delete_object(obj)
+            chunked_transfer.release_chunks(bank_section, objects)
+            bank_section.delete_objects(
+                [obj for obj in objects if obj != "status"])
             bank_section.update_object("status",
                                        constants.RESOURCE_STATUS_DELETED)
         except Exception as err:
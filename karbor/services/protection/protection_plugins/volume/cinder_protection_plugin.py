@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import six
 
 from cinderclient.exceptions import NotFound
@@ -22,22 +23,70 @@ from karbor.services.protection.protection_plugins.base_protection_plugin \
 from karbor.services.protection.protection_plugins.volume \
     import volume_plugin_cinder_schemas as cinder_schemas
 from karbor.services.protection.restore_heat import HeatResource
+from karbor.services.protection import status_poller
 from oslo_config import cfg
 from oslo_log import log as logging
-from oslo_service import loopingcall
 from oslo_utils import uuidutils
 
 
 protection_opts = [
     cfg.IntOpt('protection_sync_interval',
                default=60,
-               help='update protection status interval')
+               help='update protection status interval'),
+    cfg.IntOpt('protection_sync_page_size',
+               default=1000,
+               help='number of volume backups listed per request when '
+                    'updating the protection status'),
 ]
 CONF = cfg.CONF
 CONF.register_opts(protection_opts)
 
 LOG = logging.getLogger(__name__)
 
+# Backups listed by status, the others are done and fetched one by one
+_BACKUP_IN_PROGRESS_STATUSES = ("creating", "deleting")
+
+
+class BackupStatusFetcher(object):
+    """Fetches the statuses of the backups of a project in bulk
+
+    The backups in progress are listed by status, page by page, so a poll
+    costs a few list requests however many backups are tracked. Only the
+    backups missing from these lists, i.e. the ones which just finished,
+    are fetched one by one.
+    """
+    def __init__(self, cinder_client, page_size):
+        self.cinder_client = cinder_client
+        self.page_size = page_size
+
+    def _list_backups(self, status):
+        marker = None
+        while True:
+            backups = self.cinder_client.backups.list(
+                search_opts={"status": status},
+                marker=marker,
+                limit=self.page_size)
+            for backup in backups:
+                yield backup
+            if len(backups) < self.page_size:
+                break
+            marker = backups[-1].id
+
+    def __call__(self, backup_ids):
+        backup_ids = set(backup_ids)
+        statuses = {}
+        for status in _BACKUP_IN_PROGRESS_STATUSES:
+            for backup in self._list_backups(status):
+                if backup.id in backup_ids:
+                    statuses[backup.id] = backup.status
+        for backup_id in backup_ids.difference(statuses):
+            try:
+                backup = self.cinder_client.backups.get(backup_id)
+            except NotFound:
+                continue
+            statuses[backup_id] = backup.status
+        return statuses
+
 
 class CinderProtectionPlugin(BaseProtectionPlugin):
     _SUPPORT_RESOURCE_TYPES = [constants.VOLUME_RESOURCE_TYPE]
@@ -46,11 +95,7 @@ class CinderProtectionPlugin(BaseProtectionPlugin):
         super(CinderProtectionPlugin, self).__init__(config)
         self.protection_resource_map = {}
         self.protection_sync_interval = CONF.protection_sync_interval
-
-        sync_status_loop = loopingcall.FixedIntervalLoopingCall(
-            self.sync_status)
-        sync_status_loop.start(interval=self.protection_sync_interval,
-                               initial_delay=self.protection_sync_interval)
+        self._backup_status_fetchers = {}
 
     def get_supported_resources_types(self):
         return self._SUPPORT_RESOURCE_TYPES
@@ -92,12 +137,13 @@ class CinderProtectionPlugin(BaseProtectionPlugin):
                                                   force=True)
             resource_definition["backup_id"] = backup.id
             bank_section.create_object("metadata", resource_definition)
-            self.protection_resource_map[volume_id] = {
+            self._watch_backup(cntxt, {
+                "resource_id": volume_id,
                 "bank_section": bank_section,
                 "backup_id": backup.id,
                 "cinder_client": cinder_client,
                 "operation": "create"
-            }
+            })
         except Exception as e:
             LOG.error(_LE("create volume backup failed, volume_id: %s."),
                       volume_id)
@@ -123,12 +169,13 @@ class CinderProtectionPlugin(BaseProtectionPlugin):
             backup_id = resource_definition["backup_id"]
             cinder_client.backups.delete(backup_id)
             bank_section.delete_object("metadata")
-            self.protection_resource_map[resource_id] = {
+            self._watch_backup(cntxt, {
+                "resource_id": resource_id,
                 "bank_section": bank_section,
                 "backup_id": backup_id,
                 "cinder_client": cinder_client,
                 "operation": "delete"
-            }
+            })
         except Exception as e:
             LOG.error(_LE("delete volume backup failed, volume_id: %s."),
                       resource_id)
@@ -141,35 +188,51 @@ class CinderProtectionPlugin(BaseProtectionPlugin):
                 resource_type=constants.VOLUME_RESOURCE_TYPE
             )
 
-    def sync_status(self):
-        for resource_id, resource_info in self.protection_resource_map.items():
-            backup_id = resource_info["backup_id"]
-            bank_section = resource_info["bank_section"]
-            cinder_client = resource_info["cinder_client"]
-            operation = resource_info["operation"]
-            try:
-                backup = cinder_client.backups.get(backup_id)
-                if backup.status == "available":
-                    bank_section.update_object(
-                        "status", constants.RESOURCE_STATUS_AVAILABLE)
-                    self.protection_resource_map.pop(resource_id)
-                elif backup.status in ["error", "error-deleting"]:
-                    bank_section.update_object(
-                        "status", constants.RESOURCE_STATUS_ERROR)
-                    self.protection_resource_map.pop(resource_id)
-                else:
-                    continue
-            except Exception as exc:
-                if operation == "delete" and type(exc) == NotFound:
-                    bank_section.update_object(
-                        "status",
-                        constants.RESOURCE_STATUS_DELETED)
-                    LOG.info(_LI("deleting volume backup finished, "
-                                 "backup id: %s"), backup_id)
-                else:
-                    LOG.error(_LE("deleting volume backup error.exc: %s"),
-                              six.text_type(exc))
-                self.protection_resource_map.pop(resource_id)
+    def _watch_backup(self, cntxt, resource_info):
+        # Backups of the same project share a fetcher, so the poller
+        # fetches the ones due in the same round together
+        fetcher = self._backup_status_fetchers.get(cntxt.project_id)
+        if fetcher is None:
+            fetcher = BackupStatusFetcher(resource_info["cinder_client"],
+                                          CONF.protection_sync_page_size)
+            self._backup_status_fetchers[cntxt.project_id] = fetcher
+        else:
+            # The latest client has the freshest token
+            fetcher.cinder_client = resource_info["cinder_client"]
+
+        backup_id = resource_info["backup_id"]
+        self.protection_resource_map[backup_id] = resource_info
+        status_poller.get_poller().add_watch(
+            backup_id,
+            functools.partial(self._sync_backup_status, resource_info),
+            batch_fetch=fetcher,
+            max_interval=self.protection_sync_interval)
+
+    def _sync_backup_status(self, resource_info, backup_status):
+        backup_id = resource_info["backup_id"]
+        bank_section = resource_info["bank_section"]
+        operation = resource_info["operation"]
+        if backup_status == "available":
+            bank_section.update_object(
+                "status", constants.RESOURCE_STATUS_AVAILABLE)
+        elif backup_status in ["error", "error_deleting"]:
+            bank_section.update_object(
+                "status", constants.RESOURCE_STATUS_ERROR)
+        elif backup_status is None:
+            if operation == "delete":
+                bank_section.update_object(
+                    "status", constants.RESOURCE_STATUS_DELETED)
+                LOG.info(_LI("deleting volume backup finished, "
+                             "backup id: %s"), backup_id)
+            else:
+                LOG.error(_LE("volume backup not found, backup id: %s"),
+                          backup_id)
+                bank_section.update_object(
+                    "status", constants.RESOURCE_STATUS_ERROR)
+        else:
+            return False
+        self.protection_resource_map.pop(backup_id, None)
+        return True
 
     def restore_backup(self, cntxt, checkpoint, **kwargs):
         resource_node = kwargs.get("node")
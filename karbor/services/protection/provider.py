@@ -23,6 +23,7 @@ from karbor.services.protection.protectable_registry import ProtectableRegistry
 from karbor.services.protection.resource_graph import ResourceGraphContext
 from karbor.services.protection.resource_graph \
     import ResourceGraphWalkerListener
+from karbor.services.protection import worker_pool
 from karbor import utils
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -76,9 +77,15 @@ class PluggableProtectionProvider(object):
             raise ImportError(_("Empty bank"))
 
         self._load_bank(self._config.provider.bank)
-        self._bank = bank_plugin.Bank(self._bank_plugin)
+        self._config.register_opts(bank_plugin.bank_opts, 'bank')
+        self._bank = bank_plugin.Bank(
+            self._bank_plugin,
+            codec=bank_plugin.get_codec(
+                self._config.bank.compression,
+                self._config.bank.compression_level))
         self.checkpoint_collection = CheckpointCollection(
             self._bank)
+        self.worker_pool = worker_pool.get_worker_pool(self._config)
 
         if hasattr(self._config.provider, 'plugin'):
             for plugin_name in self._config.provider.plugin:
@@ -153,6 +160,14 @@ class PluggableProtectionProvider(object):
             limit=limit, marker=marker, plan_id=plan_id,
             start_date=start_date, end_date=end_date, sort_dir=sort_dir)
 
+    def list_checkpoint_summaries(self, limit=None, marker=None, plan_id=None,
+                                  start_date=None, end_date=None,
+                                  sort_dir=None):
+        checkpoint_collection = self.get_checkpoint_collection()
+        return checkpoint_collection.list_summaries(
+            limit=limit, marker=marker, plan_id=plan_id,
+            start_date=start_date, end_date=end_date, sort_dir=sort_dir)
+
     def build_task_flow(self, ctx):
         cntxt = ctx["context"]
         workflow_engine = ctx["workflow_engine"]
@@ -218,7 +233,7 @@ class PluggableProtectionProvider(object):
         # TODO(luobin): for other type operations
 
         walker_listener = ResourceGraphWalkerListener(resource_context)
-        graph_walker = GraphWalker()
+        graph_walker = GraphWalker(descend_visited=False)
         graph_walker.register_listener(walker_listener)
         graph_walker.walk_graph(resource_graph)
 
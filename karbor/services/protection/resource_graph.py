@@ -62,6 +62,12 @@ class ResourceGraphWalkerListener(GraphWalkerListener):
     def __init__(self, context):
         self.context = context
         self.plugin_map = self.context.plugin_map
+        self._resource_type_plugins = {}
+        for plugin in self.plugin_map.values():
+            if hasattr(plugin, "get_supported_resources_types"):
+                for resource_type in plugin.get_supported_resources_types():
+                    self._resource_type_plugins.setdefault(resource_type,
+                                                           plugin)
 
     def on_node_enter(self, node, already_visited):
         resource = node.value
@@ -96,10 +102,9 @@ class ResourceGraphWalkerListener(GraphWalkerListener):
         protection_plugin.on_resource_end(context)
 
     def _get_protection_plugin(self, resource_type):
-        for plugin in self.plugin_map.values():
-            if hasattr(plugin, "get_supported_resources_types"):
-                if resource_type in plugin.get_supported_resources_types():
-                    return plugin
+        plugin = self._resource_type_plugins.get(resource_type)
+        if plugin is not None:
+            return plugin
         LOG.error(_LE("no plugin support this resource_type:%s"),
                   resource_type)
         raise Exception(_("No plugin support this resource_type"))
@@ -32,9 +32,11 @@ class ProtectionAPI(object):
     API version history:
 
         1.0 - Initial version.
+        1.1 - Add list_protectable_dependents_bulk.
+        1.2 - Add priority to protect.
     """
 
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.2'
 
     def __init__(self):
         super(ProtectionAPI, self).__init__()
@@ -52,12 +54,19 @@ class ProtectionAPI(object):
             restore=restore,
             restore_auth=restore_auth)
 
-    def protect(self, ctxt, plan=None):
-        cctxt = self.client.prepare(version='1.0')
+    def protect(self, ctxt, plan=None, priority=None):
+        if priority is None:
+            cctxt = self.client.prepare(version='1.0')
+            return cctxt.call(
+                ctxt,
+                'protect',
+                plan=plan)
+        cctxt = self.client.prepare(version='1.2')
         return cctxt.call(
             ctxt,
             'protect',
-            plan=plan)
+            plan=plan,
+            priority=priority)
 
     def delete(self, ctxt, provider_id, checkpoint_id):
         cctxt = self.client.prepare(version='1.0')
@@ -128,6 +137,16 @@ class ProtectionAPI(object):
             protectable_id=protectable_id,
             protectable_type=protectable_type)
 
+    def list_protectable_dependents_bulk(self,
+                                         ctxt, protectable_ids=None,
+                                         protectable_type=None):
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.call(
+            ctxt,
+            'list_protectable_dependents_bulk',
+            protectable_ids=protectable_ids,
+            protectable_type=protectable_type)
+
     def show_protectable_instance(self,
                                   ctxt, protectable_type=None,
                                   protectable_id=None,
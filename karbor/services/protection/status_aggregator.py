@@ -0,0 +1,86 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+
+from karbor.common import constants
+
+_aggregators = {}
+
+
+class ResourceStatusAggregator(object):
+    """Keeps count of the statuses of the resources of a checkpoint
+
+    Statuses written by the protection plugins of this process are reported
+    as they happen, so the status of the checkpoint can be derived without
+    reading the status of every resource from the bank. Reading them all
+    remains available through poll, for the statuses written before the
+    aggregator was registered or by other processes. on_change is called
+    with the new statuses every time one of them changes.
+    """
+    def __init__(self, checkpoint_id, resource_ids, on_change=None):
+        self.checkpoint_id = checkpoint_id
+        self._statuses = dict.fromkeys(resource_ids,
+                                       constants.RESOURCE_STATUS_UNDEFINED)
+        self._counts = collections.Counter(self._statuses.values())
+        self._version = 0
+        self._reported_versions = {}
+        self.on_change = on_change
+
+    @property
+    def statuses(self):
+        """The set of the current statuses of the resources"""
+        return frozenset(status for status, count in self._counts.items()
+                         if count)
+
+    def _set_status(self, resource_id, status):
+        old_status = self._statuses.get(resource_id)
+        if old_status is None or old_status == status:
+            return
+        self._statuses[resource_id] = status
+        self._counts[old_status] -= 1
+        self._counts[status] += 1
+        if self.on_change is not None:
+            self.on_change(self.statuses)
+
+    def report(self, resource_id, status):
+        """Record the status a protection plugin wrote for a resource"""
+        self._version += 1
+        self._reported_versions[resource_id] = self._version
+        self._set_status(resource_id, status)
+
+    def poll(self, checkpoint, status_getters):
+        """Read the status of every resource from the bank"""
+        version = self._version
+        for status_getter in status_getters:
+            resource_id = status_getter.get('resource_id')
+            get_resource_stats = status_getter.get('get_resource_stats')
+            status = get_resource_stats(checkpoint, resource_id)
+            # A status reported while polling is newer than the one read
+            if self._reported_versions.get(resource_id, 0) <= version:
+                self._set_status(resource_id, status)
+
+
+def register(checkpoint_id, resource_ids):
+    aggregator = ResourceStatusAggregator(checkpoint_id, resource_ids)
+    _aggregators[checkpoint_id] = aggregator
+    return aggregator
+
+
+def unregister(checkpoint_id):
+    _aggregators.pop(checkpoint_id, None)
+
+
+def report_resource_status(checkpoint_id, resource_id, status):
+    aggregator = _aggregators.get(checkpoint_id)
+    if aggregator is not None:
+        aggregator.report(resource_id, status)
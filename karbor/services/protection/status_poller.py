@@ -0,0 +1,250 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import time
+
+import eventlet
+from eventlet import event
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from karbor import exception
+from karbor.i18n import _, _LE
+
+status_poller_opts = [
+    cfg.IntOpt('status_poll_interval',
+               default=5,
+               help='initial interval in seconds between two polls of the '
+                    'status of an operation in progress'),
+    cfg.IntOpt('status_poll_max_interval',
+               default=60,
+               help='maximal interval in seconds between two polls of the '
+                    'status of an operation in progress'),
+    cfg.FloatOpt('status_poll_backoff_factor',
+                 default=2.0,
+                 help='factor the poll interval grows by every time a '
+                      'status is polled unchanged'),
+    cfg.IntOpt('status_poll_concurrency',
+               default=16,
+               help='number of status polls run concurrently'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(status_poller_opts)
+
+LOG = logging.getLogger(__name__)
+
+_UNKNOWN = object()
+
+
+class Watch(object):
+    """A status the poller checks until its callback is done with it"""
+    def __init__(self, poller, key, callback, fetch, batch_fetch,
+                 interval, max_interval):
+        self.key = key
+        self.callback = callback
+        self.fetch = fetch
+        self.batch_fetch = batch_fetch
+        self.max_interval = max_interval
+        self.initial_interval = min(interval, max_interval)
+        self.interval = self.initial_interval
+        self.status = _UNKNOWN
+        self.next_poll = 0
+        self._poller = poller
+
+    def notify(self, status):
+        """Hand a status to the callback without waiting for the next poll"""
+        self._poller._notify(self, status)
+
+    def cancel(self):
+        self._poller._remove(self)
+
+
+class StatusPoller(object):
+    """Polls the statuses of all the operations in progress of the service
+
+    A single green thread polls the watches as they become due. Watches
+    sharing a batch_fetch function are fetched with one call per round.
+    The interval of a watch grows every time its status is polled
+    unchanged, and goes back to the initial interval when it changes.
+    """
+    def __init__(self):
+        self._watches = set()
+        self._notified = {}
+        self._wakeup = event.Event()
+        self._running = False
+        self._counters = collections.Counter()
+
+    def add_watch(self, key, callback, fetch=None, batch_fetch=None,
+                  initial_delay=None, interval=None, max_interval=None):
+        """Watch the status of key until callback returns True
+
+        :param callback: called with every status polled or notified,
+                         returns True when the watch is done
+        :param fetch: returns the status of a key
+        :param batch_fetch: returns a dict of the statuses of a list of keys,
+                            the keys missing from it have a status of None
+        """
+        if (fetch is None) == (batch_fetch is None):
+            raise exception.InvalidInput(
+                reason=_("Exactly one of fetch and batch_fetch is required"))
+        if interval is None:
+            interval = CONF.status_poll_interval
+        if max_interval is None:
+            max_interval = CONF.status_poll_max_interval
+        watch = Watch(self, key, callback, fetch, batch_fetch,
+                      interval, max_interval)
+        if initial_delay is None:
+            initial_delay = watch.interval
+        watch.next_poll = time.time() + initial_delay
+        self._watches.add(watch)
+        self._wake()
+        return watch
+
+    @property
+    def stats(self):
+        """Queue depth of the poller and counters of what it did so far
+
+        rounds, fetches and statuses count the poll rounds, the fetch calls
+        and the statuses handed to callbacks; the *_failures counters count
+        the failed rounds, fetch calls and callbacks.
+        """
+        now = time.time()
+        due = [watch for watch in self._watches
+               if watch.next_poll <= now or watch in self._notified]
+        stats = {
+            "watches": len(self._watches),
+            "due": len(due),
+            "max_delay": max([now - watch.next_poll for watch in due] or [0]),
+        }
+        for name in ("rounds", "round_failures", "fetches", "fetch_failures",
+                     "statuses", "callback_failures"):
+            stats[name] = self._counters[name]
+        return stats
+
+    def _notify(self, watch, status):
+        if watch in self._watches:
+            self._notified[watch] = status
+            self._wake()
+
+    def _remove(self, watch):
+        self._watches.discard(watch)
+        self._notified.pop(watch, None)
+
+    def _wake(self):
+        if not self._running:
+            self._running = True
+            eventlet.spawn_n(self._run)
+        elif not self._wakeup.ready():
+            self._wakeup.send()
+
+    def _run(self):
+        pool = eventlet.GreenPool(CONF.status_poll_concurrency)
+        try:
+            while self._watches:
+                LOG.debug("Status poller queue: %s", self.stats)
+                try:
+                    self._poll_round(pool)
+                except Exception:
+                    # the watches stay due and are polled again, after a
+                    # pause so a persistent failure does not spin
+                    self._counters["round_failures"] += 1
+                    LOG.exception(_LE("Status poll round failed"))
+                    eventlet.sleep(CONF.status_poll_interval)
+                    continue
+                if not self._watches:
+                    break
+                next_poll = min(watch.next_poll for watch in self._watches)
+                timeout = max(next_poll - time.time(), 0)
+                with eventlet.Timeout(timeout, False):
+                    self._wakeup.wait()
+                if self._wakeup.ready():
+                    self._wakeup.reset()
+        finally:
+            self._running = False
+
+    def _poll_round(self, pool):
+        self._counters["rounds"] += 1
+        now = time.time()
+        notified, self._notified = self._notified, {}
+        batches = collections.defaultdict(list)
+        # spawn_n yields when the pool is full, and the watches may be added
+        # or removed meanwhile
+        for watch in list(self._watches):
+            if watch in notified or watch.next_poll > now:
+                continue
+            if watch.batch_fetch is not None:
+                batches[watch.batch_fetch].append(watch)
+            else:
+                pool.spawn_n(self._poll, [watch])
+        for watches in batches.values():
+            pool.spawn_n(self._poll, watches)
+        for watch, status in notified.items():
+            pool.spawn_n(self._update, watch, status)
+        pool.waitall()
+
+    def _poll(self, watches):
+        watch = watches[0]
+        self._counters["fetches"] += 1
+        try:
+            if watch.batch_fetch is not None:
+                statuses = watch.batch_fetch([w.key for w in watches])
+                results = [(w, statuses.get(w.key)) for w in watches]
+            else:
+                results = [(watch, watch.fetch(watch.key))]
+        except Exception:
+            self._counters["fetch_failures"] += 1
+            LOG.exception(_LE("Polling the status of %s failed"),
+                          [w.key for w in watches])
+            for w in watches:
+                self._schedule(w, w.status)
+            return
+        for w, status in results:
+            self._update(w, status)
+
+    def _update(self, watch, status):
+        if watch not in self._watches:
+            return
+        self._counters["statuses"] += 1
+        try:
+            done = watch.callback(status)
+        except Exception:
+            self._counters["callback_failures"] += 1
+            LOG.exception(_LE("Handling the status of %s failed"), watch.key)
+            done = True
+        if done:
+            self._remove(watch)
+        else:
+            self._schedule(watch, status)
+
+    @staticmethod
+    def _schedule(watch, status):
+        if status != watch.status:
+            watch.interval = watch.initial_interval
+        else:
+            watch.interval = min(
+                watch.interval * CONF.status_poll_backoff_factor,
+                watch.max_interval)
+        watch.status = status
+        watch.next_poll = time.time() + watch.interval
+
+
+_poller = None
+
+
+def get_poller():
+    """The poller shared by all the flows and plugins of the service"""
+    global _poller
+    if _poller is None:
+        _poller = StatusPoller()
+    return _poller
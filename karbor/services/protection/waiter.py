@@ -0,0 +1,180 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import time
+
+import eventlet
+from eventlet import event
+from oslo_config import cfg
+
+from karbor.common import constants
+from karbor import exception
+
+waiter_opts = [
+    cfg.IntOpt('image_wait_initial_interval',
+               default=1,
+               help='interval in seconds of the first check of the status '
+                    'of an image being waited for'),
+    cfg.IntOpt('image_wait_max_interval',
+               default=60,
+               help='maximal interval in seconds between two checks of the '
+                    'status of an image being waited for'),
+    cfg.IntOpt('server_snapshot_wait_initial_interval',
+               default=2,
+               help='interval in seconds of the first check of the status '
+                    'of the snapshot of a server being waited for'),
+    cfg.IntOpt('server_snapshot_wait_max_interval',
+               default=60,
+               help='maximal interval in seconds between two checks of the '
+                    'status of the snapshot of a server being waited for'),
+    cfg.IntOpt('resource_wait_initial_interval',
+               default=1,
+               help='interval in seconds of the first check of the status '
+                    'of the other resources being waited for'),
+    cfg.IntOpt('resource_wait_max_interval',
+               default=60,
+               help='maximal interval in seconds between two checks of the '
+                    'status of the other resources being waited for'),
+    cfg.FloatOpt('resource_wait_backoff_factor',
+                 default=2.0,
+                 help='factor the interval between two checks of the status '
+                      'of a resource grows by'),
+    cfg.IntOpt('resource_wait_timeout',
+               default=21600,
+               help='time in seconds to wait for a resource to reach a '
+                    'status before the operation fails'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(waiter_opts)
+
+# The initial and maximal interval options of the waiters of each resource
+# type, the other types use the resource_wait_* ones
+_INTERVAL_OPTS = {
+    constants.IMAGE_RESOURCE_TYPE: ('image_wait_initial_interval',
+                                    'image_wait_max_interval'),
+    constants.SERVER_RESOURCE_TYPE: ('server_snapshot_wait_initial_interval',
+                                     'server_snapshot_wait_max_interval'),
+}
+_DEFAULT_INTERVAL_OPTS = ('resource_wait_initial_interval',
+                          'resource_wait_max_interval')
+
+# The waiters currently waiting for the resources of each checkpoint
+_checkpoint_waiters = collections.defaultdict(set)
+
+# Glance statuses
+IMAGE_STATUS_ACTIVE = "active"
+IMAGE_STATUS_SAVING = "saving"
+IMAGE_FAILED_STATUSES = ("killed", "deleted", "pending_delete",
+                         "deactivated")
+
+
+class ResourceWaiter(object):
+    """Waits for a resource to reach a status
+
+    The status is checked often at first and less and less as the wait goes
+    on, so short operations finish quickly and long ones do not load the
+    services they wait for.
+    """
+    def __init__(self, resource_type, checkpoint_id=None,
+                 initial_interval=None, max_interval=None, timeout=None):
+        """
+        :param checkpoint_id: the checkpoint the wait is done for, its waits
+                              are cancelled when it is deleted
+        """
+        self.resource_type = resource_type
+        self.checkpoint_id = checkpoint_id
+        initial_opt, max_opt = _INTERVAL_OPTS.get(resource_type,
+                                                  _DEFAULT_INTERVAL_OPTS)
+        if initial_interval is None:
+            initial_interval = CONF[initial_opt]
+        if max_interval is None:
+            max_interval = CONF[max_opt]
+        if timeout is None:
+            timeout = CONF.resource_wait_timeout
+        self.initial_interval = min(initial_interval, max_interval)
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self._cancelled = event.Event()
+
+    def cancel(self):
+        """Make the current and the next waits raise ResourceWaitCancelled"""
+        if not self._cancelled.ready():
+            self._cancelled.send()
+
+    def wait(self, resource_id, get_resource, ready_statuses,
+             failed_statuses=(), deadline=None):
+        """Wait until the status of a resource is one of ready_statuses
+
+        :param get_resource: returns the resource, which has a status
+        :param deadline: time.time() after which the wait fails, defaults to
+                         the waiter's timeout from now
+        :return: the resource in one of ready_statuses
+        """
+        if deadline is None:
+            deadline = time.time() + self.timeout
+        if self.checkpoint_id is None:
+            return self._wait(resource_id, get_resource, ready_statuses,
+                              failed_statuses, deadline)
+        _checkpoint_waiters[self.checkpoint_id].add(self)
+        try:
+            return self._wait(resource_id, get_resource, ready_statuses,
+                              failed_statuses, deadline)
+        finally:
+            waiters = _checkpoint_waiters[self.checkpoint_id]
+            waiters.discard(self)
+            if not waiters:
+                del _checkpoint_waiters[self.checkpoint_id]
+
+    def _wait(self, resource_id, get_resource, ready_statuses,
+              failed_statuses, deadline):
+        interval = self.initial_interval
+        while True:
+            if self._cancelled.ready():
+                raise exception.ResourceWaitCancelled(
+                    resource_type=self.resource_type,
+                    resource_id=resource_id)
+            resource = get_resource()
+            status = resource.status
+            if status in ready_statuses:
+                return resource
+            if status in failed_statuses:
+                raise exception.ResourceWaitFailed(
+                    resource_type=self.resource_type,
+                    resource_id=resource_id,
+                    status=status)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise exception.ResourceWaitTimeout(
+                    resource_type=self.resource_type,
+                    resource_id=resource_id,
+                    status=status)
+            with eventlet.Timeout(min(interval, remaining), False):
+                self._cancelled.wait()
+            interval = min(interval * CONF.resource_wait_backoff_factor,
+                           self.max_interval)
+
+    def wait_for_image(self, glance_client, image_id,
+                       ready_statuses=(IMAGE_STATUS_ACTIVE, ), deadline=None):
+        """Wait until a Glance image is active, or in ready_statuses"""
+        return self.wait(image_id,
+                         lambda: glance_client.images.get(image_id),
+                         ready_statuses,
+                         failed_statuses=IMAGE_FAILED_STATUSES,
+                         deadline=deadline)
+
+
+def cancel_checkpoint_waits(checkpoint_id):
+    """Cancel the waits done for the protection of a checkpoint"""
+    for resource_waiter in list(_checkpoint_waiters.get(checkpoint_id, ())):
+        resource_waiter.cancel()
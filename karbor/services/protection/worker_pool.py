@@ -0,0 +1,123 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+
+import eventlet
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from karbor.common import constants
+from karbor.i18n import _LE
+
+worker_pool_opts = [
+    cfg.IntOpt('size',
+               default=32,
+               help='number of background operations, such as image '
+                    'copies, the protection plugins of a provider run at '
+                    'once'),
+    cfg.IntOpt('queue_size',
+               default=256,
+               help='number of background operations waiting for a worker '
+                    'above which the protections requested by users are '
+                    'rejected'),
+    cfg.IntOpt('scheduled_queue_size',
+               default=128,
+               help='number of background operations waiting for a worker '
+                    'above which scheduled protections are rejected'),
+]
+
+CONF = cfg.CONF
+
+_WORKER_POOL_GROUP = 'worker_pool'
+
+LOG = logging.getLogger(__name__)
+
+
+class WorkerPool(object):
+    """Runs the background operations of a provider with bounded concurrency
+
+    Operations beyond the size of the pool wait in a queue. The queue is not
+    bounded, admission control happens before a protection starts: see
+    is_saturated and reject.
+    """
+    def __init__(self, size, queue_size, scheduled_queue_size):
+        self.size = size
+        self._queue_sizes = {
+            constants.PROTECTION_PRIORITY_MANUAL: queue_size,
+            constants.PROTECTION_PRIORITY_SCHEDULED: scheduled_queue_size,
+        }
+        self._queue = collections.deque()
+        self._running = 0
+        self._rejected = 0
+
+    def spawn_n(self, func, *args, **kwargs):
+        self._queue.append((func, args, kwargs))
+        while self._queue and self._running < self.size:
+            self._running += 1
+            eventlet.spawn_n(self._work)
+
+    def _work(self):
+        try:
+            while self._queue:
+                func, args, kwargs = self._queue.popleft()
+                try:
+                    func(*args, **kwargs)
+                except Exception:
+                    LOG.exception(_LE("Background operation %s failed"),
+                                  func)
+        finally:
+            self._running -= 1
+
+    def is_saturated(self, priority=constants.PROTECTION_PRIORITY_MANUAL):
+        """Whether a new protection of this priority should be rejected
+
+        Scheduled protections are rejected with a shorter queue, which
+        keeps room for the ones requested by users.
+        """
+        return len(self._queue) >= self._queue_sizes[priority]
+
+    def reject(self):
+        """Count a protection rejected because the pool is saturated"""
+        self._rejected += 1
+
+    @property
+    def stats(self):
+        """Workers running, operations queued and protections rejected"""
+        return {
+            "size": self.size,
+            "running": self._running,
+            "queued": len(self._queue),
+            "rejected": self._rejected,
+        }
+
+
+_worker_pools = {}
+
+
+def get_worker_pool(config=None):
+    """Return the worker pool shared by everything using a provider config
+
+    The pool is sized from the [worker_pool] group of the provider
+    configuration, or of the global configuration if there is none.
+    """
+    conf = config if config is not None else CONF
+    # Config objects are not hashable, the pool keeps its config alive so
+    # its id is not reused
+    worker_pool = _worker_pools.get(id(conf), (None, None))[1]
+    if worker_pool is None:
+        conf.register_opts(worker_pool_opts, _WORKER_POOL_GROUP)
+        group = getattr(conf, _WORKER_POOL_GROUP)
+        worker_pool = WorkerPool(group.size, group.queue_size,
+                                 group.scheduled_queue_size)
+        _worker_pools[id(conf)] = (conf, worker_pool)
+    return worker_pool
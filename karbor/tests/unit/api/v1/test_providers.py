@@ -17,7 +17,9 @@ from oslo_config import cfg
 from webob import exc
 
 from karbor.api.v1 import providers
+from karbor.common import constants
 from karbor import context
+from karbor import exception
 from karbor.tests import base
 from karbor.tests.unit.api import fakes
 
@@ -136,3 +138,56 @@ class ProvidersApiTest(base.TestCase):
             body)
         self.assertTrue(mock_plan_create.called)
         self.assertTrue(mock_protect.called)
+        mock_protect.assert_called_once_with(
+            mock.ANY, mock.ANY,
+            priority=constants.PROTECTION_PRIORITY_MANUAL)
+
+    @mock.patch(
+        'karbor.services.protection.api.API.'
+        'protect')
+    @mock.patch(
+        'karbor.objects.plan.Plan.get_by_id')
+    def test_checkpoints_create_scheduled(self, mock_plan_create,
+                                          mock_protect):
+        checkpoint = {
+            "plan_id": "2c3a12ee-5ea6-406a-8b64-862711ff85e6",
+            "extra-info": {"created_by": constants.OPERATION_ENGINE}
+        }
+        body = {"checkpoint": checkpoint}
+        req = fakes.HTTPRequest.blank('/v1/providers/'
+                                      '{provider_id}/checkpoints/')
+        mock_plan_create.return_value = {
+            "plan_id": "2c3a12ee-5ea6-406a-8b64-862711ff85e6"
+        }
+        mock_protect.return_value = {
+            "checkpoint_id": "2c3a12ee-5ea6-406a-8b64-862711ff85e6"
+        }
+        self.controller.checkpoints_create(
+            req,
+            '2220f8b1-975d-4621-a872-fa9afb43cb6c',
+            body)
+        mock_protect.assert_called_once_with(
+            mock.ANY, mock.ANY,
+            priority=constants.PROTECTION_PRIORITY_SCHEDULED)
+
+    @mock.patch(
+        'karbor.services.protection.api.API.'
+        'protect')
+    @mock.patch(
+        'karbor.objects.plan.Plan.get_by_id')
+    def test_checkpoints_create_ProviderBusy(self, mock_plan_create,
+                                             mock_protect):
+        checkpoint = {
+            "plan_id": "2c3a12ee-5ea6-406a-8b64-862711ff85e6"
+        }
+        body = {"checkpoint": checkpoint}
+        req = fakes.HTTPRequest.blank('/v1/providers/'
+                                      '{provider_id}/checkpoints/')
+        mock_plan_create.return_value = {
+            "plan_id": "2c3a12ee-5ea6-406a-8b64-862711ff85e6"
+        }
+        mock_protect.side_effect = exception.ProviderBusy(
+            provider_id='2220f8b1-975d-4621-a872-fa9afb43cb6c')
+        self.assertRaises(exc.HTTPServiceUnavailable,
+                          self.controller.checkpoints_create,
+                          req, '2220f8b1-975d-4621-a872-fa9afb43cb6c', body)
@@ -34,7 +34,7 @@ class FakeBankPlugin(bank_plugin.BankPlugin):
         return
 
     def list_objects(self, prefix=None, limit=None,
-                     marker=None, sort_dir=None):
+                     marker=None, sort_dir=None, end_marker=None):
         return
 
     def delete_object(self, key):
@@ -37,18 +37,22 @@ class FakeSwiftConnection(object):
         else:
             os.makedirs(container_dir)
 
-    def get_container(self, container, prefix, limit, marker, end_marker):
+    def get_container(self, container, prefix, limit, marker, end_marker,
+                      full_listing=False, query_string=None):
         container_dir = self.swiftdir + "/" + container
         body = []
         if prefix:
             objects_dir = container_dir + "/" + prefix
         else:
             objects_dir = container_dir
-        for f in os.listdir(objects_dir):
+        for f in sorted(os.listdir(objects_dir),
+                        reverse=(query_string == "reverse=true")):
             if os.path.isfile(objects_dir + "/" + f):
                 body.append({"name": f})
             else:
                 body.append({"subdir": f})
+        if limit is not None:
+            body = body[:limit]
         return None, body
 
     def put_object(self, container, obj, contents, headers=None):
@@ -91,3 +95,9 @@ class FakeSwiftConnection(object):
                 raise ClientException("error_obj")
         else:
             raise ClientException("error_container")
+
+    def head_account(self, headers=None):
+        return {}
+
+    def close(self):
+        pass
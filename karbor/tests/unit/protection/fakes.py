@@ -24,6 +24,7 @@ from karbor.services.protection.bank_plugin import BankPlugin
 from karbor.services.protection.bank_plugin import BankSection
 from karbor.services.protection.graph import build_graph
 from karbor.services.protection import provider
+from karbor.services.protection import worker_pool
 
 from taskflow import engines
 from taskflow.patterns import graph_flow
@@ -192,6 +193,10 @@ class FakeCheckpointCollection(object):
     def get(self, checkpoint_id):
         return FakeCheckpoint()
 
+    def list_summaries(self, limit=None, marker=None, plan_id=None,
+                       start_date=None, end_date=None, sort_dir=None):
+        return [{"id": 'fake_checkpoint', "status": 'available'}]
+
 
 class FakeProvider(provider.PluggableProtectionProvider):
     def __init__(self):
@@ -199,6 +204,7 @@ class FakeProvider(provider.PluggableProtectionProvider):
         self._name = 'provider'
         self._description = 'fake_provider'
         self._extend_info_schema = {}
+        self.worker_pool = worker_pool.WorkerPool(1, 2, 1)
 
     def build_task_flow(self, plan):
         status_getters = []
@@ -12,13 +12,16 @@
 
 from collections import OrderedDict
 from copy import deepcopy
+import mock
+import os
 from oslo_utils import uuidutils
-import six
 
 from karbor import exception
+from karbor.services.protection import bank_plugin
 from karbor.services.protection.bank_plugin import Bank
 from karbor.services.protection.bank_plugin import BankPlugin
 from karbor.services.protection.bank_plugin import BankSection
+from karbor.services.protection.bank_plugin import ChunkStore
 from karbor.services.protection.bank_plugin import LeasePlugin
 from karbor.tests import base
 
@@ -38,19 +41,19 @@ class _InMemoryBankPlugin(BankPlugin):
         return deepcopy(self._data[key])
 
     def list_objects(self, prefix=None, limit=None, marker=None,
-                     sort_dir=None):
-        marker_found = marker is None
-        for key in six.iterkeys(self._data):
-            if marker is not True and key != marker:
-                if marker_found:
-                    if prefix is None or key.startswith(prefix):
-                        if limit is not None:
-                            limit -= 1
-                            if limit < 0:
-                                return
-                        yield key
-            else:
-                marker_found = True
+                     sort_dir=None, end_marker=None):
+        if sort_dir == "desc":
+            lower, upper = end_marker, marker
+        else:
+            lower, upper = marker, end_marker
+        keys = [key for key in sorted(self._data,
+                                      reverse=(sort_dir == "desc"))
+                if (prefix is None or key.startswith(prefix)) and
+                (lower is None or key > lower) and
+                (upper is None or key < upper)]
+        if limit is not None:
+            keys = keys[:limit]
+        return keys
 
     def delete_object(self, key):
         del self._data[key]
@@ -121,6 +124,47 @@ class BankSectionTest(base.TestCase):
             expected_result[2:4],
         )
 
+    def test_list_objects_range(self):
+        bank = self._create_test_bank()
+        section = BankSection(bank, "/prefix", is_writable=True)
+        for key in ("a", "b", "c", "d"):
+            section.create_object(key, "value")
+        self.assertEqual(
+            ["b", "c"],
+            list(section.list_objects("/", marker="a", end_marker="d")),
+        )
+        self.assertEqual(
+            ["c", "b"],
+            list(section.list_objects("/", marker="d", end_marker="a",
+                                      sort_dir="desc")),
+        )
+
+    def test_batch_operations(self):
+        bank = self._create_test_bank()
+        section = BankSection(bank, "/prefix", is_writable=True)
+        section.create_objects({"a": "value-a", "b/c": {"key": "value"}})
+        self.assertEqual("value-a", bank.get_object("/prefix/a"))
+        self.assertEqual(
+            {"a": "value-a", "b/c": {"key": "value"}},
+            section.get_objects(["a", "b/c"]),
+        )
+        section.delete_objects(["a", "b/c"])
+        self.assertEqual([], list(section.list_objects()))
+
+    def test_batch_operations_read_only(self):
+        bank = self._create_test_bank()
+        section = BankSection(bank, "/prefix", is_writable=False)
+        self.assertRaises(
+            exception.BankReadonlyViolation,
+            section.create_objects,
+            {"object": "value"},
+        )
+        self.assertRaises(
+            exception.BankReadonlyViolation,
+            section.delete_objects,
+            ["object"],
+        )
+
     def test_read_only(self):
         bank = self._create_test_bank()
         section = BankSection(bank, "/prefix", is_writable=False)
@@ -179,3 +223,132 @@ class BankSectionTest(base.TestCase):
             "/mid",
             is_writable=True,
         )
+
+
+class ChunkStoreTest(base.TestCase):
+    def test_put_chunk_deduplicates(self):
+        bank = Bank(_InMemoryBankPlugin())
+        store = ChunkStore(bank)
+        digest1 = store.put_chunk(b"data", "ref1")
+        digest2 = store.put_chunk(b"data", "ref2")
+        self.assertEqual(digest1, digest2)
+        self.assertEqual(b"data", store.get_object(digest1))
+        data_keys = [key for key in bank.list_objects("/chunks")
+                     if key.endswith("/data")]
+        self.assertEqual(["/chunks/%s/data" % digest1], data_keys)
+
+    def test_release_chunk(self):
+        bank = Bank(_InMemoryBankPlugin())
+        store = ChunkStore(bank)
+        digest = store.put_chunk(b"data", "ref1")
+        store.put_chunk(b"data", "ref2")
+
+        store.release_chunk(digest, "ref1")
+        self.assertEqual(0, store.collect_garbage(0))
+        self.assertTrue(store.has_chunk(digest))
+        store.release_chunk(digest, "ref2")
+        self.assertTrue(store.has_chunk(digest))
+        self.assertEqual(1, store.collect_garbage(0))
+        self.assertFalse(store.has_chunk(digest))
+        self.assertEqual([], list(bank.list_objects("/chunks")))
+        self.assertEqual([], list(bank.list_objects("/chunks_gc")))
+
+    def test_collect_garbage_grace_period(self):
+        bank = Bank(_InMemoryBankPlugin())
+        store = ChunkStore(bank)
+        digest = store.put_chunk(b"data", "ref1")
+        store.release_chunk(digest, "ref1")
+
+        self.assertEqual(0, store.collect_garbage(3600))
+        self.assertTrue(store.has_chunk(digest))
+        self.assertEqual(1, store.collect_garbage(0))
+        self.assertFalse(store.has_chunk(digest))
+
+    def test_put_interleaved_with_release(self):
+        bank = Bank(_InMemoryBankPlugin())
+        store = ChunkStore(bank)
+        digest = store.put_chunk(b"data", "ref1")
+        has_chunk = store.has_chunk
+
+        def release_then_check(checked_digest):
+            # ref1 is released and collected after the put wrote ref2 but
+            # before it checked for the chunk data
+            store.release_chunk(digest, "ref1")
+            store.collect_garbage(0)
+            return has_chunk(checked_digest)
+
+        with mock.patch.object(store, "has_chunk",
+                               side_effect=release_then_check):
+            self.assertEqual(digest, store.put_chunk(b"data", "ref2"))
+        self.assertEqual(b"data", store.get_object(digest))
+
+    def test_put_interleaved_with_reclaim(self):
+        plugin = _InMemoryBankPlugin()
+        bank = Bank(plugin)
+        store = ChunkStore(bank)
+        digest = store.put_chunk(b"data", "ref1")
+        store.release_chunk(digest, "ref1")
+        data_key = "/chunks/%s/data" % digest
+        delete_object = plugin.delete_object
+
+        def delete_during_put(key):
+            if key == data_key:
+                # a put wrote its reference and found the data just before
+                # the collector deleted it
+                bank.create_object("/chunks/%s/refs/ref2" % digest, "ref2")
+            delete_object(key)
+
+        with mock.patch.object(plugin, "delete_object",
+                               side_effect=delete_during_put):
+            self.assertEqual(0, store.collect_garbage(0))
+        self.assertEqual(b"data", store.get_object(digest))
+
+
+class BankCodecTest(base.TestCase):
+    def _create_test_bank(self, codec_name):
+        plugin = _InMemoryBankPlugin()
+        return plugin, Bank(plugin, codec=bank_plugin.get_codec(codec_name))
+
+    def test_no_codec(self):
+        self.assertIsNone(bank_plugin.get_codec("none"))
+        self.assertIsNone(bank_plugin.get_codec(None))
+
+    def test_invalid_codec(self):
+        self.assertRaises(exception.InvalidInput,
+                          bank_plugin.get_codec, "garbage")
+
+    def test_zlib_roundtrip(self):
+        plugin, bank = self._create_test_bank("zlib")
+        value = b"a" * 4096
+        bank.create_object("/key", value)
+        stored = plugin.get_object("/key")
+        self.assertTrue(stored.startswith(b"KARBOR-CODEC:zlib"))
+        self.assertLess(len(stored), len(value))
+        self.assertEqual(value, bank.get_object("/key"))
+
+    def test_small_and_structured_values_are_not_compressed(self):
+        plugin, bank = self._create_test_bank("zlib")
+        bank.create_object("/small", b"a" * 10)
+        bank.create_object("/dict", {"status": "available"})
+        self.assertEqual(b"KARBOR-CODEC:none\n" + b"a" * 10,
+                         plugin.get_object("/small"))
+        self.assertEqual({"status": "available"}, plugin.get_object("/dict"))
+        self.assertEqual(b"a" * 10, bank.get_object("/small"))
+
+    def test_payload_looking_like_header(self):
+        for codec_name in ("none", "zlib"):
+            plugin, bank = self._create_test_bank(codec_name)
+            value = b"KARBOR-CODEC:zlib\n" + os.urandom(2048)
+            bank.create_object("/key", value)
+            self.assertEqual(value, bank.get_object("/key"))
+
+    def test_decode_unframed_value(self):
+        plugin, bank = self._create_test_bank("none")
+        plugin.create_object("/key", b"legacy data")
+        self.assertEqual(b"legacy data", bank.get_object("/key"))
+
+    def test_decode_without_codec(self):
+        plugin, bank = self._create_test_bank("zlib")
+        bank.create_object("/key", b"b" * 4096)
+        plain_bank = Bank(plugin)
+        self.assertEqual(b"b" * 4096, plain_bank.get_object("/key"))
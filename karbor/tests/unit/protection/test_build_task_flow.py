@@ -82,10 +82,6 @@ class PluggableProtectionProviderTest(base.TestCase):
             ("on_resource_end", 'A'),
             ("on_resource_start", 'B', True),
             ("on_resource_start", 'C', False),
-            ("on_resource_start", 'D', False),
-            ("on_resource_end", 'D'),
-            ("on_resource_start", 'E', False),
-            ("on_resource_end", 'E'),
             ("on_resource_end", 'C'),
             ("on_resource_end", 'B'),
         ]
@@ -136,10 +132,6 @@ class PluggableProtectionProviderTest(base.TestCase):
             ("on_resource_end", 'A'),
             ("on_resource_start", 'B', True),
             ("on_resource_start", 'C', False),
-            ("on_resource_start", 'D', False),
-            ("on_resource_end", 'D'),
-            ("on_resource_start", 'E', False),
-            ("on_resource_end", 'E'),
             ("on_resource_end", 'C'),
             ("on_resource_end", 'B'),
         ]
@@ -10,6 +10,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
+
 from karbor.resource import Resource
 from karbor.services.protection import bank_plugin
 from karbor.services.protection import checkpoint
@@ -63,6 +65,24 @@ class CheckpointTest(base.TestCase):
         self.assertEqual(owner_id, cp.owner_id)
         self.assertEqual("protecting", cp.status)
 
+    def test_create_in_section_writes_one_batch(self):
+        plugin = _InMemoryBankPlugin()
+        bank = bank_plugin.Bank(plugin)
+        with mock.patch.object(plugin, 'create_objects',
+                               wraps=plugin.create_objects) as create:
+            cp = checkpoint.Checkpoint.create_in_section(
+                checkpoints_section=bank_plugin.BankSection(bank,
+                                                            "/checkpoints"),
+                indices_section=bank_plugin.BankSection(bank, "/indices"),
+                bank_lease=_InMemoryLeasePlugin(),
+                owner_id=bank.get_owner_id(),
+                plan=fake_protection_plan())
+        create.assert_called_once_with(mock.ANY)
+        keys = sorted(create.call_args[0][0])
+        self.assertEqual(4, len(keys))
+        self.assertEqual("/checkpoints/%s/index.json" % cp.id, keys[0])
+        self.assertTrue(all(key.startswith("/indices/") for key in keys[1:]))
+
     def test_resource_graph(self):
         bank = bank_plugin.Bank(_InMemoryBankPlugin())
         bank_lease = _InMemoryLeasePlugin()
@@ -92,3 +112,60 @@ class CheckpointTest(base.TestCase):
         self.assertEqual(len(resource_graph), len(cp.resource_graph))
         for start_node in resource_graph:
             self.assertIn(start_node, cp.resource_graph)
+
+    def _create_checkpoint(self, bank):
+        return checkpoint.Checkpoint.create_in_section(
+            checkpoints_section=bank_plugin.BankSection(bank, "/checkpoints"),
+            indices_section=bank_plugin.BankSection(bank, "/indices"),
+            bank_lease=_InMemoryLeasePlugin(),
+            owner_id=bank.get_owner_id(),
+            plan=fake_protection_plan())
+
+    def test_resource_graph_decoded_once(self):
+        bank = bank_plugin.Bank(_InMemoryBankPlugin())
+        cp = self._create_checkpoint(bank)
+        cp.resource_graph = graph.build_graph([A, B, C, D],
+                                              resource_map.__getitem__)
+        cp.commit()
+        cp.reload_meta_data()
+        decode = mock.Mock(wraps=graph.decode_resource_graph)
+        with mock.patch.dict(checkpoint.Checkpoint._RESOURCE_GRAPH_DECODERS,
+                             {"1.0": decode}):
+            resource_graph = cp.resource_graph
+            self.assertIs(resource_graph, cp.resource_graph)
+            self.assertEqual(1, decode.call_count)
+
+    def test_legacy_resource_graph(self):
+        bank = bank_plugin.Bank(_InMemoryBankPlugin())
+        cp = self._create_checkpoint(bank)
+        self.assertEqual("1.0", cp._md_cache["version"])
+        resource_graph = graph.build_graph([A, B, C, D],
+                                           resource_map.__getitem__)
+        serialized_resource_graph = graph.serialize_resource_graph(
+            resource_graph)
+        md = dict(cp._md_cache, version="0.9",
+                  resource_graph=serialized_resource_graph)
+        cp.checkpoint_section.update_object(checkpoint._INDEX_FILE_NAME, md)
+        cp.reload_meta_data()
+        self.assertEqual(sorted(resource_graph), sorted(cp.resource_graph))
+        self.assertEqual(serialized_resource_graph,
+                         cp.to_dict()["resource_graph"])
+
+        cp.resource_graph = resource_graph
+        cp.commit()
+        cp.reload_meta_data()
+        self.assertEqual("1.0", cp._md_cache["version"])
+        self.assertEqual(sorted(resource_graph), sorted(cp.resource_graph))
+
+    def test_resource_graph_compressed_with_bank_codec(self):
+        bank = bank_plugin.Bank(_InMemoryBankPlugin(),
+                                codec=bank_plugin.get_codec("zlib"))
+        cp = self._create_checkpoint(bank)
+        resources = [Resource(id="server%d" % i, type="fake",
+                              name="server%d" % i) for i in range(100)]
+        resource_graph = graph.build_graph(resources, lambda node: [])
+        cp.resource_graph = resource_graph
+        cp.commit()
+        cp.reload_meta_data()
+        self.assertEqual("zlib", cp._md_cache["resource_graph"]["codec"])
+        self.assertEqual(sorted(resource_graph), sorted(cp.resource_graph))
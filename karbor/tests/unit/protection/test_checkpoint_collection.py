@@ -11,7 +11,9 @@
 #    under the License.
 
 from datetime import datetime
+import eventlet
 import mock
+import time
 
 from oslo_utils import timeutils
 
@@ -95,3 +97,186 @@ class CheckpointCollectionTest(base.TestCase):
             checkpoint.status,
             collection.get(checkpoint_id=checkpoint.id).status,
         )
+
+    def test_get_checkpoint_uses_metadata_cache(self):
+        collection = self._create_test_collection()
+        checkpoint_id = collection.create(fake_protection_plan()).id
+        plugin = collection._bank._plugin
+        with mock.patch.object(plugin, 'get_object',
+                               wraps=plugin.get_object) as get_object:
+            for i in range(3):
+                collection.get(checkpoint_id)
+            self.assertEqual(0, get_object.call_count)
+
+    def test_metadata_cache_expires(self):
+        collection = self._create_test_collection()
+        checkpoint_id = collection.create(fake_protection_plan()).id
+        plugin = collection._bank._plugin
+        expired = time.time() + 3600
+        with mock.patch.object(plugin, 'get_object',
+                               wraps=plugin.get_object) as get_object:
+            with mock.patch('time.time', return_value=expired):
+                collection.get(checkpoint_id)
+                collection.get(checkpoint_id)
+            self.assertEqual(1, get_object.call_count)
+
+    def test_metadata_cache_is_not_shared(self):
+        collection = self._create_test_collection()
+        checkpoint = collection.create(fake_protection_plan())
+        checkpoint.status = "finished"
+        self.assertEqual("protecting",
+                         collection.get(checkpoint.id).status)
+
+    def test_metadata_cache_invalidated_on_delete(self):
+        collection = self._create_test_collection()
+        checkpoint = collection.create(fake_protection_plan())
+        checkpoint.delete()
+        self.assertIsNone(collection._metadata_cache.get(checkpoint.id))
+        self.assertEqual("deleted", collection.get(checkpoint.id).status)
+
+    def test_metadata_cache_eviction(self):
+        self.override_config('checkpoint_cache_size', 2)
+        collection = self._create_test_collection()
+        ids = [collection.create(fake_protection_plan()).id
+               for i in range(3)]
+        self.assertEqual(2, len(collection._metadata_cache))
+        self.assertIsNone(collection._metadata_cache.get(ids[0]))
+        self.assertIsNotNone(collection._metadata_cache.get(ids[2]))
+
+    def test_get_many_checkpoints(self):
+        collection = self._create_test_collection()
+        ids = [collection.create(fake_protection_plan()).id
+               for i in range(10)]
+        collection._metadata_cache.clear()
+        checkpoints = collection.get_many(reversed(ids))
+        self.assertEqual(list(reversed(ids)),
+                         [checkpoint.id for checkpoint in checkpoints])
+        self.assertEqual([], collection.get_many([]))
+
+    def test_get_many_checkpoints_is_concurrent(self):
+        self.override_config('checkpoint_fetch_concurrency', 4)
+        collection = self._create_test_collection()
+        ids = [collection.create(fake_protection_plan()).id
+               for i in range(10)]
+        collection._metadata_cache.clear()
+        plugin = collection._bank._plugin
+        get_object = plugin.get_object
+        state = {"active": 0, "max_active": 0}
+
+        def slow_get_object(key):
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+            eventlet.sleep(0.01)
+            state["active"] -= 1
+            return get_object(key)
+
+        with mock.patch.object(plugin, 'get_object',
+                               side_effect=slow_get_object):
+            collection.get_many(ids)
+        self.assertEqual(4, state["max_active"])
+
+    def test_list_summaries_from_indices(self):
+        collection = self._create_test_collection()
+        plan = fake_protection_plan()
+        checkpoint = collection.create(plan)
+        checkpoint.status = "available"
+        checkpoint.commit()
+        collection._metadata_cache.clear()
+        plugin = collection._bank._plugin
+        with mock.patch.object(plugin, 'get_object',
+                               wraps=plugin.get_object) as get_object:
+            summaries = collection.list_summaries()
+            self.assertEqual(1, get_object.call_count)
+            self.assertTrue(
+                get_object.call_args[0][0].startswith("/indices/"))
+        self.assertEqual([{
+            "id": checkpoint.id,
+            "status": "available",
+            "protection_plan": {
+                "id": plan["id"],
+                "name": plan["name"],
+                "provider_id": plan["provider_id"],
+            },
+            "project_id": None,
+            "created_at": checkpoint.created_at,
+        }], summaries)
+        self.assertEqual(
+            summaries, collection.list_summaries(plan_id=plan["id"]))
+
+    def test_list_summaries_reads_page_in_one_batch(self):
+        collection = self._create_test_collection()
+        ids = [collection.create(fake_protection_plan()).id
+               for i in range(3)]
+        collection._metadata_cache.clear()
+        plugin = collection._bank._plugin
+        with mock.patch.object(plugin, 'get_objects',
+                               wraps=plugin.get_objects) as get_objects:
+            summaries = collection.list_summaries()
+        get_objects.assert_called_once_with(mock.ANY)
+        self.assertEqual(3, len(get_objects.call_args[0][0]))
+        self.assertEqual(set(ids), {summary["id"] for summary in summaries})
+
+    def test_list_summaries_legacy_index(self):
+        collection = self._create_test_collection()
+        checkpoint = collection.create(fake_protection_plan())
+        for key in collection._indices_section.list_objects():
+            collection._indices_section.update_object(key, checkpoint.id)
+        collection._metadata_cache.clear()
+        summaries = collection.list_summaries()
+        self.assertEqual([checkpoint.to_summary_dict()], summaries)
+
+    def _create_checkpoints_on(self, collection, dates, plan=None):
+        ids = {}
+        for date in dates:
+            with mock.patch.object(timeutils, 'utcnow',
+                                   return_value=date):
+                ids[date] = [
+                    collection.create(plan or fake_protection_plan()).id
+                    for i in range(3)]
+        return ids
+
+    def test_list_checkpoints_by_date_range_seeks(self):
+        collection = self._create_test_collection()
+        dates = [datetime(2016, 6, day) for day in range(10, 15)]
+        ids = self._create_checkpoints_on(collection, dates)
+        section = collection._indices_section
+        with mock.patch.object(section, 'list_objects',
+                               wraps=section.list_objects) as list_objects:
+            result = collection.list_ids(start_date=dates[1],
+                                         end_date=dates[2])
+        list_objects.assert_called_once_with(
+            prefix="/by-date/", limit=None, marker="/by-date/2016-06-11",
+            end_marker="/by-date/2016-06-13", sort_dir=None)
+        self.assertEqual(set(ids[dates[1]] + ids[dates[2]]), set(result))
+
+    def test_list_checkpoints_by_date_range_with_marker(self):
+        collection = self._create_test_collection()
+        dates = [datetime(2016, 6, day) for day in range(10, 13)]
+        self._create_checkpoints_on(collection, dates)
+        page1 = collection.list_ids(start_date=dates[0], end_date=dates[1],
+                                    limit=4)
+        page2 = collection.list_ids(start_date=dates[0], end_date=dates[1],
+                                    limit=4, marker=page1[-1])
+        self.assertEqual(4, len(page1))
+        self.assertEqual(2, len(page2))
+        self.assertEqual(
+            set(collection.list_ids(start_date=dates[0], end_date=dates[1])),
+            set(page1 + page2))
+
+    def test_list_checkpoints_by_plan_and_date_range(self):
+        collection = self._create_test_collection()
+        dates = [datetime(2016, 6, day) for day in range(10, 13)]
+        plan = fake_protection_plan()
+        plan["id"] = "fake_plan_id_1"
+        ids = self._create_checkpoints_on(collection, dates, plan)
+        self._create_checkpoints_on(collection, dates)
+        result = collection.list_ids(plan_id="fake_plan_id_1",
+                                     start_date=dates[2], end_date=dates[2])
+        self.assertEqual(set(ids[dates[2]]), set(result))
+
+    def test_list_checkpoints_with_marker(self):
+        collection = self._create_test_collection()
+        self._create_checkpoints_on(collection, [datetime(2016, 6, 10)])
+        all_ids = collection.list_ids()
+        self.assertEqual(all_ids[1:],
+                         collection.list_ids(marker=all_ids[0]))
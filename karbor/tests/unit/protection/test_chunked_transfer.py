@@ -0,0 +1,191 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from karbor import exception
+from karbor.services.protection.bank_plugin import Bank
+from karbor.services.protection.bank_plugin import BankSection
+from karbor.services.protection import chunked_transfer
+from karbor.tests import base
+from karbor.tests.unit.protection.test_bank import _InMemoryBankPlugin
+
+
+class ChunkedTransferTest(base.TestCase):
+    def _create_test_section(self):
+        return BankSection(Bank(_InMemoryBankPlugin()), "/resource")
+
+    def test_iter_fixed_size_chunks(self):
+        data = [b"ab", b"", b"cdefg", b"h", b"ijklmnopq"]
+        chunks = list(chunked_transfer.iter_fixed_size_chunks(data, 4))
+        self.assertEqual([b"abcd", b"efgh", b"ijkl", b"mnop", b"q"], chunks)
+
+    def test_iter_fixed_size_chunks_exact_multiple(self):
+        data = [b"abcdefgh"]
+        chunks = list(chunked_transfer.iter_fixed_size_chunks(data, 4))
+        self.assertEqual([b"abcd", b"efgh"], chunks)
+
+    def test_iter_fixed_size_chunks_empty(self):
+        self.assertEqual(
+            [], list(chunked_transfer.iter_fixed_size_chunks([], 4)))
+
+    def test_iter_fixed_size_chunks_invalid_size(self):
+        self.assertRaises(
+            ValueError, list,
+            chunked_transfer.iter_fixed_size_chunks([b"a"], 0))
+
+    def test_iter_fixed_size_chunks_is_lazy(self):
+        def data_iterator():
+            yield b"abcd"
+            raise AssertionError("data consumed too early")
+
+        chunks = chunked_transfer.iter_fixed_size_chunks(data_iterator(), 4)
+        self.assertEqual(b"abcd", next(chunks))
+
+    def test_upload_chunks(self):
+        section = self._create_test_section()
+        count = chunked_transfer.upload_chunks(
+            section, "data", iter([b"abc", b"defg", b"h"]), 3)
+        self.assertEqual(3, count)
+        self.assertEqual(b"abc", section.get_object("data_0"))
+        self.assertEqual(b"def", section.get_object("data_1"))
+        self.assertEqual(b"gh", section.get_object("data_2"))
+        self.assertEqual({"chunks": 3, "size": 8},
+                         section.get_object("data_manifest"))
+
+    def test_upload_chunks_parallel(self):
+        section = self._create_test_section()
+        data = [("%04d" % i).encode() for i in range(50)]
+        count = chunked_transfer.upload_chunks(
+            section, "data", iter(data), 4, concurrency=8)
+        self.assertEqual(50, count)
+        for index in range(50):
+            self.assertEqual(data[index],
+                             section.get_object("data_%d" % index))
+
+    def test_chunk_writer_retries_failed_chunk(self):
+        section = self._create_test_section()
+        create_object = section.create_object
+        failures = {"data_1": 2}
+
+        def flaky_create_object(key, value):
+            if failures.get(key, 0) > 0:
+                failures[key] -= 1
+                raise exception.BankCreateObjectFailed(reason="flaky",
+                                                       key=key)
+            return create_object(key, value)
+
+        section.create_object = flaky_create_object
+        writer = chunked_transfer.ParallelChunkWriter(
+            section, "data", concurrency=2, retries=2, retry_interval=0)
+        for data in (b"a", b"b", b"c"):
+            writer.write(data)
+        writer.close()
+        self.assertEqual(3, writer.chunks)
+        self.assertEqual(3, writer.bytes_written)
+        self.assertEqual(b"b", section.get_object("data_1"))
+
+    def test_chunk_writer_gives_up(self):
+        section = self._create_test_section()
+        section.create_object = mock.MagicMock(
+            side_effect=exception.BankCreateObjectFailed(reason="down",
+                                                         key="data_0"))
+        writer = chunked_transfer.ParallelChunkWriter(
+            section, "data", retries=1, retry_interval=0)
+        writer.write(b"a")
+        self.assertRaises(exception.BankCreateObjectFailed, writer.close)
+        self.assertEqual(2, section.create_object.call_count)
+
+    def test_chunk_writer_options(self):
+        options = chunked_transfer.chunk_writer_options()
+        self.assertEqual(
+            {"concurrency", "retries", "retry_interval", "deduplicate"},
+            set(options))
+
+    def test_deduplicated_upload_and_restore(self):
+        self.override_config("chunk_gc_grace_period", 0)
+        bank = Bank(_InMemoryBankPlugin())
+        section1 = BankSection(bank, "/checkpoints/1/resource")
+        section2 = BankSection(bank, "/checkpoints/2/resource")
+        data = [b"aaaa", b"bbbb", b"aaaa", b"cc"]
+        for section in (section1, section2):
+            chunked_transfer.upload_chunks(section, "data", iter(data), 4,
+                                           deduplicate=True)
+            self.assertEqual(["data_manifest"], section.list_objects())
+
+        chunk_keys = [key for key in bank.list_objects("/chunks")
+                      if key.endswith("/data")]
+        self.assertEqual(3, len(chunk_keys))
+
+        reader = chunked_transfer.ChunkedRestoreReader.from_section(
+            section2, "data")
+        self.assertEqual(b"".join(data), reader.read())
+
+        for section in (section1, section2):
+            objects = section.list_objects()
+            chunked_transfer.release_chunks(section, objects)
+            for obj in objects:
+                section.delete_object(obj)
+        self.assertEqual([], list(bank.list_objects("/chunks")))
+
+    def test_sorted_chunk_names(self):
+        names = ["data_10", "data_2", "status", "metadata", "data_0",
+                 "snapshot_1", "data_1", "data_x"]
+        self.assertEqual(
+            ["data_0", "data_1", "data_2", "data_10"],
+            chunked_transfer.sorted_chunk_names(names, "data"))
+
+    def _upload_numbered_chunks(self, section, count):
+        for index in range(count):
+            section.create_object("data_%d" % index,
+                                  ("%03d" % index).encode())
+        return b"".join(("%03d" % index).encode() for index in range(count))
+
+    def test_restore_reader_read_is_ordered(self):
+        section = self._create_test_section()
+        expected = self._upload_numbered_chunks(section, 12)
+        section.create_object("status", "available")
+
+        reader = chunked_transfer.ChunkedRestoreReader.from_section(
+            section, "data", prefetch=3)
+        data = []
+        while True:
+            piece = reader.read(5)
+            if not piece:
+                break
+            data.append(piece)
+        reader.close()
+        self.assertEqual(expected, b"".join(data))
+
+    def test_restore_reader_read_all(self):
+        section = self._create_test_section()
+        expected = self._upload_numbered_chunks(section, 11)
+        with chunked_transfer.ChunkedRestoreReader.from_section(
+                section, "data") as reader:
+            self.assertEqual(b"000", reader.read(3))
+            self.assertEqual(expected[3:], reader.read())
+            self.assertEqual(b"", reader.read(1))
+
+    def test_restore_reader_iter(self):
+        section = self._create_test_section()
+        expected = self._upload_numbered_chunks(section, 11)
+        reader = chunked_transfer.ChunkedRestoreReader.from_section(
+            section, "data")
+        self.assertEqual(expected, b"".join(reader))
+
+    def test_restore_reader_closed(self):
+        section = self._create_test_section()
+        self._upload_numbered_chunks(section, 3)
+        reader = chunked_transfer.ChunkedRestoreReader.from_section(
+            section, "data")
+        reader.close()
+        self.assertRaises(ValueError, reader.read, 1)
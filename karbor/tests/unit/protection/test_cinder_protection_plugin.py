@@ -12,6 +12,7 @@
 
 import collections
 import datetime
+from cinderclient.exceptions import NotFound
 from karbor.common import constants
 from karbor.context import RequestContext
 from karbor.resource import Resource
@@ -19,6 +20,8 @@ from karbor.services.protection.bank_plugin import Bank
 from karbor.services.protection.bank_plugin import BankPlugin
 from karbor.services.protection.bank_plugin import BankSection
 from karbor.services.protection.client_factory import ClientFactory
+from karbor.services.protection.protection_plugins.volume. \
+    cinder_protection_plugin import BackupStatusFetcher
 from karbor.services.protection.protection_plugins.volume. \
     cinder_protection_plugin import CinderProtectionPlugin
 from karbor.services.protection.protection_plugins.volume \
@@ -57,6 +60,12 @@ ResourceNode = collections.namedtuple(
      "child_nodes"]
 )
 
+Backup = collections.namedtuple(
+    "Backup",
+    ["id",
+     "status"]
+)
+
 Image = collections.namedtuple(
     "Image",
     ["disk_format",
@@ -201,3 +210,59 @@ class CinderProtectionPluginTest(base.TestCase):
 
     def tearDown(self):
         super(CinderProtectionPluginTest, self).tearDown()
+
+
+class BackupStatusFetcherTest(base.TestCase):
+    def setUp(self):
+        super(BackupStatusFetcherTest, self).setUp()
+        self.cinder_client = mock.MagicMock()
+        self.fetcher = BackupStatusFetcher(self.cinder_client, 2)
+
+    def test_list_backups_in_progress(self):
+        pages = {
+            ("creating", None): [Backup("1", "creating"),
+                                 Backup("2", "creating")],
+            ("creating", "2"): [Backup("3", "creating")],
+            ("deleting", None): [Backup("4", "deleting")],
+        }
+
+        def list_backups(search_opts, marker, limit):
+            self.assertEqual(2, limit)
+            return pages[(search_opts["status"], marker)]
+
+        self.cinder_client.backups.list.side_effect = list_backups
+        self.assertEqual({"1": "creating", "3": "creating",
+                          "4": "deleting"},
+                         self.fetcher(["1", "3", "4"]))
+        self.assertEqual(3, self.cinder_client.backups.list.call_count)
+        self.cinder_client.backups.get.assert_not_called()
+
+    def test_get_finished_backups(self):
+        self.cinder_client.backups.list.return_value = []
+
+        def get_backup(backup_id):
+            if backup_id == "2":
+                raise NotFound(404)
+            return Backup(backup_id, "available")
+
+        self.cinder_client.backups.get.side_effect = get_backup
+        self.assertEqual({"1": "available"}, self.fetcher(["1", "2"]))
+
+    def test_backup_error_deleting(self):
+        self.cinder_client.backups.list.return_value = []
+        self.cinder_client.backups.get.return_value = Backup(
+            "1", "error_deleting")
+        statuses = self.fetcher(["1"])
+        self.assertEqual({"1": "error_deleting"}, statuses)
+
+        plugin = CinderProtectionPlugin()
+        bank_section = mock.MagicMock()
+        resource_info = {"backup_id": "1",
+                         "bank_section": bank_section,
+                         "operation": "delete"}
+        plugin.protection_resource_map["1"] = resource_info
+        self.assertTrue(plugin._sync_backup_status(resource_info,
+                                                   statuses["1"]))
+        bank_section.update_object.assert_called_once_with(
+            "status", constants.RESOURCE_STATUS_ERROR)
+        self.assertNotIn("1", plugin.protection_resource_map)
@@ -0,0 +1,44 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from karbor.common import constants
+from karbor.services.protection.flows import create_restoration
+from karbor.tests import base
+
+
+class SyncStackStatusTaskTest(base.TestCase):
+    def setUp(self):
+        super(SyncStackStatusTaskTest, self).setUp()
+        self.restore = mock.MagicMock()
+        self.task = create_restoration.SyncStackStatusTask(
+            None, mock.Mock(), self.restore)
+
+    def test_in_progress(self):
+        for stack_status in ("CREATE_IN_PROGRESS", "ROLLBACK_IN_PROGRESS"):
+            self.assertFalse(self.task._sync_status("stack", stack_status))
+        self.restore.update.assert_not_called()
+
+    def test_complete(self):
+        self.assertTrue(self.task._sync_status("stack", "CREATE_COMPLETE"))
+        self.restore.update.assert_called_once_with(
+            {"status": constants.OPERATION_EXE_STATE_SUCCESS})
+        self.restore.save.assert_called_once_with()
+
+    def test_failed(self):
+        for stack_status in ("CREATE_FAILED", "ROLLBACK_COMPLETE",
+                             "DELETE_COMPLETE"):
+            self.restore.reset_mock()
+            self.assertTrue(self.task._sync_status("stack", stack_status))
+            self.restore.update.assert_called_once_with(
+                {"status": constants.OPERATION_EXE_STATE_FAILED})
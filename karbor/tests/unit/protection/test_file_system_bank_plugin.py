@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+
+from oslo_config import cfg
+
+from karbor import exception
+from karbor.services.protection.bank_plugin import Bank
+from karbor.services.protection.bank_plugins import file_system_bank_plugin
+from karbor.services.protection.checkpoint import CheckpointCollection
+from karbor.tests import base
+from karbor.tests.unit.protection.fakes import fake_protection_plan
+
+
+class FileSystemBankPluginTest(base.TestCase):
+    def setUp(self):
+        super(FileSystemBankPluginTest, self).setUp()
+        self.bank_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.bank_path)
+        config = cfg.ConfigOpts()
+        config.register_opts(
+            file_system_bank_plugin.file_system_bank_plugin_opts,
+            "file_system_bank_plugin")
+        config.set_override("file_system_bank_path", self.bank_path,
+                            "file_system_bank_plugin")
+        config.set_override("file_system_bank_fsync", False,
+                            "file_system_bank_plugin")
+        self.plugin = file_system_bank_plugin.FileSystemBankPlugin(config)
+
+    def test_create_get_object(self):
+        self.plugin.create_object("/key/binary", b"\x00\x01")
+        self.plugin.create_object("/key/text", u"text")
+        self.plugin.create_object("/key/dict", {"status": "available"})
+        self.assertEqual(b"\x00\x01", self.plugin.get_object("/key/binary"))
+        self.assertEqual(u"text", self.plugin.get_object("/key/text"))
+        self.assertEqual({"status": "available"},
+                         self.plugin.get_object("/key/dict"))
+
+    def test_update_object(self):
+        self.plugin.create_object("/key", "value-1")
+        self.plugin.update_object("/key", "value-2")
+        self.assertEqual("value-2", self.plugin.get_object("/key"))
+        self.assertEqual(["key"], os.listdir(self.bank_path))
+
+    def test_get_missing_object(self):
+        self.assertRaises(exception.BankGetObjectFailed,
+                          self.plugin.get_object, "/missing")
+
+    def test_invalid_key(self):
+        self.assertRaises(exception.InvalidParameterValue,
+                          self.plugin.create_object, "/../escape", "value")
+
+    def test_delete_object(self):
+        self.plugin.create_object("/a/b/c", "value")
+        self.plugin.create_object("/a/d", "value")
+        self.plugin.delete_object("/a/b/c")
+        self.assertEqual(["d"], os.listdir(os.path.join(self.bank_path,
+                                                        "a")))
+        self.assertRaises(exception.BankDeleteObjectFailed,
+                          self.plugin.delete_object, "/a/b/c")
+
+    def test_list_objects(self):
+        keys = ["/a-b", "/a/b", "/a/c/d", "/a/c/e", "/ab", "/b"]
+        for key in reversed(keys):
+            self.plugin.create_object(key, "value")
+        self.assertEqual(keys, self.plugin.list_objects())
+        self.assertEqual(["/a/b", "/a/c/d", "/a/c/e"],
+                         self.plugin.list_objects(prefix="/a/"))
+        self.assertEqual(["/a/c/d", "/a/c/e"],
+                         self.plugin.list_objects(prefix="/a/c"))
+        self.assertEqual(["/a/c/e", "/ab"],
+                         self.plugin.list_objects(marker="/a/c/d", limit=2))
+        self.assertEqual(["/a/c/d", "/a/c/e"],
+                         self.plugin.list_objects(marker="/a/b",
+                                                  end_marker="/ab"))
+        self.assertEqual(list(reversed(keys)),
+                         self.plugin.list_objects(sort_dir="desc"))
+        self.assertEqual(["/a/c/e", "/a/c/d"],
+                         self.plugin.list_objects(marker="/ab",
+                                                  end_marker="/a/b",
+                                                  sort_dir="desc"))
+        self.assertEqual([], self.plugin.list_objects(prefix="/missing/"))
+
+    def test_checkpoint_collection(self):
+        collection = CheckpointCollection(Bank(self.plugin))
+        plan = fake_protection_plan()
+        ids = [collection.create(plan).id for i in range(5)]
+        self.assertEqual(set(ids), set(collection.list_ids()))
+        self.assertEqual(set(ids),
+                         set(collection.list_ids(plan_id=plan["id"])))
+        checkpoint = collection.get(ids[0])
+        checkpoint.status = "available"
+        checkpoint.commit()
+        collection._metadata_cache.clear()
+        self.assertEqual("available", collection.get(ids[0]).status)
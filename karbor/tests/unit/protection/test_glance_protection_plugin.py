@@ -68,6 +68,7 @@ Image = collections.namedtuple(
 class CheckpointCollection(object):
     def __init__(self):
         self.bank_section = fake_bank_section
+        self.id = "checkpoint_id"
 
     def get_resource_bank_section(self, resource_id):
         return self.bank_section
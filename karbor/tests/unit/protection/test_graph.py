@@ -10,6 +10,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 from collections import namedtuple
+import eventlet
 from oslo_serialization import jsonutils
 from oslo_serialization import msgpackutils
 
@@ -107,6 +108,43 @@ class GraphBuilderTest(base.TestCase):
         self.assertEqual(id(test_left_node.child_nodes[0]),
                          id(test_right_node.child_nodes[0]))
 
+    def test_child_nodes_fetched_once(self):
+        test_base = {
+            "A1": ["B1", "B2"],
+            "B1": ["C1", "C2"],
+            "B2": ["C3", "C2"],
+            "C1": [],
+            "C2": [],
+            "C3": [],
+        }
+        fetched = []
+
+        def get_child_nodes(node):
+            fetched.append(node)
+            return test_base[node]
+
+        result_graph = graph.build_graph(["A1", "B2"], get_child_nodes,
+                                         concurrency=4)
+        self.assertEqual(["A1"], [node.value for node in result_graph])
+        self.assertEqual(sorted(test_base), sorted(fetched))
+
+    def test_child_nodes_fetched_concurrently(self):
+        test_base = {"A": ["B%d" % i for i in range(8)]}
+        in_flight = []
+        max_in_flight = []
+
+        def get_child_nodes(node):
+            in_flight.append(node)
+            max_in_flight.append(len(in_flight))
+            eventlet.sleep(0)
+            in_flight.remove(node)
+            return test_base.get(node, [])
+
+        result_graph = graph.build_graph(["A"], get_child_nodes,
+                                         concurrency=4)
+        self.assertEqual(8, len(result_graph[0].child_nodes))
+        self.assertEqual(4, max(max_in_flight))
+
     def test_graph_pack_unpack(self):
         test_base = {
             "A1": ["B1", "B2"],
@@ -261,3 +299,59 @@ class GraphWalkerTest(base.TestCase):
             keys = list(g.keys())
             keys.sort()
             walker.walk_graph(graph.build_graph(keys, g.__getitem__))
+
+    def test_graph_walker_without_descending_visited(self):
+        g = {
+            'A': ['C'],
+            'B': ['C'],
+            'C': ['D', 'E'],
+            'D': [],
+            'E': [],
+        }
+        expected_calls = (
+            ("on_node_enter", 'A', False),
+            ("on_node_enter", 'C', False),
+            ("on_node_enter", 'D', False),
+            ("on_node_exit", 'D'),
+            ("on_node_enter", 'E', False),
+            ("on_node_exit", 'E'),
+            ("on_node_exit", 'C'),
+            ("on_node_exit", 'A'),
+            ("on_node_enter", 'B', False),
+            ("on_node_enter", 'C', True),
+            ("on_node_exit", 'C'),
+            ("on_node_exit", 'B'),
+        )
+        listener = _TestGraphWalkerListener(expected_calls, self)
+        walker = graph.GraphWalker(descend_visited=False)
+        walker.register_listener(listener)
+        walker.walk_graph(graph.build_graph(sorted(g), g.__getitem__))
+        self.assertEqual([], listener._expected_expected_event_stream)
+
+    def test_graph_walker_deep_graph(self):
+        depth = 5000
+        node = graph.GraphNode(value=depth, child_nodes=())
+        for value in range(depth - 1, -1, -1):
+            node = graph.GraphNode(value=value, child_nodes=(node, ))
+        expected_calls = (
+            [("on_node_enter", value, False) for value in range(depth + 1)] +
+            [("on_node_exit", value) for value in range(depth, -1, -1)])
+        listener = _TestGraphWalkerListener(expected_calls, self)
+        walker = graph.GraphWalker()
+        walker.register_listener(listener)
+        walker.walk_graph([node])
+        self.assertEqual([], listener._expected_expected_event_stream)
+
+    def test_pack_graph_shared_nodes_once(self):
+        g = {
+            'A': ['C'],
+            'B': ['C'],
+            'C': ['D', 'E'],
+            'D': [],
+            'E': [],
+        }
+        test_graph = graph.build_graph(sorted(g), g.__getitem__)
+        packed_graph = graph.pack_graph(test_graph)
+        self.assertEqual(len(g), len(packed_graph.nodes))
+        unpacked_graph = graph.unpack_graph(packed_graph)
+        self.assertEqual(sorted(test_graph), sorted(unpacked_graph))
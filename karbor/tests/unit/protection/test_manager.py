@@ -10,12 +10,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 import mock
 
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
 
+from karbor.common import constants
 from karbor import exception
 from karbor.resource import Resource
 from karbor.services.protection.flows import worker as flow_manager
@@ -119,11 +121,55 @@ class ProtectionServiceTest(base.TestCase):
                            'name': 'name654'}],
                          result)
 
+    @mock.patch.object(protectable_registry.ProtectableRegistry,
+                       'fetch_dependent_resources_bulk')
+    def test_list_protectable_dependents_bulk(self, mocker):
+        parent = Resource(type='OS::Nova::Server', id='fake_id', name='')
+        mocker.return_value = {
+            parent: [Resource(type='OS::Cinder::Volume',
+                              id='123456', name='name123')]}
+        fake_cntx = mock.MagicMock()
+
+        result = self.pro_manager.list_protectable_dependents_bulk(
+            fake_cntx, ['fake_id'], 'OS::Nova::Server')
+        mocker.assert_called_once_with(fake_cntx, [parent])
+        self.assertEqual({'fake_id': [{'type': 'OS::Cinder::Volume',
+                                       'id': '123456',
+                                       'name': 'name123'}]},
+                         result)
+
     @mock.patch.object(provider.ProviderRegistry, 'show_provider')
     def test_protect(self, mock_provider):
         mock_provider.return_value = fakes.FakeProvider()
         self.pro_manager.protect(None, fakes.fake_protection_plan())
 
+    @mock.patch.object(flow_manager.Worker, 'get_flow')
+    @mock.patch.object(provider.ProviderRegistry, 'show_provider')
+    def test_protect_when_busy(self, mock_provider, mock_flow):
+        fake_provider = fakes.FakeProvider()
+        # One job running and one waiting for a worker
+        fake_provider.worker_pool.spawn_n(eventlet.sleep, 0.01)
+        fake_provider.worker_pool.spawn_n(eventlet.sleep, 0.01)
+        mock_provider.return_value = fake_provider
+        self.assertRaises(oslo_messaging.ExpectedException,
+                          self.pro_manager.protect,
+                          None,
+                          fakes.fake_protection_plan(),
+                          constants.PROTECTION_PRIORITY_SCHEDULED)
+        mock_flow.assert_not_called()
+        self.assertEqual(1, fake_provider.worker_pool.stats["rejected"])
+        eventlet.sleep(0.01)
+
+    @mock.patch.object(manager, 'LOG')
+    def test_log_worker_pool_stats(self, mock_log):
+        fake_provider = fakes.FakeProvider()
+        with mock.patch.dict(self.pro_manager.provider_registry.providers,
+                             {'fake_id': fake_provider}, clear=True):
+            self.pro_manager._log_worker_pool_stats(None)
+        mock_log.debug.assert_called_once_with(
+            mock.ANY, {"provider_id": 'fake_id',
+                       "stats": fake_provider.worker_pool.stats})
+
     @mock.patch.object(flow_manager.Worker, 'get_flow')
     def test_protect_in_error(self, mock_flow):
         mock_flow.side_effect = Exception()
@@ -140,6 +186,21 @@ class ProtectionServiceTest(base.TestCase):
                                               'fake_checkpoint')
         self.assertEqual(cp['id'], 'fake_checkpoint')
 
+    @mock.patch.object(provider.ProviderRegistry, 'show_provider')
+    def test_list_checkpoints(self, mock_provider):
+        mock_provider.return_value = fakes.FakeProvider()
+        context = mock.MagicMock()
+        with mock.patch.object(fakes.FakeCheckpointCollection,
+                               'list_summaries',
+                               return_value=[{"id": "checkpoint1"}]
+                               ) as mock_list_summaries:
+            checkpoints = self.pro_manager.list_checkpoints(
+                context, 'provider1', limit=10, filters={"plan_id": "plan"})
+        mock_list_summaries.assert_called_once_with(
+            limit=10, marker=None, plan_id="plan", start_date=None,
+            end_date=None, sort_dir=None)
+        self.assertEqual([{"id": "checkpoint1"}], checkpoints)
+
     @mock.patch.object(provider.ProviderRegistry, 'show_provider')
     @mock.patch.object(fakes.FakeCheckpointCollection, 'get')
     def test_show_checkpoint_not_found(self, mock_provider,
@@ -10,7 +10,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
+
 from karbor.resource import Resource
+from karbor.services.protection.protectable_plugin import InventoryCache
 from karbor.services.protection.protectable_plugin import ProtectablePlugin
 from karbor.services.protection.protectable_registry import ProtectableRegistry
 
@@ -49,6 +52,25 @@ class _FakeProtectablePlugin(ProtectablePlugin):
         return self.graph[parent_resource]
 
 
+class _FakeInventoryProtectablePlugin(_FakeProtectablePlugin):
+    def __init__(self, cntx):
+        super(_FakeInventoryProtectablePlugin, self).__init__(cntx)
+        self.loads = []
+
+    def instance(self, cntx):
+        new = super(_FakeInventoryProtectablePlugin, self).instance(cntx)
+        new.loads = self.loads
+        return new
+
+    def _load_graph(self):
+        self.loads.append(True)
+        return self.graph
+
+    def get_dependent_resources_from_inventory(self, context, parent_resource,
+                                               inventory):
+        return inventory.get(_FAKE_TYPE, self._load_graph)[parent_resource]
+
+
 class ProtectableRegistryTest(base.TestCase):
     def setUp(self):
         super(ProtectableRegistryTest, self).setUp()
@@ -88,3 +110,53 @@ class ProtectableRegistryTest(base.TestCase):
             found = set(child.value for child in item.child_nodes)
             self.assertEqual(found, expected)
             self.assert_graph(item.child_nodes, g_dict)
+
+    def test_graph_building_shares_inventory(self):
+        plugin = _FakeInventoryProtectablePlugin(None)
+        self.protectable_registry.register_plugin(plugin)
+        A = Resource(_FAKE_TYPE, "A", 'nameA')
+        B = Resource(_FAKE_TYPE, "B", 'nameB')
+        C = Resource(_FAKE_TYPE, "C", 'nameC')
+        g = {A: [B, C], B: [C], C: []}
+        plugin.graph = g
+        result_graph = self.protectable_registry.build_graph(None, [A])
+        self.assert_graph(result_graph, g)
+        self.assertEqual(1, len(plugin.loads))
+
+    def test_fetch_dependent_resources_bulk(self):
+        plugin = _FakeInventoryProtectablePlugin(None)
+        self.protectable_registry.register_plugin(plugin)
+        A = Resource(_FAKE_TYPE, "A", 'nameA')
+        B = Resource(_FAKE_TYPE, "B", 'nameB')
+        C = Resource(_FAKE_TYPE, "C", 'nameC')
+        plugin.graph = {A: [C], B: [C], C: []}
+        result = self.protectable_registry.fetch_dependent_resources_bulk(
+            None, [A, B, C])
+        self.assertEqual({A: [C], B: [C], C: []}, result)
+        self.assertEqual(1, len(plugin.loads))
+
+
+class InventoryCacheTest(base.TestCase):
+    def test_load_once(self):
+        inventory = InventoryCache()
+        loads = []
+
+        def load():
+            loads.append(True)
+            eventlet.sleep(0)
+            return {"key": "value"}
+
+        pool = eventlet.GreenPool()
+        results = list(pool.imap(lambda _: inventory.get("volumes", load),
+                                 range(5)))
+        self.assertEqual([{"key": "value"}] * 5, results)
+        self.assertEqual(1, len(loads))
+
+    def test_load_failure(self):
+        inventory = InventoryCache()
+
+        def load():
+            raise ValueError()
+
+        self.assertRaises(ValueError, inventory.get, "volumes", load)
+        self.assertRaises(ValueError, inventory.get, "volumes", load)
@@ -10,6 +10,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import json
+
+from karbor import exception
+from karbor.resource import Resource
+from karbor.services.protection import bank_plugin
 import karbor.services.protection.graph as graph
 from karbor.services.protection.resource_graph import ResourceGraphContext
 from karbor.services.protection.resource_graph \
@@ -69,3 +74,28 @@ class SerializeResourceGraphTest(base.TestCase):
         self.assertEqual(len(resource_graph), len(deserialized_resource_graph))
         for start_node in resource_graph:
             self.assertIn(start_node, deserialized_resource_graph)
+
+    def test_encode_decode_resource_graph(self):
+        encoded_resource_graph = graph.encode_resource_graph(resource_graph)
+        self.assertEqual(graph.RESOURCE_GRAPH_FORMAT_VERSION,
+                         encoded_resource_graph["version"])
+        self.assertEqual(1, len(encoded_resource_graph["types"]))
+        decoded_resource_graph = graph.decode_resource_graph(
+            json.loads(json.dumps(encoded_resource_graph)))
+        self.assertEqual(sorted(resource_graph),
+                         sorted(decoded_resource_graph))
+
+    def test_encode_decode_compressed_resource_graph(self):
+        nodes = [Resource(type="OS::Nova::Server", id="server%d" % i,
+                          name="server%d" % i) for i in range(100)]
+        large_graph = graph.build_graph(nodes, lambda node: [])
+        encoded_resource_graph = graph.encode_resource_graph(
+            large_graph, codec=bank_plugin.get_codec("zlib"))
+        self.assertEqual("zlib", encoded_resource_graph["codec"])
+        self.assertEqual(sorted(large_graph),
+                         sorted(graph.decode_resource_graph(
+                             encoded_resource_graph)))
+
+    def test_decode_unsupported_version(self):
+        self.assertRaises(exception.InvalidInput,
+                          graph.decode_resource_graph, {"version": 99})
@@ -0,0 +1,130 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+from oslo_db import exception as db_exc
+
+from karbor.db.sqlalchemy import api as sqlalchemy_api
+from karbor import exception
+from karbor.services.protection.bank_plugin import Bank
+from karbor.services.protection.bank_plugins import sql_bank_plugin
+from karbor.services.protection.checkpoint import CheckpointCollection
+from karbor.tests import base
+from karbor.tests.unit.protection.fakes import fake_protection_plan
+
+CONF = cfg.CONF
+
+
+class SqlBankPluginTest(base.TestCase):
+    def setUp(self):
+        super(SqlBankPluginTest, self).setUp()
+        self.plugin = sql_bank_plugin.SqlBankPlugin(CONF)
+
+    def test_create_get_object(self):
+        self.plugin.create_object("/key/binary", b"\x00\x01")
+        self.plugin.create_object("/key/text", u"text")
+        self.plugin.create_object("/key/dict", {"status": "available"})
+        self.assertEqual(b"\x00\x01", self.plugin.get_object("/key/binary"))
+        self.assertEqual(u"text", self.plugin.get_object("/key/text"))
+        self.assertEqual({"status": "available"},
+                         self.plugin.get_object("/key/dict"))
+
+    def test_update_object(self):
+        self.plugin.create_object("/key", "value-1")
+        self.plugin.update_object("/key", "value-2")
+        self.assertEqual("value-2", self.plugin.get_object("/key"))
+
+    def test_create_objects(self):
+        self.plugin.create_object("/a", "old")
+        self.plugin.create_objects({"/a": "new", "/b": {"c": 1}})
+        self.assertEqual("new", self.plugin.get_object("/a"))
+        self.assertEqual({"c": 1}, self.plugin.get_object("/b"))
+
+    def test_object_too_large(self):
+        self.override_config("sql_bank_max_object_size", 4,
+                             "sql_bank_plugin")
+        plugin = sql_bank_plugin.SqlBankPlugin(CONF)
+        plugin.create_object("/small", b"1234")
+        self.assertRaises(exception.BankCreateObjectFailed,
+                          plugin.create_objects,
+                          {"/a": b"1", "/large": b"12345"})
+        self.assertRaises(exception.BankUpdateObjectFailed,
+                          plugin.update_object, "/small", b"12345")
+        self.assertEqual(b"1234", plugin.get_object("/small"))
+        self.assertEqual([], plugin.list_objects(prefix="/a"))
+
+    def test_create_objects_retries_duplicate_entry(self):
+        get_session = sqlalchemy_api.get_session
+        racing_session = mock.MagicMock()
+        # a concurrent put inserted the key first
+        racing_session.query.side_effect = db_exc.DBDuplicateEntry()
+        sessions = [racing_session]
+
+        def fake_get_session(*args, **kwargs):
+            if sessions:
+                return sessions.pop()
+            return get_session(*args, **kwargs)
+
+        with mock.patch.object(sqlalchemy_api, 'get_session',
+                               side_effect=fake_get_session), \
+                mock.patch('time.sleep'):
+            self.plugin.create_objects({"/a": "value"})
+        self.assertEqual("value", self.plugin.get_object("/a"))
+
+    def test_batch_get_delete(self):
+        self.plugin.create_objects({"/a": "value-a", "/b": b"value-b",
+                                    "/c": "value-c"})
+        self.assertEqual({"/a": "value-a", "/b": b"value-b"},
+                         self.plugin.get_objects(["/a", "/b"]))
+        self.assertRaises(exception.BankGetObjectFailed,
+                          self.plugin.get_objects, ["/a", "/missing"])
+        self.plugin.delete_objects(["/a", "/b"])
+        self.assertEqual(["/c"], self.plugin.list_objects())
+
+    def test_get_missing_object(self):
+        self.assertRaises(exception.BankGetObjectFailed,
+                          self.plugin.get_object, "/missing")
+
+    def test_delete_object(self):
+        self.plugin.create_object("/key", "value")
+        self.plugin.delete_object("/key")
+        self.assertRaises(exception.BankGetObjectFailed,
+                          self.plugin.get_object, "/key")
+        self.assertRaises(exception.BankDeleteObjectFailed,
+                          self.plugin.delete_object, "/key")
+
+    def test_list_objects(self):
+        keys = ["/a-b", "/a/b", "/a/c/d", "/a/c/e", "/ab", "/b"]
+        self.plugin.create_objects({key: "value" for key in keys})
+        self.assertEqual(keys, self.plugin.list_objects())
+        self.assertEqual(["/a/b", "/a/c/d", "/a/c/e"],
+                         self.plugin.list_objects(prefix="/a/"))
+        self.assertEqual(["/a/c/e", "/ab"],
+                         self.plugin.list_objects(marker="/a/c/d", limit=2))
+        self.assertEqual(["/a/c/d", "/a/c/e"],
+                         self.plugin.list_objects(marker="/a/b",
+                                                  end_marker="/ab"))
+        self.assertEqual(["/b", "/ab"],
+                         self.plugin.list_objects(sort_dir="desc", limit=2))
+        self.assertEqual(["/a/c/e", "/a/c/d"],
+                         self.plugin.list_objects(marker="/ab",
+                                                  end_marker="/a/b",
+                                                  sort_dir="desc"))
+
+    def test_checkpoint_collection(self):
+        collection = CheckpointCollection(Bank(self.plugin))
+        plan = fake_protection_plan()
+        ids = [collection.create(plan).id for i in range(5)]
+        self.assertEqual(set(ids), set(collection.list_ids()))
+        self.assertEqual(set(ids),
+                         set(collection.list_ids(plan_id=plan["id"])))
@@ -0,0 +1,135 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+
+from karbor.common import constants
+from karbor.services.protection import bank_plugin
+from karbor.services.protection import checkpoint
+from karbor.services.protection.flows import create_protection
+from karbor.services.protection import status_aggregator
+from karbor.tests import base
+from karbor.tests.unit.protection.fakes import fake_protection_plan
+from karbor.tests.unit.protection.test_bank import _InMemoryBankPlugin
+from karbor.tests.unit.protection.test_bank import _InMemoryLeasePlugin
+
+
+def _get_resource_stats(checkpoint, resource_id):
+    bank_section = checkpoint.get_resource_bank_section(resource_id)
+    try:
+        return bank_section.get_object("status")
+    except Exception:
+        return constants.RESOURCE_STATUS_UNDEFINED
+
+
+class ResourceStatusAggregatorTest(base.TestCase):
+    def test_report(self):
+        aggregator = status_aggregator.ResourceStatusAggregator(
+            "checkpoint", ["A", "B"])
+        self.assertEqual({constants.RESOURCE_STATUS_UNDEFINED},
+                         aggregator.statuses)
+        aggregator.report("A", constants.RESOURCE_STATUS_AVAILABLE)
+        aggregator.report("C", constants.RESOURCE_STATUS_ERROR)
+        self.assertEqual({constants.RESOURCE_STATUS_UNDEFINED,
+                          constants.RESOURCE_STATUS_AVAILABLE},
+                         aggregator.statuses)
+        aggregator.report("B", constants.RESOURCE_STATUS_AVAILABLE)
+        self.assertEqual({constants.RESOURCE_STATUS_AVAILABLE},
+                         aggregator.statuses)
+
+    def test_on_change(self):
+        on_change = mock.Mock()
+        aggregator = status_aggregator.ResourceStatusAggregator(
+            "checkpoint", ["A"], on_change=on_change)
+        aggregator.report("A", constants.RESOURCE_STATUS_PROTECTING)
+        aggregator.report("A", constants.RESOURCE_STATUS_PROTECTING)
+        on_change.assert_called_once_with(
+            {constants.RESOURCE_STATUS_PROTECTING})
+
+    def test_poll_keeps_newer_reports(self):
+        aggregator = status_aggregator.ResourceStatusAggregator(
+            "checkpoint", ["A", "B"])
+
+        def get_resource_stats(checkpoint, resource_id):
+            # A finishes while its old status is being read
+            aggregator.report(resource_id,
+                              constants.RESOURCE_STATUS_AVAILABLE)
+            return constants.RESOURCE_STATUS_PROTECTING
+
+        aggregator.poll(None, [
+            {"resource_id": "A", "get_resource_stats": get_resource_stats},
+        ])
+        aggregator.poll(None, [
+            {"resource_id": "B", "get_resource_stats": lambda c, r:
+                constants.RESOURCE_STATUS_AVAILABLE},
+        ])
+        self.assertEqual({constants.RESOURCE_STATUS_AVAILABLE},
+                         aggregator.statuses)
+
+
+class SyncCheckpointStatusTaskTest(base.TestCase):
+    def setUp(self):
+        super(SyncCheckpointStatusTaskTest, self).setUp()
+        bank = bank_plugin.Bank(_InMemoryBankPlugin())
+        self.checkpoint = checkpoint.Checkpoint.create_in_section(
+            checkpoints_section=bank_plugin.BankSection(bank, "/checkpoints"),
+            indices_section=bank_plugin.BankSection(bank, "/indices"),
+            bank_lease=_InMemoryLeasePlugin(),
+            owner_id=bank.get_owner_id(),
+            plan=fake_protection_plan())
+        self.addCleanup(status_aggregator.unregister, self.checkpoint.id)
+
+    def _set_status(self, resource_id, status):
+        bank_section = self.checkpoint.get_resource_bank_section(resource_id)
+        bank_section.update_object("status", status)
+
+    def test_status_reported_by_resources(self):
+        self._set_status("A", constants.RESOURCE_STATUS_AVAILABLE)
+        status_getters = [
+            {"resource_id": resource_id,
+             "get_resource_stats": _get_resource_stats}
+            for resource_id in ("A", "B")]
+        task = create_protection.SyncCheckpointStatusTask(status_getters)
+
+        with mock.patch.object(self.checkpoint, "commit",
+                               wraps=self.checkpoint.commit) as commit:
+            task.execute(self.checkpoint)
+            eventlet.sleep(0)
+            self.assertEqual(0, commit.call_count)
+
+            self._set_status("B", constants.RESOURCE_STATUS_PROTECTING)
+            eventlet.sleep(0)
+            self.assertEqual(0, commit.call_count)
+
+            self._set_status("B", constants.RESOURCE_STATUS_AVAILABLE)
+            eventlet.sleep(0.01)
+            self.assertEqual(1, commit.call_count)
+
+        self.checkpoint.reload_meta_data()
+        self.assertEqual(constants.CHECKPOINT_STATUS_AVAILABLE,
+                         self.checkpoint.status)
+        self.assertNotIn(self.checkpoint.id, status_aggregator._aggregators)
+
+    def test_status_polled(self):
+        self.flags(sync_status_interval=0)
+        statuses = {"A": constants.RESOURCE_STATUS_PROTECTING}
+        status_getters = [{"resource_id": "A",
+                           "get_resource_stats": lambda c, r: statuses[r]}]
+        task = create_protection.SyncCheckpointStatusTask(status_getters)
+        task.execute(self.checkpoint)
+        eventlet.sleep(0)
+        statuses["A"] = constants.RESOURCE_STATUS_ERROR
+        eventlet.sleep(0.01)
+        self.checkpoint.reload_meta_data()
+        self.assertEqual(constants.CHECKPOINT_STATUS_ERROR,
+                         self.checkpoint.status)
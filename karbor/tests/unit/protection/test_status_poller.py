@@ -0,0 +1,127 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+
+from karbor import exception
+from karbor.services.protection import status_poller
+from karbor.tests import base
+
+
+class StatusPollerTest(base.TestCase):
+    def setUp(self):
+        super(StatusPollerTest, self).setUp()
+        self.poller = status_poller.StatusPoller()
+
+    def test_watch_until_done(self):
+        statuses = iter(["creating", "creating", "available"])
+        callback = mock.Mock(side_effect=lambda status: status == "available")
+        self.poller.add_watch("key", callback,
+                              fetch=lambda key: next(statuses),
+                              initial_delay=0, interval=0)
+        eventlet.sleep(0.01)
+        self.assertEqual([mock.call("creating"), mock.call("creating"),
+                          mock.call("available")], callback.call_args_list)
+        self.assertEqual(0, self.poller.stats["watches"])
+
+    def test_batch_fetch(self):
+        batch_fetch = mock.Mock(return_value={"A": "available"})
+        callback = mock.Mock(return_value=True)
+        for key in ("A", "B"):
+            self.poller.add_watch(key, callback, batch_fetch=batch_fetch,
+                                  initial_delay=0)
+        eventlet.sleep(0.01)
+        batch_fetch.assert_called_once_with(mock.ANY)
+        self.assertEqual({"A", "B"}, set(batch_fetch.call_args[0][0]))
+        self.assertEqual({"available", None},
+                         {args[0] for args, kwargs
+                          in callback.call_args_list})
+
+    def test_backoff(self):
+        self.flags(status_poll_backoff_factor=2)
+        watch = self.poller.add_watch("key", mock.Mock(return_value=False),
+                                      fetch=lambda key: "creating",
+                                      interval=1, max_interval=3)
+        self.poller._poll([watch])
+        self.assertEqual(1, watch.interval)
+        self.poller._poll([watch])
+        self.assertEqual(2, watch.interval)
+        self.poller._poll([watch])
+        self.assertEqual(3, watch.interval)
+        self.poller._update(watch, "available")
+        self.assertEqual(1, watch.interval)
+        watch.cancel()
+
+    def test_fetch_failure_keeps_watching(self):
+        fetch = mock.Mock(side_effect=[Exception(), "available"])
+        callback = mock.Mock(return_value=True)
+        self.poller.add_watch("key", callback, fetch=fetch,
+                              initial_delay=0, interval=0)
+        eventlet.sleep(0.01)
+        self.assertEqual(2, fetch.call_count)
+        callback.assert_called_once_with("available")
+
+    def test_notify(self):
+        callback = mock.Mock(return_value=True)
+        fetch = mock.Mock()
+        watch = self.poller.add_watch("key", callback, fetch=fetch)
+        stats = self.poller.stats
+        self.assertEqual((1, 0, 0), (stats["watches"], stats["due"],
+                                     stats["max_delay"]))
+        watch.notify("available")
+        eventlet.sleep(0.01)
+        callback.assert_called_once_with("available")
+        fetch.assert_not_called()
+
+    def test_fetch_required(self):
+        self.assertRaises(exception.InvalidInput, self.poller.add_watch,
+                          "key", mock.Mock())
+
+    def test_more_due_watches_than_pool_size(self):
+        self.flags(status_poll_concurrency=2)
+        callback = mock.Mock(return_value=True)
+
+        def fetch(key):
+            eventlet.sleep(0)
+            return "available"
+
+        for key in range(10):
+            self.poller.add_watch(key, callback, fetch=fetch,
+                                  initial_delay=0)
+        eventlet.sleep(0.01)
+        self.assertEqual(10, callback.call_count)
+        stats = self.poller.stats
+        self.assertEqual(0, stats["watches"])
+        self.assertEqual(0, stats["round_failures"])
+        self.assertEqual(10, stats["fetches"])
+        self.assertEqual(10, stats["statuses"])
+
+    def test_failed_round_keeps_polling(self):
+        self.flags(status_poll_interval=0)
+        poll_round = self.poller._poll_round
+        failures = [Exception()]
+
+        def fail_once(pool):
+            if failures:
+                raise failures.pop()
+            poll_round(pool)
+
+        callback = mock.Mock(return_value=True)
+        with mock.patch.object(self.poller, "_poll_round",
+                               side_effect=fail_once):
+            self.poller.add_watch("key", callback,
+                                  fetch=lambda key: "available",
+                                  initial_delay=0)
+            eventlet.sleep(0.01)
+        callback.assert_called_once_with("available")
+        self.assertEqual(1, self.poller.stats["round_failures"])
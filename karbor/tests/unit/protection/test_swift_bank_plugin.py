@@ -10,6 +10,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from karbor import exception
+from karbor.services.protection.bank_plugins.swift_bank_plugin import \
+    SwiftConnectionPool
 from karbor.services.protection.clients import swift
 from karbor.tests import base
 from karbor.tests.unit.protection.fake_swift_client import FakeSwiftClient
@@ -18,6 +21,7 @@ import mock
 import os
 from oslo_config import cfg
 from oslo_utils import importutils
+from swiftclient import ClientException
 import time
 
 CONF = cfg.CONF
@@ -94,6 +98,56 @@ class SwiftBankPluginTest(base.TestCase):
         objects = self.swift_bank_plugin.list_objects(prefix=None)
         self.assertEqual(len(objects), 2)
 
+    def test_list_objects_desc(self):
+        for i in range(5):
+            self.swift_bank_plugin.create_object("key-%d" % i, "value")
+        with mock.patch.object(self.fake_connection, 'get_container',
+                               wraps=self.fake_connection.get_container
+                               ) as get_container:
+            objects = self.swift_bank_plugin.list_objects(
+                prefix=None, limit=2, marker="key-4", sort_dir="desc")
+        self.assertEqual(["key-4", "key-3"], objects)
+        get_container.assert_called_once_with(
+            container="karbor", prefix=None, limit=2, marker="key-4",
+            end_marker=None, full_listing=False,
+            query_string="reverse=true")
+
+    def test_list_objects_desc_without_reverse_listing(self):
+        self.swift_bank_plugin.reverse_listing = False
+        for i in range(5):
+            self.swift_bank_plugin.create_object("key-%d" % i, "value")
+        objects = self.swift_bank_plugin.list_objects(
+            prefix=None, limit=2, sort_dir="desc")
+        self.assertEqual(["key-4", "key-3"], objects)
+
+    def test_delete_objects_bulk(self):
+        self.fake_connection.get_capabilities = mock.MagicMock(
+            return_value={"bulk_delete": {"max_deletes_per_request": 2}})
+        self.fake_connection.post_account = mock.MagicMock(
+            return_value=({}, '{"Errors": []}'))
+        self.swift_bank_plugin.delete_objects(["/a", "/b c", "/d"])
+        self.assertEqual(2, self.fake_connection.post_account.call_count)
+        first_call = self.fake_connection.post_account.call_args_list[0]
+        self.assertEqual("bulk-delete", first_call[1]["query_string"])
+        self.assertEqual("/karbor//a\n/karbor//b%20c",
+                         first_call[1]["data"])
+
+    def test_delete_objects_bulk_errors(self):
+        self.fake_connection.get_capabilities = mock.MagicMock(
+            return_value={"bulk_delete": {"max_deletes_per_request": 10}})
+        self.fake_connection.post_account = mock.MagicMock(
+            return_value=({}, '{"Errors": [["/karbor//a", "409 Conflict"]]}'))
+        self.assertRaises(exception.BankDeleteObjectFailed,
+                          self.swift_bank_plugin.delete_objects, ["/a"])
+
+    def test_delete_objects_without_bulk_delete(self):
+        self.fake_connection.get_capabilities = mock.MagicMock(
+            return_value={})
+        self.swift_bank_plugin.create_object("key-1", "value-1")
+        self.swift_bank_plugin.create_object("key-2", "value-2")
+        self.swift_bank_plugin.delete_objects(["key-1", "key-2"])
+        self.assertEqual([], self.swift_bank_plugin.list_objects())
+
     def test_update_object(self):
         self.swift_bank_plugin.create_object("key-1", "value-1")
         self.swift_bank_plugin.update_object("key-1", "value-2")
@@ -108,3 +162,64 @@ class SwiftBankPluginTest(base.TestCase):
         self.swift_bank_plugin.create_object("dict_object", {"key": "value"})
         value = self.swift_bank_plugin.get_object("dict_object")
         self.assertEqual(value, {"key": "value"})
+
+
+class SwiftConnectionPoolTest(base.TestCase):
+    def _create_pool(self, max_size=2, check_interval=60):
+        connections = []
+
+        def create_connection():
+            connection = mock.MagicMock()
+            connections.append(connection)
+            return connection
+        pool = SwiftConnectionPool(create_connection, max_size,
+                                   check_interval)
+        return pool, connections
+
+    def test_reuse_connection(self):
+        pool, connections = self._create_pool()
+        pool.call("head_account")
+        pool.call("get_container", container="karbor")
+        self.assertEqual(1, len(connections))
+        connections[0].get_container.assert_called_once_with(
+            container="karbor")
+
+    def test_drop_connection_on_unauthorized(self):
+        pool, connections = self._create_pool()
+        pool.call("head_account")
+        connections[0].put_object.side_effect = ClientException(
+            "unauthorized", http_status=401)
+        self.assertRaises(ClientException, pool.call, "put_object",
+                          container="karbor", obj="key")
+        self.assertEqual(1, len(connections))
+        connections[0].close.assert_called_once_with()
+        pool.call("head_account")
+        self.assertEqual(2, len(connections))
+
+    def test_keep_connection_on_http_error(self):
+        pool, connections = self._create_pool()
+        pool.call("head_account")
+        connections[0].get_object.side_effect = ClientException(
+            "not found", http_status=404)
+        self.assertRaises(ClientException, pool.call, "get_object",
+                          container="karbor", obj="key")
+        pool.call("head_account")
+        self.assertEqual(1, len(connections))
+        connections[0].close.assert_not_called()
+
+    def test_drop_broken_connection(self):
+        pool, connections = self._create_pool()
+        pool.call("head_account")
+        connections[0].get_object.side_effect = ClientException("reset")
+        self.assertRaises(ClientException, pool.call, "get_object",
+                          container="karbor", obj="key")
+        pool.call("head_account")
+        self.assertEqual(2, len(connections))
+
+    def test_check_idle_connection(self):
+        pool, connections = self._create_pool(check_interval=0)
+        pool.call("get_container", container="karbor")
+        connections[0].head_account.side_effect = ClientException("closed")
+        pool.call("get_container", container="karbor")
+        self.assertEqual(2, len(connections))
+        connections[0].close.assert_called_once_with()
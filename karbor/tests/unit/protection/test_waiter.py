@@ -0,0 +1,109 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import time
+
+import eventlet
+import mock
+
+from karbor.common import constants
+from karbor import exception
+from karbor.services.protection import waiter
+from karbor.tests import base
+
+Image = collections.namedtuple("Image", ["id", "status"])
+
+
+class ResourceWaiterTest(base.TestCase):
+    def _get_images(self, *statuses):
+        return mock.Mock(side_effect=[Image("image", status)
+                                      for status in statuses])
+
+    def test_wait_with_backoff(self):
+        self.flags(resource_wait_backoff_factor=2)
+        resource_waiter = waiter.ResourceWaiter(
+            constants.IMAGE_RESOURCE_TYPE,
+            initial_interval=0.01, max_interval=0.02)
+        get_image = self._get_images("queued", "saving", "saving", "active")
+        with mock.patch.object(eventlet, "Timeout",
+                               wraps=eventlet.Timeout) as timeout:
+            image = resource_waiter.wait("image", get_image, ("active", ))
+        self.assertEqual("active", image.status)
+        self.assertEqual([0.01, 0.02, 0.02],
+                         [args[0] for args, kwargs in timeout.call_args_list])
+
+    def test_wait_failed(self):
+        resource_waiter = waiter.ResourceWaiter(
+            constants.IMAGE_RESOURCE_TYPE, initial_interval=0.01)
+        get_image = self._get_images("saving", "killed")
+        self.assertRaises(exception.ResourceWaitFailed,
+                          resource_waiter.wait, "image", get_image,
+                          ("active", ), waiter.IMAGE_FAILED_STATUSES)
+
+    def test_wait_deadline(self):
+        resource_waiter = waiter.ResourceWaiter(
+            constants.IMAGE_RESOURCE_TYPE, initial_interval=0.01)
+        get_image = mock.Mock(return_value=Image("image", "saving"))
+        self.assertRaises(exception.ResourceWaitTimeout,
+                          resource_waiter.wait, "image", get_image,
+                          ("active", ), deadline=time.time() + 0.05)
+
+    def test_cancel(self):
+        resource_waiter = waiter.ResourceWaiter(
+            constants.IMAGE_RESOURCE_TYPE, initial_interval=60)
+        get_image = mock.Mock(return_value=Image("image", "saving"))
+        eventlet.spawn_n(resource_waiter.cancel)
+        self.assertRaises(exception.ResourceWaitCancelled,
+                          resource_waiter.wait, "image", get_image,
+                          ("active", ))
+        get_image.assert_called_once_with()
+
+    def test_cancel_checkpoint_waits(self):
+        resource_waiter = waiter.ResourceWaiter(
+            constants.IMAGE_RESOURCE_TYPE, checkpoint_id="checkpoint",
+            initial_interval=60)
+        other_waiter = waiter.ResourceWaiter(
+            constants.IMAGE_RESOURCE_TYPE, checkpoint_id="other",
+            initial_interval=0.01, timeout=0.05)
+        get_image = mock.Mock(return_value=Image("image", "saving"))
+        eventlet.spawn_n(waiter.cancel_checkpoint_waits, "checkpoint")
+        self.assertRaises(exception.ResourceWaitCancelled,
+                          resource_waiter.wait, "image", get_image,
+                          ("active", ))
+        self.assertRaises(exception.ResourceWaitTimeout,
+                          other_waiter.wait, "image", get_image,
+                          ("active", ))
+        self.assertNotIn("checkpoint", waiter._checkpoint_waiters)
+
+    def test_intervals_from_config(self):
+        self.flags(image_wait_initial_interval=3, image_wait_max_interval=30,
+                   server_snapshot_wait_initial_interval=5,
+                   resource_wait_initial_interval=7,
+                   resource_wait_max_interval=70)
+        image_waiter = waiter.ResourceWaiter(constants.IMAGE_RESOURCE_TYPE)
+        self.assertEqual((3, 30), (image_waiter.initial_interval,
+                                   image_waiter.max_interval))
+        server_waiter = waiter.ResourceWaiter(constants.SERVER_RESOURCE_TYPE)
+        self.assertEqual(5, server_waiter.initial_interval)
+        volume_waiter = waiter.ResourceWaiter(constants.VOLUME_RESOURCE_TYPE)
+        self.assertEqual((7, 70), (volume_waiter.initial_interval,
+                                   volume_waiter.max_interval))
+
+    def test_wait_for_image(self):
+        glance_client = mock.Mock()
+        glance_client.images.get.return_value = Image("image", "active")
+        resource_waiter = waiter.ResourceWaiter(
+            constants.IMAGE_RESOURCE_TYPE)
+        self.assertEqual("active", resource_waiter.wait_for_image(
+            glance_client, "image").status)
+        glance_client.images.get.assert_called_once_with("image")
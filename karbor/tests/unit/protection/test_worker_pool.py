@@ -0,0 +1,78 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from eventlet import event
+from oslo_config import cfg
+
+from karbor.common import constants
+from karbor.services.protection import worker_pool
+from karbor.tests import base
+
+
+class WorkerPoolTest(base.TestCase):
+    def test_bounded_concurrency(self):
+        pool = worker_pool.WorkerPool(2, 10, 10)
+        release = event.Event()
+        done = []
+
+        def job(i):
+            release.wait()
+            done.append(i)
+
+        for i in range(5):
+            pool.spawn_n(job, i)
+        eventlet.sleep(0)
+        self.assertEqual({"size": 2, "running": 2, "queued": 3,
+                          "rejected": 0}, pool.stats)
+        release.send()
+        eventlet.sleep(0.01)
+        self.assertEqual([0, 1, 2, 3, 4], sorted(done))
+        self.assertEqual(0, pool.stats["running"])
+
+    def test_failed_job(self):
+        pool = worker_pool.WorkerPool(1, 10, 10)
+        done = []
+
+        def fail():
+            raise Exception()
+
+        pool.spawn_n(fail)
+        pool.spawn_n(done.append, 1)
+        eventlet.sleep(0.01)
+        self.assertEqual([1], done)
+
+    def test_is_saturated(self):
+        pool = worker_pool.WorkerPool(1, 2, 1)
+        release = event.Event()
+        for i in range(2):
+            pool.spawn_n(release.wait)
+        eventlet.sleep(0)
+        self.assertFalse(pool.is_saturated(
+            constants.PROTECTION_PRIORITY_MANUAL))
+        self.assertTrue(pool.is_saturated(
+            constants.PROTECTION_PRIORITY_SCHEDULED))
+        pool.spawn_n(release.wait)
+        self.assertTrue(pool.is_saturated(
+            constants.PROTECTION_PRIORITY_MANUAL))
+        self.assertEqual(0, pool.stats["rejected"])
+        pool.reject()
+        self.assertEqual(1, pool.stats["rejected"])
+        release.send()
+        eventlet.sleep(0.01)
+
+    def test_get_worker_pool(self):
+        config = cfg.ConfigOpts()
+        pool = worker_pool.get_worker_pool(config)
+        self.assertIs(pool, worker_pool.get_worker_pool(config))
+        self.assertIsNot(pool, worker_pool.get_worker_pool())
+        self.assertEqual(32, pool.size)
@@ -40,3 +40,16 @@ class WorkFlowTest(base.TestCase):
         self.workflow_engine.add_tasks(flow, task1, task2)
         result = self.workflow_engine.search_task(flow, 'fake_func2')
         self.assertEqual('fake_func2', getattr(result, 'name'))
+
+    def test_search_task_not_found(self):
+        flow = self.workflow_engine.build_flow('test')
+        task1 = self.workflow_engine.create_task(fake_func, name='fake_func')
+        self.workflow_engine.add_tasks(flow, task1)
+        self.assertIsNone(self.workflow_engine.search_task(flow, 'missing'))
+
+    def test_search_task_in_foreign_flow(self):
+        flow = workflow.graph_flow.Flow('test')
+        task1 = self.workflow_engine.create_task(fake_func, name='fake_func')
+        flow.add(task1)
+        result = self.workflow_engine.search_task(flow, 'fake_func')
+        self.assertIs(task1, result)